@@ -1,117 +1,299 @@
-import requests
-from bs4 import BeautifulSoup
-import time
+import argparse
+import functools
+import hashlib
+import html
+import importlib.util
 import os
 import json
+import re
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-# 确定仓库根目录和 docs 目录，避免因工作目录变化导致的相对路径问题
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-REPO_ROOT = os.path.dirname(SCRIPT_DIR)
+from metadata import enrich_page_data
+from metrics import (
+    PROMETHEUS_FILENAME,
+    REPORT_DIR,
+    REPORT_FILENAME,
+    RunMetrics,
+    print_stage_summary,
+    stage_timer,
+    write_reports,
+)
+from build_manifest import BuildManifest, inputs_hash, write_if_changed
+from changefeed import (
+    FEED_ATOM_FILENAME,
+    FEED_JSON_FILENAME,
+    ChangeFeed,
+    load_feed_items,
+    print_change_summary,
+    render_atom_feed,
+    render_json_feed,
+)
+from categories import OTHER_CATEGORY, category_slugs, group_by_category
+from compress import iter_minified, minify_html, precompress_site, print_compress_summary
+from discover import DEFAULT_MAX_DEPTH, DEFAULT_MAX_PAGES
+from download_index import DownloadIndex, print_conflicts
+from linkcheck import (
+    DEFAULT_CHECK_WORKERS,
+    DEFAULT_PER_HOST,
+    DEFAULT_TTL_HOURS,
+    LinkCheckCache,
+    check_links,
+    print_health_summary,
+    write_health_report,
+)
+from memo import DEFAULT_MEMO_MAX_BYTES, MEMO_PARSE, MEMO_RENDER, MemoStore
+from journal import JOURNAL_PATH, STATUS_DONE, STATUS_FAILED, STATUS_PENDING, Journal
+from shard import (
+    SHARD_DIR,
+    check_shard_manifests,
+    links_digest,
+    load_shard_manifests,
+    merge_shard_manifests,
+    parse_shard_spec,
+    select_shard,
+    shard_label,
+    shard_manifest_path,
+    write_shard_manifest,
+)
+from search_index import SEARCH_INDEX_FILENAME, build_search_index, serialize_search_index
+from pipeline import STAGE_FETCH, STAGE_PARSE, STAGE_WRITE, StageStats, run_pipeline
+from snapshots import SnapshotStore
+from storage import REPO_ROOT
+from http_client import (
+    DEFAULT_BACKOFF,
+    DEFAULT_RETRIES,
+    DEFAULT_TIMEOUT,
+    HostRateLimiter,
+    HttpClient,
+    body_sha256,
+    conditional_headers,
+    load_validators,
+    save_validators,
+    validators_from_response,
+)
+
+# docs 目录使用绝对路径，避免因工作目录变化导致的相对路径问题
 DOCS_DIR = os.path.join(REPO_ROOT, 'docs')
 
+# 默认并发抓取的线程数
+DEFAULT_WORKERS = 4
+
+# 默认解析和渲染的进程数，0 表示在抓取线程中直接解析
+DEFAULT_PARSE_WORKERS = os.cpu_count() or 1
+
+# 可选的页面解析后端：BeautifulSoup + html.parser / lxml，或直接使用 lxml XPath
+PARSER_BACKENDS = ('html.parser', 'lxml', 'lxml-direct')
+DEFAULT_PARSER = 'html.parser'
+
+# save_page_data 的处理结果
+PAGE_UPDATED = 'updated'
+PAGE_NOT_MODIFIED = 'not_modified'
+PAGE_FAILED = 'failed'
+
 
-def check_dependencies():
-    """检查必要的依赖是否已安装"""
-    required_packages = ['requests', 'bs4']
+# 各解析后端需要的依赖包
+PARSER_PACKAGES = {
+    'html.parser': ('bs4',),
+    'lxml': ('bs4', 'lxml'),
+    'lxml-direct': ('lxml',),
+}
+
+
+def check_dependencies(required_packages=('requests', 'bs4'), log=print):
+    """检查必要的依赖是否已安装（只查找，不导入）"""
     missing_packages = []
     
     for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
+        if importlib.util.find_spec(package) is None:
             missing_packages.append(package)
     
     if missing_packages:
-        print(f"❌ 缺少必要的依赖包: {', '.join(missing_packages)}")
-        print("请运行以下命令安装依赖:")
-        print("pip install -r requirements.txt")
+        log(f"❌ 缺少必要的依赖包: {', '.join(missing_packages)}")
+        log("请运行以下命令安装依赖:")
+        log("pip install -r requirements.txt")
         sys.exit(1)
     else:
-        print("✅ 所有依赖包已安装")
+        log("✅ 所有依赖包已安装")
 
 
-def extract_page_data(url):
-    """提取页面数据"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # 提取标题
-        title_element = soup.find('h1', class_='sppb-addon-title')
-        title = title_element.get_text(strip=True) if title_element else "未知标题"
-        
-        # 提取介绍文本
-        intro_text = ""
-        if title_element and title_element.parent:
-            content_div = title_element.parent.find('div', class_='sppb-addon-content')
-            if content_div:
-                intro_text = content_div.get_text(strip=True)
-        
-        # 提取版本信息
-        versions = []
-        
-        # 查找所有section，每个section包含一个版本的信息
-        sections = soup.find_all('section')
+_default_client = None
+
+
+def get_default_client():
+    """未显式传入客户端时使用的共享 HttpClient（带默认限速）"""
+    global _default_client
+    if _default_client is None:
+        _default_client = HttpClient(HostRateLimiter())
+    return _default_client
+
+
+def fetch_page(url, client=None, extra_headers=None, log=print):
+    """请求页面，返回响应对象；304 未修改不视为错误"""
+    client = client or get_default_client()
+    response = client.get(url, headers=extra_headers, log=log)
+    response.raise_for_status()
+    return response
+
+
+def _has_class(tag, class_name):
+    return class_name in (tag.get('class') or ())
+
+
+def _iter_tags(root):
+    """深度优先遍历 root 下的所有标签，产出 (标签, 是否为进入事件)
+
+    进入顺序即文档顺序；每个标签在其子树遍历完后再产出一次离开事件。
+    """
+    from bs4 import Tag
+
+    stack = [(root, iter(root.contents))]
+    while stack:
+        tag, children = stack[-1]
+        for child in children:
+            if isinstance(child, Tag):
+                yield child, True
+                stack.append((child, iter(child.contents)))
+                break
+        else:
+            stack.pop()
+            if tag is not root:
+                yield tag, False
+
+
+def _collect_attributes(h3_element):
+    """提取属性信息（h3后面的文本，直到下一个h3或section结束）"""
+    attributes = []
+    current_element = h3_element.next_sibling
+    while current_element and current_element.name != 'h3':
+        if hasattr(current_element, 'get_text'):
+            text = current_element.get_text(strip=True)
+            if text and text not in ['', '迅雷下载：']:
+                attributes.append(text)
+        current_element = current_element.next_sibling
+    return attributes
+
+
+def parse_page_html(html, url, parser=DEFAULT_PARSER):
+    """从页面 HTML 中解析数据
+
+    只遍历一次文档树：遍历过程中记录最近出现的 <strong>（当前下载类型）
+    以及当前所在的各层 section（当前版本），结果与逐个 section 调用
+    find_all / find_previous('strong') 的写法完全一致。
+    parser 为 PARSER_BACKENDS 之一，lxml-direct 不经过 BeautifulSoup。
+    结果中的属性和下载链接会补充结构化字段（见 metadata.enrich_page_data）。
+    """
+    # 解析库按需导入，不解析页面的命令（index、render 等）启动时不需要加载
+    if parser == 'lxml-direct':
+        import lxml_backend
+        return enrich_page_data(lxml_backend.parse_page_html(html, url))
+    if parser not in PARSER_BACKENDS:
+        raise ValueError(f"未知的解析后端: {parser}")
+    from bs4 import BeautifulSoup
+    # 不使用 SoupStrainer：简介需要标题 h1 的父元素，下载类型的 <strong> 可能在 section 之外，
+    # 而过滤只快约 10%（见 README 基准测试一节），按子树解析由 lxml-direct 负责
+    soup = BeautifulSoup(html, parser)
+    
+    title_element = None
+    current_download_type = None
+    # 按文档顺序记录所有 section：[首个 h3, 下载列表]
+    section_records = []
+    # 当前所在的各层 section，以及其中尚未遇到 h3 的部分
+    open_sections = []
+    sections_without_h3 = []
+    
+    for tag, entering in _iter_tags(soup):
+        name = tag.name
+        if not entering:
+            if name == 'section':
+                record = open_sections.pop()
+                if sections_without_h3 and sections_without_h3[-1] is record:
+                    sections_without_h3.pop()
+            continue
         
-        for section in sections:
-            version_info = {}
-            
-            # 查找版本标题（h3标签）
-            h3_element = section.find('h3')
-            if h3_element:
-                version_info['version_text'] = h3_element.get_text(strip=True)
-                
-                # 提取属性信息（h3后面的文本，直到下一个h3或section结束）
-                attributes = []
-                current_element = h3_element.next_sibling
-                while current_element and current_element.name != 'h3':
-                    if hasattr(current_element, 'get_text'):
-                        text = current_element.get_text(strip=True)
-                        if text and text not in ['', '迅雷下载：']:
-                            attributes.append(text)
-                    current_element = current_element.next_sibling
-                
-                version_info['attributes'] = attributes
-                
-                # 查找下载信息
-                downloads = []
-                
-                # 查找下载链接
-                dl_links = section.find_all('div', class_='dl-link')
-                for dl_link in dl_links:
-                    download_info = {}
-                    download_info['download_url'] = dl_link.get_text(strip=True)
-                    
-                    # 查找对应的下载类型
-                    strong_element = dl_link.find_previous('strong')
-                    if strong_element:
-                        download_info['download_type'] = strong_element.get_text(strip=True)
-                    else:
-                        download_info['download_type'] = "下载"
-                    
-                    if download_info['download_url']:
-                        downloads.append(download_info)
-                
-                version_info['downloads'] = downloads
-                
-                if version_info['version_text'] and (version_info['attributes'] or version_info['downloads']):
-                    versions.append(version_info)
+        if name == 'section':
+            record = [None, []]
+            section_records.append(record)
+            open_sections.append(record)
+            sections_without_h3.append(record)
+        elif name == 'h3':
+            # section.find('h3') 取的是 section 内第一个 h3
+            for record in sections_without_h3:
+                record[0] = tag
+            sections_without_h3.clear()
+        elif name == 'strong':
+            current_download_type = tag.get_text(strip=True)
+        elif name == 'h1':
+            if title_element is None and _has_class(tag, 'sppb-addon-title'):
+                title_element = tag
+        elif name == 'div' and open_sections and _has_class(tag, 'dl-link'):
+            download_url = tag.get_text(strip=True)
+            if download_url:
+                download_type = current_download_type if current_download_type is not None else "下载"
+                # 嵌套的 section 都包含这个下载链接
+                for record in open_sections:
+                    record[1].append({
+                        'download_url': download_url,
+                        'download_type': download_type
+                    })
+    
+    # 提取标题
+    title = title_element.get_text(strip=True) if title_element else "未知标题"
+    
+    # 提取介绍文本
+    intro_text = ""
+    if title_element and title_element.parent:
+        content_div = title_element.parent.find('div', class_='sppb-addon-content')
+        if content_div:
+            intro_text = content_div.get_text(strip=True)
+    
+    # 提取版本信息，每个section包含一个版本的信息
+    versions = []
+    attributes_by_h3 = {}
+    for h3_element, downloads in section_records:
+        if h3_element is None:
+            continue
+        version_text = h3_element.get_text(strip=True)
         
-        return {
-            'title': title,
-            'intro_text': intro_text,
-            'versions': versions,
-            'url': url
-        }
+        # 嵌套 section 可能共用同一个 h3，属性只提取一次
+        key = id(h3_element)
+        if key not in attributes_by_h3:
+            attributes_by_h3[key] = _collect_attributes(h3_element)
+        attributes = list(attributes_by_h3[key])
         
+        if version_text and (attributes or downloads):
+            versions.append({
+                'version_text': version_text,
+                'attributes': attributes,
+                'downloads': downloads
+            })
+    
+    return enrich_page_data({
+        'title': title,
+        'intro_text': intro_text,
+        'versions': versions,
+        'url': url
+    })
+
+
+def record_fetch_metrics(metrics, url, response):
+    """记录最后一次请求的 TTFB 和响应体字节数"""
+    if metrics is not None:
+        metrics.record(url, 'ttfb', response.elapsed.total_seconds())
+        metrics.record_bytes(url, 'fetch', len(response.content))
+
+
+def extract_page_data(url, client=None, log=print, parser=DEFAULT_PARSER, metrics=None):
+    """提取页面数据；传入 metrics（RunMetrics）时记录请求和解析耗时"""
+    try:
+        with stage_timer(metrics, url, 'fetch'):
+            response = fetch_page(url, client, log=log)
+        record_fetch_metrics(metrics, url, response)
+        with stage_timer(metrics, url, 'parse'):
+            return parse_page_html(response.text, url, parser)
     except Exception as e:
-        print(f"提取页面数据时出错 {url}: {e}")
+        log(f"提取页面数据时出错 {url}: {e}")
         return None
 
 
@@ -174,137 +356,584 @@ def render_download_section(download: dict) -> str:
     )
 
 
-def generate_html_content(data):
-    """生成HTML内容"""
+# 所有页面共用的样式和脚本，构建时以内容哈希命名写入 docs/assets/，页面通过相对路径引用
+SITE_CSS = """\
+/* 通用样式与详情页 */
+body {
+    font-family: Arial, sans-serif;
+    max-width: 1200px;
+    margin: 0 auto;
+    padding: 20px;
+    background-color: #f5f5f5;
+}
+.container {
+    background-color: white;
+    padding: 30px;
+    border-radius: 10px;
+    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+}
+h1 {
+    color: #333;
+    border-bottom: 3px solid #0078d4;
+    padding-bottom: 10px;
+}
+.intro {
+    background-color: #f8f9fa;
+    padding: 20px;
+    border-radius: 5px;
+    margin: 20px 0;
+    line-height: 1.6;
+}
+.version {
+    border: 1px solid #ddd;
+    margin: 20px 0;
+    border-radius: 5px;
+    overflow: hidden;
+}
+.version-header {
+    background-color: #0078d4;
+    color: white;
+    padding: 15px;
+    font-weight: bold;
+}
+.version-attributes {
+    padding: 15px;
+    background-color: #f8f9fa;
+}
+.download-section {
+    padding: 15px;
+    border-top: 1px solid #ddd;
+}
+.download-type {
+    font-weight: bold;
+    color: #0078d4;
+    margin-bottom: 10px;
+}
+.download-url {
+    background-color: #f8f9fa;
+    padding: 10px;
+    border-radius: 3px;
+    font-family: monospace;
+    word-break: break-all;
+    margin: 10px 0;
+}
+.copy-btn {
+    background-color: #28a745;
+    color: white;
+    border: none;
+    padding: 8px 16px;
+    border-radius: 4px;
+    cursor: pointer;
+    margin-left: 10px;
+}
+.copy-btn:hover {
+    background-color: #218838;
+}
+.download-btn {
+    background-color: #007bff;
+    color: white;
+    border: none;
+    padding: 8px 16px;
+    border-radius: 4px;
+    cursor: pointer;
+    margin-left: 10px;
+}
+.download-btn:hover {
+    background-color: #0056b3;
+}
+.thunder-btn {
+    background-color: #ff6b35;
+    color: white;
+    border: none;
+    padding: 8px 16px;
+    border-radius: 4px;
+    cursor: pointer;
+    margin-left: 10px;
+}
+.thunder-btn:hover {
+    background-color: #e55a2b;
+}
+
+/* 汇总页 */
+.index-page h1 {
+    text-align: center;
+}
+.search-section {
+    background-color: #f8f9fa;
+    padding: 20px;
+    border-radius: 8px;
+    margin-bottom: 20px;
+}
+.search-input {
+    width: 100%;
+    padding: 12px;
+    border: 2px solid #ddd;
+    border-radius: 5px;
+    font-size: 16px;
+    margin-bottom: 10px;
+}
+.search-input:focus {
+    outline: none;
+    border-color: #0078d4;
+}
+.search-options {
+    display: flex;
+    gap: 15px;
+    flex-wrap: wrap;
+}
+.search-option {
+    display: flex;
+    align-items: center;
+    gap: 5px;
+}
+.search-option input[type="checkbox"] {
+    margin: 0;
+}
+.category {
+    margin: 30px 0;
+    border: 1px solid #ddd;
+    border-radius: 8px;
+    overflow: hidden;
+}
+.category-header {
+    background-color: #0078d4;
+    color: white;
+    padding: 15px 20px;
+    font-weight: bold;
+    font-size: 18px;
+}
+.category-content {
+    padding: 20px;
+}
+.link-grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
+    gap: 15px;
+}
+.link-item {
+    background-color: #f8f9fa;
+    padding: 15px;
+    border-radius: 5px;
+    border: 1px solid #e9ecef;
+    transition: all 0.3s ease;
+}
+.link-item:hover {
+    transform: translateY(-2px);
+    box-shadow: 0 4px 8px rgba(0,0,0,0.1);
+}
+.link-item.hidden {
+    display: none;
+}
+.link-title {
+    font-weight: bold;
+    color: #0078d4;
+    margin-bottom: 8px;
+    font-size: 14px;
+}
+.link-url {
+    color: #666;
+    font-size: 12px;
+    word-break: break-all;
+    margin-bottom: 10px;
+}
+.link-btn {
+    background-color: #28a745;
+    color: white;
+    border: none;
+    padding: 6px 12px;
+    border-radius: 4px;
+    cursor: pointer;
+    font-size: 12px;
+    text-decoration: none;
+    display: inline-block;
+}
+.link-btn:hover {
+    background-color: #218838;
+    color: white;
+    text-decoration: none;
+}
+.stats {
+    background-color: #e9ecef;
+    padding: 15px;
+    border-radius: 5px;
+    margin-bottom: 20px;
+    text-align: center;
+}
+.stats-number {
+    font-size: 24px;
+    font-weight: bold;
+    color: #0078d4;
+}
+.no-results {
+    text-align: center;
+    padding: 40px;
+    color: #666;
+    font-size: 18px;
+}
+.category-more {
+    margin-top: 15px;
+    text-align: right;
+}
+.category-more a,
+.pagination a {
+    color: #0078d4;
+    text-decoration: none;
+}
+.pagination {
+    display: flex;
+    flex-wrap: wrap;
+    gap: 8px;
+    justify-content: center;
+    margin: 20px 0;
+}
+.pagination a,
+.pagination span {
+    padding: 6px 12px;
+    border: 1px solid #ddd;
+    border-radius: 4px;
+}
+.pagination .current {
+    background-color: #0078d4;
+    border-color: #0078d4;
+    color: white;
+}
+.search-summary {
+    color: #666;
+    margin-bottom: 15px;
+}
+.back-link {
+    display: inline-block;
+    margin-bottom: 20px;
+    color: #0078d4;
+    text-decoration: none;
+}
+"""
+
+SITE_JS = """\
+function copyToClipboard(text) {
+    if (!text) return;
+
+    navigator.clipboard.writeText(text).then(function() {
+        const btn = event.target;
+        const originalText = btn.textContent;
+        btn.textContent = '已复制!';
+        btn.style.backgroundColor = '#6c757d';
+
+        setTimeout(function() {
+            btn.textContent = originalText;
+            btn.style.backgroundColor = btn.classList.contains('thunder-btn') ? '#ff6b35' : '#28a745';
+        }, 2000);
+    }).catch(function(err) {
+        const textArea = document.createElement('textarea');
+        textArea.value = text;
+        document.body.appendChild(textArea);
+        textArea.select();
+        document.execCommand('copy');
+        document.body.removeChild(textArea);
+
+        const btn = event.target;
+        const originalText = btn.textContent;
+        btn.textContent = '已复制!';
+        btn.style.backgroundColor = '#6c757d';
+
+        setTimeout(function() {
+            btn.textContent = originalText;
+            btn.style.backgroundColor = btn.classList.contains('thunder-btn') ? '#ff6b35' : '#28a745';
+        }, 2000);
+    });
+}
+
+function openDownloadLink(url) {
+    if (url) {
+        window.open(url, '_blank');
+    }
+}
+
+// 汇总页搜索：首次使用时加载 search-index.json（倒排索引），查询只做二分查找和集合运算
+let searchIndex = null;
+let searchIndexRequest = null;
+let linkItems = null;
+
+function getLinkItems() {
+    if (!linkItems) {
+        linkItems = Array.from(document.querySelectorAll('.link-item')).map(function(element) {
+            return {
+                element: element,
+                path: element.getAttribute('data-path'),
+                text: [
+                    element.getAttribute('data-title'),
+                    element.getAttribute('data-url'),
+                    element.getAttribute('data-path')
+                ].join(' ').toLowerCase(),
+                hidden: element.classList.contains('hidden')
+            };
+        });
+    }
+    return linkItems;
+}
+
+function loadSearchIndex() {
+    if (searchIndexRequest) return searchIndexRequest;
+    const input = document.getElementById('searchInput');
+    const url = input ? input.getAttribute('data-index') : null;
+    if (!url || !window.fetch) {
+        searchIndexRequest = Promise.resolve(null);
+        return searchIndexRequest;
+    }
+    searchIndexRequest = fetch(url)
+        .then(function(response) { return response.ok ? response.json() : null; })
+        .then(function(index) {
+            searchIndex = index;
+            if (index && document.getElementById('searchInput').value) filterItems();
+            return index;
+        })
+        .catch(function() { return null; });
+    return searchIndexRequest;
+}
+
+// 与 search_index.tokenize 相同的切分规则；中文查询使用二字组合，单字时使用单字
+function tokenizeQuery(text) {
+    const runs = text.toLowerCase().match(/[0-9a-z]+|[\\u3400-\\u9fff\\uf900-\\ufaff]+/g) || [];
+    const tokens = [];
+    runs.forEach(function(run, runIndex) {
+        if (/^[0-9a-z]/.test(run)) {
+            // 最后一个英文词按前缀匹配，便于边输入边搜索
+            tokens.push({ term: run, prefix: runIndex === runs.length - 1 });
+        } else if (run.length === 1) {
+            tokens.push({ term: run, prefix: false });
+        } else {
+            for (let i = 0; i + 1 < run.length; i++) {
+                tokens.push({ term: run.slice(i, i + 2), prefix: false });
+            }
+        }
+    });
+    return tokens;
+}
+
+function lowerBound(terms, term) {
+    let low = 0;
+    let high = terms.length;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (terms[mid] < term) low = mid + 1; else high = mid;
+    }
+    return low;
+}
+
+function lookupToken(field, token, result) {
+    const terms = field.terms;
+    let i = lowerBound(terms, token.term);
+    if (!token.prefix) {
+        if (i < terms.length && terms[i] === token.term) {
+            field.postings[i].forEach(function(docId) { result.add(docId); });
+        }
+        return;
+    }
+    for (let scanned = 0; i < terms.length && scanned < 500 && terms[i].startsWith(token.term); i++, scanned++) {
+        field.postings[i].forEach(function(docId) { result.add(docId); });
+    }
+}
+
+// 返回匹配的页面路径集合；每个查询词在任一选中字段中出现即可，多个词之间取交集
+function searchIndexFor(query, fieldNames) {
+    const tokens = tokenizeQuery(query);
+    if (tokens.length === 0) return null;
+    let matched = null;
+    for (const token of tokens) {
+        const docIds = new Set();
+        fieldNames.forEach(function(name) { lookupToken(searchIndex.fields[name], token, docIds); });
+        if (matched === null) {
+            matched = docIds;
+        } else {
+            matched = new Set(Array.from(matched).filter(function(docId) { return docIds.has(docId); }));
+        }
+        if (matched.size === 0) break;
+    }
+    return new Set(Array.from(matched, function(docId) { return searchIndex.docs[docId]; }));
+}
+
+// 汇总页每个分类只列出第一页，搜索结果直接由索引中的路径和标题生成，最多显示 SEARCH_RESULT_LIMIT 个
+const SEARCH_RESULT_LIMIT = 200;
+
+function renderSearchResults(matchedPaths) {
+    const container = document.getElementById('searchResults');
+    const categories = document.getElementById('categories');
+    container.textContent = '';
+    if (matchedPaths === null) {
+        container.style.display = 'none';
+        categories.style.display = '';
+        return 0;
+    }
+    categories.style.display = 'none';
+    container.style.display = '';
+    const matched = [];
+    searchIndex.docs.forEach(function(path, docId) {
+        if (matchedPaths.has(path)) matched.push(docId);
+    });
+    if (matched.length === 0) return 0;
+
+    const summary = document.createElement('div');
+    summary.className = 'search-summary';
+    summary.textContent = matched.length > SEARCH_RESULT_LIMIT
+        ? '找到 ' + matched.length + ' 个资源，显示前 ' + SEARCH_RESULT_LIMIT + ' 个'
+        : '找到 ' + matched.length + ' 个资源';
+    const grid = document.createElement('div');
+    grid.className = 'link-grid';
+    matched.slice(0, SEARCH_RESULT_LIMIT).forEach(function(docId) {
+        const item = document.createElement('div');
+        item.className = 'link-item';
+        const title = document.createElement('div');
+        title.className = 'link-title';
+        title.textContent = searchIndex.titles[docId];
+        const link = document.createElement('a');
+        link.className = 'link-btn';
+        link.href = searchIndex.docs[docId] + '/index.html';
+        link.target = '_blank';
+        link.textContent = '查看详情';
+        item.appendChild(title);
+        item.appendChild(link);
+        grid.appendChild(item);
+    });
+    container.appendChild(summary);
+    container.appendChild(grid);
+    return matched.length;
+}
+
+function filterItems() {
+    const searchTerm = document.getElementById('searchInput').value.toLowerCase().trim();
+    const fieldNames = [];
+    if (document.getElementById('searchTitle').checked) fieldNames.push('t');
+    if (document.getElementById('searchIntro').checked) fieldNames.push('i');
+    if (document.getElementById('searchDetails').checked) fieldNames.push('d');
+
+    if (searchTerm !== '' && !searchIndex) loadSearchIndex();
+
+    let matchedPaths = null;
+    if (searchTerm !== '' && searchIndex) {
+        // 查询中没有可索引的词（例如只有符号）时退回简单匹配
+        matchedPaths = searchIndexFor(searchTerm, fieldNames);
+    }
+
+    let visibleCount = renderSearchResults(matchedPaths);
+    getLinkItems().forEach(function(item) {
+        let visible;
+        if (searchTerm === '' || matchedPaths) {
+            visible = true;
+        } else {
+            // 索引尚未加载完成时，先在当前页面列出的条目中按标题、链接和路径做简单匹配
+            visible = fieldNames.length > 0 && item.text.includes(searchTerm);
+        }
+        if (visible && !matchedPaths) visibleCount++;
+        if (item.hidden === visible) {
+            item.element.classList.toggle('hidden', !visible);
+            item.hidden = !visible;
+        }
+    });
+
+    // 显示/隐藏"无结果"消息
+    const noResults = document.getElementById('noResults');
+    if (visibleCount === 0 && searchTerm !== '') {
+        noResults.style.display = 'block';
+    } else {
+        noResults.style.display = 'none';
+    }
+}
+"""
+
+
+def _asset_filename(stem, content, ext):
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:10]
+    return f"{stem}.{digest}.{ext}"
+
+
+SITE_CSS_FILE = _asset_filename('site', SITE_CSS, 'css')
+SITE_JS_FILE = _asset_filename('site', SITE_JS, 'js')
+# docs/assets/ 中的共享资源文件名，以及页面中对它们的引用
+SITE_ASSET_PATTERN = re.compile(r'site\.[0-9a-f]{10}\.(?:css|js)')
+SITE_ASSET_REFERENCE = re.compile(r'assets/(site\.[0-9a-f]{10}\.(?:css|js))')
+
+# 汇总页每个分类列出的条目数，也是分类页每页的条目数
+INDEX_PAGE_SIZE = 100
+# 分类页所在目录：categories/<slug>/index.html、page-2.html ……
+CATEGORY_DIR = 'categories'
+
+# docs/ 下由 generate_index_html 生成的文件和目录
+INDEX_OUTPUTS = ['index.html', SEARCH_INDEX_FILENAME, FEED_JSON_FILENAME, FEED_ATOM_FILENAME] + [f"{CATEGORY_DIR}/{slug}" for slug in category_slugs()]
+
+# 页面模板版本：修改 generate_html_content / render_index_html 的输出时加一；
+# 样式和脚本的变化已经体现在带哈希的资源文件名中
+RENDER_VERSION = 4
+TEMPLATE_VERSION = f"{RENDER_VERSION}:{SITE_CSS_FILE}:{SITE_JS_FILE}"
+
+# 解析结果版本：修改 parse_page_html / metadata.enrich_page_data 的输出时加一，使解析结果缓存（memo）失效
+PARSE_VERSION = 1
+
+
+def write_site_assets():
+    """把共享样式和脚本写入 docs/assets/（文件名带内容哈希，已存在时跳过）
+
+    旧版本的资源文件在汇总页生成后由 prune_site_assets 清理。
+    """
+    assets_dir = os.path.join(DOCS_DIR, 'assets')
+    os.makedirs(assets_dir, exist_ok=True)
+    for filename, content in ((SITE_CSS_FILE, SITE_CSS), (SITE_JS_FILE, SITE_JS)):
+        path = os.path.join(assets_dir, filename)
+        if not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+
+def prune_site_assets():
+    """删除 docs/assets/ 中已没有任何页面引用的旧版本样式和脚本，返回删除的文件名
+
+    模板没有变化时 assets/ 中只有当前版本的文件，不需要扫描页面；
+    否则读取 docs/ 下全部 HTML，尚未用新模板重新生成的页面引用的旧文件会保留。
+    """
+    assets_dir = os.path.join(DOCS_DIR, 'assets')
+    try:
+        names = os.listdir(assets_dir)
+    except OSError:
+        return []
+    candidates = {name for name in names if SITE_ASSET_PATTERN.fullmatch(name)} - {SITE_CSS_FILE, SITE_JS_FILE}
+    if not candidates:
+        return []
+    referenced = set()
+    for dirpath, _, filenames in os.walk(DOCS_DIR):
+        for filename in filenames:
+            if filename.endswith('.html'):
+                with open(os.path.join(dirpath, filename), 'r', encoding='utf-8', errors='replace') as f:
+                    referenced.update(SITE_ASSET_REFERENCE.findall(f.read()))
+    stale = sorted(candidates - referenced)
+    for name in stale:
+        os.remove(os.path.join(assets_dir, name))
+    return stale
+
+
+def asset_prefix_for_path(path):
+    """docs/ 下某个页面目录到 docs/ 根目录的相对路径前缀"""
+    depth = len([part for part in path.split('/') if part])
+    return '../' * depth
+
+
+def iter_html_content(data):
+    """逐块产出详情页 HTML，拼接结果与 generate_html_content 相同"""
     # 确保数据完整性
     if not data:
-        return "<html><body><h1>数据提取失败</h1></body></html>"
+        yield "<html><body><h1>数据提取失败</h1></body></html>"
+        return
     
     title = data.get('title', '未知标题')
     intro_text = data.get('intro_text', '')
-    versions = data.get('versions', [])
-
-    # 先构造版本区块 HTML，避免在 f-string 表达式内嵌套复杂列表推导
-    version_sections: list[str] = []
-    for version in versions:
-        version_text = version.get('version_text', '未知版本')
-        attributes_html = ''.join(f'<div>{attr}</div>' for attr in version.get('attributes', []))
-        downloads_html = ''.join(render_download_section(d) for d in version.get('downloads', []))
-        section_html = (
-            '\n        <div class="version">\n'
-            f'            <div class="version-header">{version_text}</div>\n'
-            '            <div class="version-attributes">\n'
-            f'                {attributes_html}\n'
-            '            </div>\n'
-            f'            {downloads_html}'
-            '        </div>\n'
-        )
-        version_sections.append(section_html)
-    versions_html = ''.join(version_sections)
+    asset_prefix = asset_prefix_for_path(parse_url_to_path(data.get('url', '')))
     
-    html_template = f"""
+    yield f"""
 <!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{title}</title>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }}
-        .container {{
-            background-color: white;
-            padding: 30px;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        h1 {{
-            color: #333;
-            border-bottom: 3px solid #0078d4;
-            padding-bottom: 10px;
-        }}
-        .intro {{
-            background-color: #f8f9fa;
-            padding: 20px;
-            border-radius: 5px;
-            margin: 20px 0;
-            line-height: 1.6;
-        }}
-        .version {{
-            border: 1px solid #ddd;
-            margin: 20px 0;
-            border-radius: 5px;
-            overflow: hidden;
-        }}
-        .version-header {{
-            background-color: #0078d4;
-            color: white;
-            padding: 15px;
-            font-weight: bold;
-        }}
-        .version-attributes {{
-            padding: 15px;
-            background-color: #f8f9fa;
-        }}
-        .download-section {{
-            padding: 15px;
-            border-top: 1px solid #ddd;
-        }}
-        .download-type {{
-            font-weight: bold;
-            color: #0078d4;
-            margin-bottom: 10px;
-        }}
-        .download-url {{
-            background-color: #f8f9fa;
-            padding: 10px;
-            border-radius: 3px;
-            font-family: monospace;
-            word-break: break-all;
-            margin: 10px 0;
-        }}
-        .copy-btn {{
-            background-color: #28a745;
-            color: white;
-            border: none;
-            padding: 8px 16px;
-            border-radius: 4px;
-            cursor: pointer;
-            margin-left: 10px;
-        }}
-        .copy-btn:hover {{
-            background-color: #218838;
-        }}
-        .download-btn {{
-            background-color: #007bff;
-            color: white;
-            border: none;
-            padding: 8px 16px;
-            border-radius: 4px;
-            cursor: pointer;
-            margin-left: 10px;
-        }}
-        .download-btn:hover {{
-            background-color: #0056b3;
-        }}
-        .thunder-btn {{
-            background-color: #ff6b35;
-            color: white;
-            border: none;
-            padding: 8px 16px;
-            border-radius: 4px;
-            cursor: pointer;
-            margin-left: 10px;
-        }}
-        .thunder-btn:hover {{
-            background-color: #e55a2b;
-        }}
-    </style>
+    <link rel="stylesheet" href="{asset_prefix}assets/{SITE_CSS_FILE}">
 </head>
 <body>
     <div class="container">
@@ -314,397 +943,1420 @@ def generate_html_content(data):
             {intro_text}
         </div>
         
-        {versions_html}
+        """
+    for version in data.get('versions', []):
+        version_text = version.get('version_text', '未知版本')
+        attributes_html = ''.join(f'<div>{attr}</div>' for attr in version.get('attributes', []))
+        yield (
+            '\n        <div class="version">\n'
+            f'            <div class="version-header">{version_text}</div>\n'
+            '            <div class="version-attributes">\n'
+            f'                {attributes_html}\n'
+            '            </div>\n'
+            '            '
+        )
+        for download in version.get('downloads', []):
+            yield render_download_section(download)
+        yield '        </div>\n'
+    yield f"""
     </div>
 
-    <script>
-        function copyToClipboard(text) {{
-            if (!text) return;
-            
-            navigator.clipboard.writeText(text).then(function() {{
-                const btn = event.target;
-                const originalText = btn.textContent;
-                btn.textContent = '已复制!';
-                btn.style.backgroundColor = '#6c757d';
-                
-                setTimeout(function() {{
-                    btn.textContent = originalText;
-                    btn.style.backgroundColor = btn.classList.contains('thunder-btn') ? '#ff6b35' : '#28a745';
-                }}, 2000);
-            }}).catch(function(err) {{
-                const textArea = document.createElement('textarea');
-                textArea.value = text;
-                document.body.appendChild(textArea);
-                textArea.select();
-                document.execCommand('copy');
-                document.body.removeChild(textArea);
-                
-                const btn = event.target;
-                const originalText = btn.textContent;
-                btn.textContent = '已复制!';
-                btn.style.backgroundColor = '#6c757d';
-                
-                setTimeout(function() {{
-                    btn.textContent = originalText;
-                    btn.style.backgroundColor = btn.classList.contains('thunder-btn') ? '#ff6b35' : '#28a745';
-                }}, 2000);
-            }});
-        }}
-        
-        function openDownloadLink(url) {{
-            if (url) {{
-                window.open(url, '_blank');
-            }}
-        }}
-    </script>
+    <script src="{asset_prefix}assets/{SITE_JS_FILE}"></script>
 </body>
 </html>
 """
-    return html_template
 
 
-def generate_index_html():
-    """生成汇总页面"""
-    # 读取所有链接
-    with open(os.path.join(DOCS_DIR, 'a.txt'), 'r', encoding='utf-8') as f:
-        links = [line.strip() for line in f.readlines()]
-    
-    # 按分类组织链接
-    categories = {
-        'Office 系列': [],
-        'Windows 早期版本': [],
-        'SQL Server 系列': [],
-        'Windows 10 系列': [],
-        'Windows 11 系列': [],
-        'Windows Server 系列': []
-    }
-    
-    for link in links:
-        if 'applications/office' in link:
-            categories['Office 系列'].append(link)
-        elif 'operating-systems/windows' in link:
-            categories['Windows 早期版本'].append(link)
-        elif 'servers/sql-server' in link:
-            categories['SQL Server 系列'].append(link)
-        elif 'windows-10/win10' in link:
-            categories['Windows 10 系列'].append(link)
-        elif 'windows-11/win11' in link:
-            categories['Windows 11 系列'].append(link)
-        elif 'windows-server/windows-server' in link:
-            categories['Windows Server 系列'].append(link)
-    
-    # 构造分类 HTML
-    category_blocks: list[str] = []
-    for category_name, category_links in categories.items():
-        if not category_links:
-            continue
-        link_items: list[str] = []
-        for link in category_links:
-            path = parse_url_to_path(link)
-            title_text = path.split('/')[-1].replace('-', ' ').title()
-            href = f"{path}/index.html"
-            replaced_url = link.replace('https://www.imsdn.cn/', 'https://windows.unblock.win/')
-            item_html = (
-                '\n                    <div class="link-item" '
-                f' data-title="{title_text}"'
-                f' data-url="{replaced_url}"'
-                f' data-path="{path}">\n'
-                f'                        <div class="link-title">{title_text}</div>\n'
-                f'                        <a href="{href}" class="link-btn" target="_blank">查看详情</a>\n'
-                '                    </div>\n'
-            )
-            link_items.append(item_html)
-        links_html = ''.join(link_items)
-        category_html = (
-            '\n        <div class="category">\n'
-            f'            <div class="category-header">{category_name}</div>\n'
-            '            <div class="category-content">\n'
-            '                <div class="link-grid">\n'
-            f'                    {links_html}\n'
-            '                </div>\n'
-            '            </div>\n'
-            '        </div>\n'
+def generate_html_content(data):
+    """生成HTML内容"""
+    return ''.join(iter_html_content(data))
+
+
+def category_page_path(slug, page):
+    """分类页第 page 页（从 1 开始）相对于 docs/ 的路径"""
+    filename = 'index.html' if page == 1 else f"page-{page}.html"
+    return f"{CATEGORY_DIR}/{slug}/{filename}"
+
+
+def paginate(entries, page_size=INDEX_PAGE_SIZE):
+    """把条目按 page_size 分页，至少返回一页"""
+    return [entries[i:i + page_size] for i in range(0, len(entries), page_size)] or [[]]
+
+
+def _iter_link_items(entries, prefix=''):
+    """逐个产出汇总页 / 分类页的条目；prefix 为到 docs/ 根目录的相对路径前缀"""
+    for path, link, title in entries:
+        title_text = html.escape(title)
+        replaced_url = html.escape(link.replace('https://www.imsdn.cn/', 'https://windows.unblock.win/'))
+        yield (
+            '\n                    <div class="link-item" '
+            f' data-title="{title_text}"'
+            f' data-url="{replaced_url}"'
+            f' data-path="{html.escape(path)}">\n'
+            f'                        <div class="link-title">{title_text}</div>\n'
+            f'                        <a href="{prefix}{html.escape(path)}/index.html" class="link-btn" target="_blank">查看详情</a>\n'
+            '                    </div>\n'
         )
-        category_blocks.append(category_html)
-    categories_html = ''.join(category_blocks)
-    
-    # 生成HTML内容
-    html_template = f"""
+
+
+def iter_index_html(entries, search_index_url=None, page_size=INDEX_PAGE_SIZE):
+    """逐块产出汇总页面 HTML，拼接结果与 render_index_html 相同
+
+    entries 为 [(页面路径, 链接, 标题)]；每个分类只列出前 page_size 个条目，
+    其余条目在分类页中分页列出，搜索结果由搜索索引在浏览器中生成。
+    链接较多时配合 write_output 直接写入文件，不需要在内存中拼出整个页面。
+    """
+    search_index_attr = f' data-index="{search_index_url}"' if search_index_url else ''
+    yield f"""
 <!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Microsoft 资源下载中心</title>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }}
-        .container {{
-            background-color: white;
-            padding: 30px;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        h1 {{
-            color: #333;
-            border-bottom: 3px solid #0078d4;
-            padding-bottom: 10px;
-            text-align: center;
-        }}
-        .search-section {{
-            background-color: #f8f9fa;
-            padding: 20px;
-            border-radius: 8px;
-            margin-bottom: 20px;
-        }}
-        .search-input {{
-            width: 100%;
-            padding: 12px;
-            border: 2px solid #ddd;
-            border-radius: 5px;
-            font-size: 16px;
-            margin-bottom: 10px;
-        }}
-        .search-input:focus {{
-            outline: none;
-            border-color: #0078d4;
-        }}
-        .search-options {{
-            display: flex;
-            gap: 15px;
-            flex-wrap: wrap;
-        }}
-        .search-option {{
-            display: flex;
-            align-items: center;
-            gap: 5px;
-        }}
-        .search-option input[type="checkbox"] {{
-            margin: 0;
-        }}
-        .category {{
-            margin: 30px 0;
-            border: 1px solid #ddd;
-            border-radius: 8px;
-            overflow: hidden;
-        }}
-        .category-header {{
-            background-color: #0078d4;
-            color: white;
-            padding: 15px 20px;
-            font-weight: bold;
-            font-size: 18px;
-        }}
-        .category-content {{
-            padding: 20px;
-        }}
-        .link-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-            gap: 15px;
-        }}
-        .link-item {{
-            background-color: #f8f9fa;
-            padding: 15px;
-            border-radius: 5px;
-            border: 1px solid #e9ecef;
-            transition: all 0.3s ease;
-        }}
-        .link-item:hover {{
-            transform: translateY(-2px);
-            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-        }}
-        .link-item.hidden {{
-            display: none;
-        }}
-        .link-title {{
-            font-weight: bold;
-            color: #0078d4;
-            margin-bottom: 8px;
-            font-size: 14px;
-        }}
-        .link-url {{
-            color: #666;
-            font-size: 12px;
-            word-break: break-all;
-            margin-bottom: 10px;
-        }}
-        .link-btn {{
-            background-color: #28a745;
-            color: white;
-            border: none;
-            padding: 6px 12px;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 12px;
-            text-decoration: none;
-            display: inline-block;
-        }}
-        .link-btn:hover {{
-            background-color: #218838;
-            color: white;
-            text-decoration: none;
-        }}
-        .stats {{
-            background-color: #e9ecef;
-            padding: 15px;
-            border-radius: 5px;
-            margin-bottom: 20px;
-            text-align: center;
-        }}
-        .stats-number {{
-            font-size: 24px;
-            font-weight: bold;
-            color: #0078d4;
-        }}
-        .no-results {{
-            text-align: center;
-            padding: 40px;
-            color: #666;
-            font-size: 18px;
-        }}
-    </style>
+    <link rel="stylesheet" href="assets/{SITE_CSS_FILE}">
+    <link rel="alternate" type="application/atom+xml" title="版本更新" href="{FEED_ATOM_FILENAME}">
+    <link rel="alternate" type="application/feed+json" title="版本更新" href="{FEED_JSON_FILENAME}">
 </head>
-<body>
+<body class="index-page">
     <div class="container">
         <h1>Microsoft 资源下载中心</h1>
         
         <div class="search-section">
-            <input type="text" id="searchInput" class="search-input" placeholder="搜索资源..." onkeyup="filterItems()">
+            <input type="text" id="searchInput" class="search-input" placeholder="搜索资源..." onkeyup="filterItems()" onfocus="loadSearchIndex()"{search_index_attr}>
             <div class="search-options">
                 <div class="search-option">
-                    <input type="checkbox" id="searchTitle" checked>
+                    <input type="checkbox" id="searchTitle" checked onchange="filterItems()">
                     <label for="searchTitle">标题</label>
                 </div>
                 <div class="search-option">
-                    <input type="checkbox" id="searchIntro" checked>
+                    <input type="checkbox" id="searchIntro" checked onchange="filterItems()">
                     <label for="searchIntro">介绍</label>
                 </div>
                 <div class="search-option">
-                    <input type="checkbox" id="searchDetails" checked>
+                    <input type="checkbox" id="searchDetails" checked onchange="filterItems()">
                     <label for="searchDetails">详情</label>
                 </div>
             </div>
         </div>
         
         <div class="stats">
-            <div class="stats-number">{len(links)}</div>
+            <div class="stats-number">{len(entries)}</div>
             <div>个资源页面</div>
         </div>
         
-        {categories_html}
+        <div id="searchResults" style="display: none;"></div>
+        
+        <div id="categories">
+        """
+    for slug, category_name, category_entries in group_by_category(entries):
+        yield (
+            '\n        <div class="category">\n'
+            f'            <div class="category-header">{category_name}</div>\n'
+            '            <div class="category-content">\n'
+            '                <div class="link-grid">\n'
+            '                    '
+        )
+        yield from _iter_link_items(category_entries[:page_size])
+        yield '\n                </div>\n'
+        if len(category_entries) > page_size:
+            yield (
+                '                <div class="category-more">\n'
+                f'                    <a href="{category_page_path(slug, 1)}">查看全部 {len(category_entries)} 个 →</a>\n'
+                '                </div>\n'
+            )
+        yield (
+            '            </div>\n'
+            '        </div>\n'
+        )
+    yield f"""
+        </div>
         
         <div id="noResults" class="no-results" style="display: none;">
             没有找到匹配的资源
         </div>
     </div>
 
-    <script>
-        function filterItems() {{
-            const searchTerm = document.getElementById('searchInput').value.toLowerCase();
-            const searchTitle = document.getElementById('searchTitle').checked;
-            const searchIntro = document.getElementById('searchIntro').checked;
-            const searchDetails = document.getElementById('searchDetails').checked;
-            
-            const items = document.querySelectorAll('.link-item');
-            let visibleCount = 0;
-            
-            items.forEach(item => {{
-                const title = item.getAttribute('data-title').toLowerCase();
-                const url = item.getAttribute('data-url').toLowerCase();
-                const path = item.getAttribute('data-path').toLowerCase();
-                
-                let matches = false;
-                
-                if (searchTitle && (title.includes(searchTerm) || url.includes(searchTerm))) {{
-                    matches = true;
-                }}
-                
-                if (searchIntro && (title.includes(searchTerm) || url.includes(searchTerm))) {{
-                    matches = true;
-                }}
-                
-                if (searchDetails && (title.includes(searchTerm) || url.includes(searchTerm) || path.includes(searchTerm))) {{
-                    matches = true;
-                }}
-                
-                if (searchTerm === '' || matches) {{
-                    item.classList.remove('hidden');
-                    visibleCount++;
-                }} else {{
-                    item.classList.add('hidden');
-                }}
-            }});
-            
-            // 显示/隐藏"无结果"消息
-            const noResults = document.getElementById('noResults');
-            if (visibleCount === 0 && searchTerm !== '') {{
-                noResults.style.display = 'block';
-            }} else {{
-                noResults.style.display = 'none';
-            }}
-        }}
-    </script>
+    <script src="assets/{SITE_JS_FILE}"></script>
+</body>
+</html>
+"""
+
+
+def _render_pagination(slug, page, total_pages):
+    """分类页底部的页码导航（分类页之间用同目录下的文件名互相链接）"""
+    def href(number):
+        return category_page_path(slug, number).rsplit('/', 1)[1]
+
+    items = []
+    if page > 1:
+        items.append(f'<a href="{href(page - 1)}">上一页</a>')
+    for number in range(1, total_pages + 1):
+        if number == page:
+            items.append(f'<span class="current">{number}</span>')
+        else:
+            items.append(f'<a href="{href(number)}">{number}</a>')
+    if page < total_pages:
+        items.append(f'<a href="{href(page + 1)}">下一页</a>')
+    return '<div class="pagination">' + ''.join(items) + '</div>'
+
+
+def iter_category_page_html(slug, category_name, entries, page, total_pages, total):
+    """逐块产出分类页第 page 页的 HTML；entries 为该页的条目，total 为分类的条目总数"""
+    prefix = asset_prefix_for_path(f"{CATEGORY_DIR}/{slug}")
+    pagination = _render_pagination(slug, page, total_pages) if total_pages > 1 else ''
+    yield f"""
+<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{category_name}（第 {page}/{total_pages} 页） - Microsoft 资源下载中心</title>
+    <link rel="stylesheet" href="{prefix}assets/{SITE_CSS_FILE}">
+</head>
+<body class="index-page">
+    <div class="container">
+        <h1>{category_name}</h1>
+        <a href="{prefix}index.html" class="back-link">← 返回资源列表</a>
+        
+        <div class="stats">
+            <div class="stats-number">{total}</div>
+            <div>个资源页面，第 {page}/{total_pages} 页</div>
+        </div>
+        
+        <div class="category">
+            <div class="category-content">
+                <div class="link-grid">
+                    """
+    yield from _iter_link_items(entries, prefix)
+    yield f"""
+                </div>
+            </div>
+        </div>
+        {pagination}
+    </div>
+
+    <script src="{prefix}assets/{SITE_JS_FILE}"></script>
 </body>
 </html>
 """
+
+
+def render_index_html(entries, search_index_url=None):
+    """根据条目列表 [(页面路径, 链接, 标题)] 生成汇总页面的 HTML；search_index_url 为搜索索引的相对地址"""
+    return ''.join(iter_index_html(entries, search_index_url))
+
+
+def load_page_data(path):
+    """读取 docs/ 下某个页面目录的 data.json，不存在或损坏时返回 None"""
+    try:
+        with open(os.path.join(DOCS_DIR, path, 'data.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_index_pages(links):
+    """按链接顺序逐个读取各页面的 data.json，产出 (页面路径, 链接, 数据)，数据可能为 None"""
+    for link in dedupe_links_by_path(links):
+        if link:
+            path = parse_url_to_path(link)
+            yield path, link, load_page_data(path)
+
+
+def index_entries(links, search_index):
+    """汇总页条目 [(页面路径, 链接, 标题)]，标题取自搜索索引（即各页面 data.json 中的标题）"""
+    link_by_path = {parse_url_to_path(link): link for link in links if link}
+    return [(path, link_by_path[path], title) for path, title in zip(search_index['docs'], search_index['titles'])]
+
+
+def write_search_index(search_index, build=None):
+    """写出汇总页的搜索索引，返回带版本参数的相对地址"""
+    text, digest = serialize_search_index(search_index)
+    write_output(SEARCH_INDEX_FILENAME, text, digest, build)
+    return f"{SEARCH_INDEX_FILENAME}?v={digest}"
+
+
+def read_links():
+    """读取 a.txt 中的全部链接"""
+    with open(os.path.join(DOCS_DIR, 'a.txt'), 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f.readlines()]
+
+
+def write_category_pages(groups, build=None):
+    """逐个分类写出分页的分类页，删除已不需要的旧分类页；返回 (写入的页数, 分类页总数)"""
+    expected = set()
+    written = 0
+    for slug, category_name, category_entries in groups:
+        pages = paginate(category_entries)
+        for page, page_entries in enumerate(pages, 1):
+            rel_path = category_page_path(slug, page)
+            expected.add(rel_path)
+            digest = inputs_hash(TEMPLATE_VERSION, category_name, str(page), str(len(pages)),
+                                 str(len(category_entries)), *('\n'.join(entry) for entry in page_entries))
+            if build is not None and build.is_current(rel_path, digest):
+                build.skip((rel_path,))
+                continue
+            chunks = iter_category_page_html(slug, category_name, page_entries, page, len(pages),
+                                             len(category_entries))
+            written += write_output(rel_path, iter_minified(chunks), digest, build)
+    remove_stale_category_pages(expected, build)
+    return written, len(expected)
+
+
+def remove_stale_category_pages(expected, build=None):
+    """删除 categories/ 下不在 expected 中的分类页（分类变空或页数减少后留下的）及其压缩文件"""
+    category_root = os.path.join(DOCS_DIR, CATEGORY_DIR)
+    stale = []
+    # 自底向上遍历，清空的分类目录一并删除
+    for dirpath, _, filenames in os.walk(category_root, topdown=False):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(path, DOCS_DIR).replace(os.sep, '/')
+            source = rel_path.rsplit('.', 1)[0] if filename.endswith(('.gz', '.br')) else rel_path
+            if source not in expected:
+                os.remove(path)
+                if source == rel_path:
+                    stale.append(rel_path)
+        if dirpath != category_root and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    if build is not None:
+        build.forget(stale)
+    return stale
+
+
+def site_url():
+    """站点地址（取自仓库根目录的 CNAME），订阅源中的链接需要绝对地址"""
+    try:
+        with open(os.path.join(REPO_ROOT, 'CNAME'), 'r', encoding='utf-8') as f:
+            domain = f.read().strip()
+    except OSError:
+        domain = ''
+    return f"https://{domain}/" if domain else '/'
+
+
+def write_change_feeds(build=None):
+    """根据最近的版本变更写出 feed.json 和 feed.atom"""
+    items = load_feed_items()
+    base_url = site_url()
+    for rel_path, render in ((FEED_JSON_FILENAME, render_json_feed), (FEED_ATOM_FILENAME, render_atom_feed)):
+        text = render(items, base_url)
+        write_output(rel_path, text, inputs_hash(text), build)
+
+
+def generate_index_html(build=None):
+    """根据各页面的 data.json 生成搜索索引、汇总页面和分类页（内容没有变化时不重写）"""
+    links = read_links()
     
-    # 保存汇总页面
-    with open(os.path.join(DOCS_DIR, 'index.html'), 'w', encoding='utf-8') as f:
-        f.write(html_template)
+    # 逐个读取 data.json 建立搜索索引，汇总页的标题也取自索引，不需要同时持有全部页面数据
+    search_index = build_search_index(load_index_pages(links))
+    search_index_url = write_search_index(search_index, build)
+    entries = index_entries(links, search_index)
+    digest = inputs_hash(TEMPLATE_VERSION, search_index_url, str(INDEX_PAGE_SIZE), *links)
     
-    print(f"汇总页面已生成: {os.path.join(DOCS_DIR, 'index.html')}")
+    # 保存汇总页面：逐块渲染并直接写入文件；链接和搜索索引都没有变化时不重新渲染
+    write_site_assets()
+    if build is not None and build.is_current('index.html', digest):
+        build.skip(('index.html',))
+        print("汇总页面内容未变化，跳过写入")
+    elif write_output('index.html', iter_minified(iter_index_html(entries, search_index_url)), digest, build):
+        print(f"汇总页面已生成: {os.path.join(DOCS_DIR, 'index.html')}")
+    else:
+        print("汇总页面内容未变化，跳过写入")
+    
+    write_change_feeds(build)
+    groups = group_by_category(entries)
+    written, total = write_category_pages(groups, build)
+    print(f"分类页: {len(groups)} 个分类共 {total} 页，写入 {written} 页")
+    uncategorized = [group for group in groups if group[0] == OTHER_CATEGORY[0]]
+    if uncategorized:
+        print(f"⚠️ {len(uncategorized[0][2])} 个页面没有匹配任何分类规则，已归入“{OTHER_CATEGORY[1]}”（规则见 categories.py）")
+    
+    removed_assets = prune_site_assets()
+    if removed_assets:
+        print(f"已删除不再被引用的旧资源文件: {', '.join(removed_assets)}")
+
+def record_failure(journal, url, reason):
+    if journal is not None:
+        journal.fail(url, reason)
+
+
+def write_output(rel_path, content, digest, build=None):
+    """写出 docs/ 下的一个生成文件（内容不变时不重写），返回是否写入
+
+    content 为字符串或逐块产出字符串的可迭代对象。
+    """
+    if build is not None:
+        return build.write(rel_path, digest, content)
+    return write_if_changed(os.path.join(DOCS_DIR, *rel_path.split('/')), content)
 
-def save_page_data(url):
-    """保存页面数据"""
-    print(f"正在处理页面: {url}")
+
+def render_page(url, html, parser=DEFAULT_PARSER, current_digest=None, memo=None):
+    """解析并渲染页面，不写文件（可在子进程中运行）
+
+    返回 dict：data、json、digest、html（输入哈希等于 current_digest 时不渲染，为 None）、
+    error（解析出错时的异常信息）、timings（parse / render 耗时）以及 memo（各缓存是否命中）。
+    传入 memo（MemoStore）时，相同的 HTML 和相同的数据分别跳过解析和渲染。
+    """
+    rendered = {'data': None, 'json': None, 'digest': None, 'html': None, 'error': None, 'timings': {},
+                'memo': {}}
+    start = time.perf_counter()
+    try:
+        data = parse_page_memoized(html, url, parser, memo, rendered['memo'])
+    except Exception as e:
+        rendered['error'] = str(e)
+        return rendered
+    finally:
+        rendered['timings']['parse'] = time.perf_counter() - start
+    if not data:
+        return rendered
     
-    data = extract_page_data(url)
+    start = time.perf_counter()
+    json_content, digest, html = render_page_data(data, current_digest, memo, rendered['memo'])
+    rendered.update(data=data, json=json_content, digest=digest, html=html)
+    rendered['timings']['render'] = time.perf_counter() - start
+    return rendered
+
+
+def parse_page_memoized(html, url, parser=DEFAULT_PARSER, memo=None, memo_hits=None):
+    """parse_page_html 加上按 HTML 内容哈希的缓存；memo_hits 中记录 parse 缓存是否命中"""
+    if memo is None:
+        return parse_page_html(html, url, parser)
+    key = inputs_hash(str(PARSE_VERSION), parser, url, hashlib.sha256(html.encode('utf-8')).hexdigest())
+    cached = memo.get(MEMO_PARSE, key)
+    if memo_hits is not None:
+        memo_hits[MEMO_PARSE] = cached is not None
+    if cached is not None:
+        return json.loads(cached)
+    data = parse_page_html(html, url, parser)
+    memo.put(MEMO_PARSE, key, json.dumps(data, ensure_ascii=False))
+    return data
+
+
+def render_page_data(data, current_digest=None, memo=None, memo_hits=None):
+    """把页面数据渲染为 (data.json 内容, 输入哈希, 精简后的 HTML)；输入哈希等于 current_digest 时 HTML 为 None
+
+    传入 memo 时按输入哈希缓存渲染结果，memo_hits 中记录 render 缓存是否命中。
+    """
+    json_content = json.dumps(data, ensure_ascii=False, indent=2)
+    digest = inputs_hash(TEMPLATE_VERSION, json_content)
+    if digest == current_digest:
+        return json_content, digest, None
+    html = memo.get(MEMO_RENDER, digest) if memo is not None else None
+    if memo_hits is not None and memo is not None:
+        memo_hits[MEMO_RENDER] = html is not None
+    if html is None:
+        html = minify_html(generate_html_content(data))
+        if memo is not None:
+            memo.put(MEMO_RENDER, digest, html)
+    return json_content, digest, html
+
+
+def current_output_digest(url, build=None):
+    """页面的 index.html 和 data.json 都存在且输入哈希一致时返回该哈希，否则返回 None"""
+    if build is None:
+        return None
+    path = parse_url_to_path(url)
+    digest = build.entries.get(f"{path}/index.html")
+    if digest and build.is_current(f"{path}/index.html", digest) and build.is_current(f"{path}/data.json", digest):
+        return digest
+    return None
+
+
+def write_rendered_page(url, rendered, log=print, metrics=None, journal=None, build=None):
+    """写出 render_page 的结果，返回解析得到的数据，失败时返回 None"""
+    if metrics is not None:
+        for stage, seconds in rendered['timings'].items():
+            metrics.record(url, stage, seconds)
+        for namespace, hit in rendered.get('memo', {}).items():
+            metrics.record_memo(namespace, hit)
+    if rendered['error'] is not None:
+        log(f"提取页面数据时出错 {url}: {rendered['error']}")
+        record_failure(journal, url, f"解析失败: {rendered['error']}")
+        return None
+    data = rendered['data']
     if not data:
-        print(f"无法提取页面数据: {url}")
-        return
+        log(f"无法提取页面数据: {url}")
+        record_failure(journal, url, "页面中没有可提取的数据")
+        return None
     
     path = parse_url_to_path(url)
-    full_path = create_directory_structure(path)
+    html_rel = f"{path}/index.html"
+    json_rel = f"{path}/data.json"
+    if rendered['html'] is None:
+        # 数据和模板版本都没有变化，render_page 已跳过渲染
+        if build is not None:
+            build.skip((html_rel, json_rel))
+        log(f"页面输出未变化，跳过写入: {path}")
+        return data
     
-    html_content = generate_html_content(data)
+    with stage_timer(metrics, url, 'write'):
+        full_path = create_directory_structure(path)
+        written = [
+            (content, write_output(rel_path, content, rendered['digest'], build))
+            for rel_path, content in ((html_rel, rendered['html']), (json_rel, rendered['json']))
+        ]
+    if metrics is not None:
+        metrics.record_bytes(url, 'write', sum(len(content.encode('utf-8')) for content, changed in written if changed))
     
-    html_file = os.path.join(full_path, 'index.html')
-    with open(html_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    if any(changed for _, changed in written):
+        log(f"已保存到: {full_path}")
+    else:
+        log(f"页面输出未变化，跳过写入: {path}")
+    return data
+
+
+def write_page_from_html(url, html, parser=DEFAULT_PARSER, log=print, metrics=None, journal=None, build=None,
+                         memo=None):
+    """解析 → 渲染 → 写入，返回解析得到的数据，失败时返回 None
+
+    传入 build（BuildManifest）时，数据和模板版本都没有变化的页面跳过渲染和写入；
+    传入 memo（MemoStore）时，解析和渲染结果按内容哈希缓存。
+    """
+    rendered = render_page(url, html, parser, current_output_digest(url, build), memo)
+    return write_rendered_page(url, rendered, log, metrics, journal, build)
+
+
+def update_page_indexes(path, data, indexes):
+    """把新写入的页面数据同步到各个索引（Catalog、DownloadIndex、ChangeFeed）"""
+    for index in indexes:
+        index.put_page(path, data)
+
+
+def backfill_page_indexes(path, json_file, indexes):
+    """页面未修改时，为还没有收录该页面的索引从已有的 data.json 补录"""
+    missing = [index for index in indexes if not index.has_page(path)]
+    if not missing:
+        return
+    try:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return
+    update_page_indexes(path, data, missing)
+
+
+def stamp_output_versions(validators):
+    """在校验信息中记录生成输出时的解析版本和模板版本"""
+    validators['parse_version'] = PARSE_VERSION
+    validators['template_version'] = TEMPLATE_VERSION
+    return validators
+
+
+def output_versions_current(validators):
+    """校验信息记录的解析版本和模板版本都与当前版本一致时返回 True"""
+    return (validators.get('parse_version') == PARSE_VERSION
+            and validators.get('template_version') == TEMPLATE_VERSION)
+
+
+def fetch_page_html(url, client=None, log=print, snapshots=None, indexes=(), metrics=None, journal=None):
+    """请求阶段：条件请求、保存快照
+
+    页面已处理完时（304、内容未变化、请求失败）返回 (状态, None)，
+    否则返回 (None, (HTML, 新的校验信息)) 交给解析阶段。
+    """
+    log(f"正在处理页面: {url}")
     
+    path = parse_url_to_path(url)
+    full_path = os.path.join(DOCS_DIR, path)
     json_file = os.path.join(full_path, 'data.json')
-    with open(json_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
     
-    print(f"已保存到: {full_path}")
+    # 只有在上次的输出仍然存在时才发送条件请求；
+    # 启用快照但还没有该页面的快照时也要完整下载一次
+    use_cache = os.path.exists(json_file) and (snapshots is None or snapshots.has(url))
+    validators = load_validators(full_path, url) if use_cache else {}
+    # 上次的输出由旧版本的解析逻辑或模板生成时，304 或响应体相同也必须重新解析和渲染：
+    # 不发送条件请求，也不按响应体哈希跳过
+    if validators and not output_versions_current(validators):
+        log(f"页面由旧版本的解析逻辑或模板生成，重新下载并处理: {url}")
+        validators = {}
+    
+    try:
+        with stage_timer(metrics, url, 'fetch'):
+            response = fetch_page(url, client, conditional_headers(validators), log)
+    except Exception as e:
+        log(f"提取页面数据时出错 {url}: {e}")
+        log(f"无法提取页面数据: {url}")
+        record_failure(journal, url, f"请求失败: {e}")
+        return PAGE_FAILED, None
+    record_fetch_metrics(metrics, url, response)
+    
+    # 304：服务器确认页面未变化，跳过解析、渲染和写入
+    if response.status_code == 304:
+        log(f"页面未修改（304），跳过: {url}")
+        with stage_timer(metrics, url, 'index'):
+            backfill_page_indexes(path, json_file, indexes)
+        return PAGE_NOT_MODIFIED, None
+    
+    body_hash = body_sha256(response.content)
+    new_validators = stamp_output_versions(validators_from_response(url, response, body_hash))
+    if snapshots is not None:
+        with stage_timer(metrics, url, 'snapshot'):
+            snapshots.put(url, response.content, response.encoding or response.apparent_encoding)
+    
+    # 服务器不支持条件请求时，响应体哈希相同同样视为未修改
+    if validators.get('body_sha256') == body_hash:
+        if new_validators != validators:
+            save_validators(full_path, new_validators)
+        log(f"页面内容未变化，跳过: {url}")
+        with stage_timer(metrics, url, 'index'):
+            backfill_page_indexes(path, json_file, indexes)
+        return PAGE_NOT_MODIFIED, None
+    
+    return None, (response.text, new_validators)
+
+
+def load_snapshot_html(url, snapshots, log=print, journal=None):
+    """离线模式的请求阶段：从快照读取 HTML，返回值与 fetch_page_html 相同"""
+    log(f"正在离线处理页面: {url}")
+    html = snapshots.get_text(url)
+    if html is None:
+        log(f"没有该页面的快照，跳过: {url}")
+        record_failure(journal, url, "没有该页面的快照")
+        return PAGE_FAILED, None
+    return None, (html, None)
+
+
+def finish_page(url, data, validators=None, indexes=(), metrics=None):
+    """写入阶段的收尾：保存校验信息、更新索引，返回处理状态"""
+    if data is None:
+        return PAGE_FAILED
+    path = parse_url_to_path(url)
+    if validators is not None:
+        save_validators(os.path.join(DOCS_DIR, path), validators)
+    with stage_timer(metrics, url, 'index'):
+        update_page_indexes(path, data, indexes)
+    return PAGE_UPDATED
+
+
+def save_page_data(url, client=None, log=print, parser=DEFAULT_PARSER, snapshots=None, indexes=(),
+                   metrics=None, journal=None, build=None, memo=None):
+    """保存页面数据，返回处理状态（PAGE_UPDATED / PAGE_NOT_MODIFIED / PAGE_FAILED）
+
+    传入 snapshots（SnapshotStore）时，抓取到的响应体会同时存入快照；
+    indexes 中的索引（Catalog、DownloadIndex、ChangeFeed）按处理结果增量更新；
+    传入 metrics（RunMetrics）时记录各阶段耗时和字节数；
+    传入 journal（Journal）时记录失败原因；
+    传入 build（BuildManifest）时跳过输入没有变化的生成文件；
+    传入 memo（MemoStore）时，内容相同的 HTML 和数据跳过解析和渲染。
+    """
+    status, fetched = fetch_page_html(url, client, log, snapshots, indexes, metrics, journal)
+    if fetched is None:
+        return status
+    html, validators = fetched
+    data = write_page_from_html(url, html, parser, log, metrics, journal, build, memo)
+    return finish_page(url, data, validators, indexes, metrics)
+
+
+def rebuild_page_from_snapshot(url, snapshots, log=print, parser=DEFAULT_PARSER, indexes=(), metrics=None,
+                               journal=None, build=None, memo=None):
+    """离线模式：用快照中的 HTML 重新解析、渲染和写入页面"""
+    status, fetched = load_snapshot_html(url, snapshots, log, journal)
+    if fetched is None:
+        return status
+    data = write_page_from_html(url, fetched[0], parser, log, metrics, journal, build, memo)
+    return finish_page(url, data, None, indexes, metrics)
+
+
+def dedupe_links_by_path(links):
+    """按输出目录去重，避免两个线程同时写同一个目录
+
+    a.txt 中同一页面可能同时带/不带结尾斜杠，串行处理时后出现的链接会覆盖前者，
+    这里保留最后出现的链接，位置取首次出现的位置。
+    """
+    by_path: dict[str, str] = {}
+    for link in links:
+        if link:
+            by_path[parse_url_to_path(link)] = link
+    return list(by_path.values())
+
+
+def record_page_status(url, status, metrics=None, journal=None):
+    """记录单个页面的处理结果；失败原因由各阶段写入 journal"""
+    if metrics is not None:
+        metrics.set_status(url, status)
+    if journal is not None:
+        if status != PAGE_FAILED:
+            journal.done(url, status)
+        elif journal.status(url) != STATUS_FAILED:
+            journal.fail(url, "未知错误")
+
+
+def _run_page(handler, url, log, metrics=None, journal=None):
+    """处理单个页面并记录结果"""
+    status = handler(url, log=log)
+    record_page_status(url, status, metrics, journal)
+    return status
+
+
+def _run_buffered(handler, url, metrics=None, journal=None):
+    """在工作线程中处理页面，把日志暂存起来，由主线程按链接顺序输出"""
+    messages: list[str] = []
+    status = _run_page(handler, url, messages.append, metrics, journal)
+    return status, messages
+
+
+def process_links(links, workers=DEFAULT_WORKERS, handler=save_page_data, metrics=None, journal=None):
+    """并发处理链接列表，日志和结果都保持链接原有顺序；返回各状态的页面数
+
+    handler(url, log=...) 负责处理单个页面并返回 PAGE_* 状态；
+    传入 metrics（RunMetrics）时同时记录每个页面的处理结果；
+    传入 journal（Journal）时每个页面一完成就写入日志，便于中断后续跑。
+    """
+    links = dedupe_links_by_path(links)
+    total = len(links)
+    counts = {PAGE_UPDATED: 0, PAGE_NOT_MODIFIED: 0, PAGE_FAILED: 0}
+    if journal is not None:
+        journal.start(links)
+
+    if workers <= 1:
+        for i, link in enumerate(links, 1):
+            print(f"\n处理进度: {i}/{total}")
+            counts[_run_page(handler, link, print, metrics, journal)] += 1
+        return counts
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_buffered, handler, link, metrics, journal) for link in links]
+        # 按提交顺序等待结果，保证输出顺序与 a.txt 一致
+        for i, future in enumerate(futures, 1):
+            status, messages = future.result()
+            print(f"\n处理进度: {i}/{total}")
+            for message in messages:
+                print(message)
+            counts[status] += 1
+    return counts
+
+
+def process_links_pipelined(links, fetch, parser=DEFAULT_PARSER, workers=DEFAULT_WORKERS,
+                            parse_workers=DEFAULT_PARSE_WORKERS, max_in_flight=None, indexes=(),
+                            metrics=None, journal=None, build=None, memo=None):
+    """按 请求 → 解析/渲染 → 写入 流水线处理链接列表，日志和结果保持链接原有顺序；返回各状态的页面数
+
+    fetch(url, log=...) 在 workers 个线程中运行，返回 (状态, None) 表示页面已处理完，
+    或 (None, (HTML, 校验信息)) 交给解析阶段；解析和渲染在 parse_workers 个进程中运行，
+    memo（MemoStore）随参数一起传给子进程。
+    """
+    links = dedupe_links_by_path(links)
+    total = len(links)
+    counts = {PAGE_UPDATED: 0, PAGE_NOT_MODIFIED: 0, PAGE_FAILED: 0}
+    if journal is not None:
+        journal.start(links)
+
+    def fetch_stage(page):
+        url = page['url']
+        status, fetched = fetch(url, log=page['messages'].append)
+        if fetched is None:
+            record_page_status(url, status, metrics, journal)
+            return status, None
+        html, page['validators'] = fetched
+        return None, (url, html, parser, current_output_digest(url, build), memo)
+
+    def write_stage(page, args, rendered, error):
+        url = page['url']
+        log = page['messages'].append
+        if error is not None:
+            # 子进程异常退出等解析阶段以外的错误
+            log(f"提取页面数据时出错 {url}: {error}")
+            record_failure(journal, url, f"解析失败: {error}")
+            data = None
+        else:
+            data = write_rendered_page(url, rendered, log, metrics, journal, build)
+        status = finish_page(url, data, page.pop('validators', None), indexes, metrics)
+        record_page_status(url, status, metrics, journal)
+        return status
+
+    pages = [{'url': link, 'messages': []} for link in links]
+    stats = StageStats()
+    results = run_pipeline(pages, fetch_stage, render_page, write_stage, workers, parse_workers,
+                           max_in_flight=max_in_flight, stats=stats)
+    # 按链接顺序等待结果，保证输出顺序与 a.txt 一致
+    for i, (page, status) in enumerate(zip(pages, results), 1):
+        print(f"\n处理进度: {i}/{total}")
+        for message in page['messages']:
+            print(message)
+        page['messages'] = []
+        counts[status] += 1
+    if metrics is not None:
+        metrics.record_pipeline(stats.report({STAGE_FETCH: workers, STAGE_PARSE: parse_workers, STAGE_WRITE: 1}))
+    return counts
+
+
+def print_run_summary(counts):
+    """输出本次运行的汇总信息，包括 HTTP 缓存命中率"""
+    hits = counts[PAGE_NOT_MODIFIED]
+    misses = counts[PAGE_UPDATED]
+    fetched = hits + misses
+    ratio = hits / fetched * 100 if fetched else 0.0
+    print(f"\n所有页面处理完成！更新 {misses} 个，未变化 {hits} 个，失败 {counts[PAGE_FAILED]} 个")
+    print(f"HTTP 缓存命中率: {hits}/{fetched} ({ratio:.1f}%)")
+
+
+def print_download_conflicts(download_index, limit=10):
+    """在运行汇总中报告文件名相同但哈希不同的下载文件"""
+    conflicts = download_index.conflicts()
+    if conflicts:
+        print(f"⚠️ {len(conflicts)} 个文件名在不同链接中对应不同的哈希:")
+        print_conflicts(conflicts, limit)
+
+
+def print_output_changes(build, limit=20):
+    """在运行汇总中列出本次实际写入的生成文件"""
+    print(f"\n生成文件: 写入 {len(build.written)} 个，未变化 {build.unchanged} 个")
+    for rel_path in sorted(build.written)[:limit]:
+        print(f"  {rel_path}")
+    if len(build.written) > limit:
+        print(f"  …… 另有 {len(build.written) - limit} 个，完整列表见运行报告")
+
+
+# 子命令；第一个参数不是子命令时按 fetch 处理，兼容 python app.py --discover 等旧用法
+COMMANDS = ('fetch', 'parse', 'render', 'index', 'report', 'check-links')
+DEFAULT_COMMAND = 'fetch'
+
+TARGETS_HELP = '页面 URL 或 docs/ 下的页面路径（如 docs/xxx/ 或 xxx/index.html），不给出时处理 a.txt 中的全部页面'
+
+
+def _add_worker_arguments(parser):
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'并发抓取的线程数（默认 {DEFAULT_WORKERS}，1 表示串行）')
+    parser.add_argument('--parse-workers', type=int, default=DEFAULT_PARSE_WORKERS,
+                        help=f'解析、渲染和预压缩的进程数（默认 CPU 核数 {DEFAULT_PARSE_WORKERS}，0 表示不使用子进程）')
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help='同时处于流水线中的最大页面数，限制内存占用（默认 (workers + parse-workers) × 2）')
+
+
+def _add_parser_argument(parser):
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER,
+                        help=f'页面解析后端（默认 {DEFAULT_PARSER}）')
+
+
+def _add_memo_arguments(parser):
+    parser.add_argument('--no-memo', action='store_true',
+                        help='不使用 data/memo/ 中按内容哈希缓存的解析和渲染结果')
+    parser.add_argument('--memo-max-mb', type=float, default=DEFAULT_MEMO_MAX_BYTES / 1024 / 1024,
+                        help=f'解析和渲染结果缓存的大小上限，超出时删除最久未用的条目'
+                             f'（默认 {DEFAULT_MEMO_MAX_BYTES // 1024 // 1024} MB）')
+
+
+def _add_compress_argument(parser):
+    parser.add_argument('--no-compress', action='store_true',
+                        help='不为 docs/ 下的文件生成 .gz / .br 预压缩文件')
+
+
+def parse_args(argv=None):
+    """解析命令行参数，返回的 args.handler 为子命令的处理函数"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in COMMANDS + ('-h', '--help'):
+        argv.insert(0, DEFAULT_COMMAND)
+
+    parser = argparse.ArgumentParser(description='Microsoft 资源页面采集工具',
+                                     epilog=f'不指定子命令时执行 {DEFAULT_COMMAND}')
+    subparsers = parser.add_subparsers(dest='command')
+
+    fetch_parser = subparsers.add_parser('fetch', help='抓取页面并生成全部输出（默认）')
+    fetch_parser.set_defaults(handler=cmd_fetch)
+    fetch_parser.add_argument('targets', nargs='*', metavar='TARGET', help=TARGETS_HELP)
+    _add_worker_arguments(fetch_parser)
+    fetch_parser.add_argument('--rate', type=float, default=None,
+                              help='每个主机每秒允许的请求数（默认按主机配置，1.0）')
+    fetch_parser.add_argument('--burst', type=int, default=None,
+                              help='每个主机允许的瞬时突发请求数（默认 2）')
+    fetch_parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                              help=f'429/5xx、超时和连接错误的最大重试次数（默认 {DEFAULT_RETRIES}）')
+    fetch_parser.add_argument('--backoff', type=float, default=DEFAULT_BACKOFF,
+                              help=f'指数退避的基础秒数（默认 {DEFAULT_BACKOFF}）')
+    fetch_parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                              help=f'单次请求超时秒数（默认 {DEFAULT_TIMEOUT}）')
+    _add_parser_argument(fetch_parser)
+    fetch_parser.add_argument('--offline', action='store_true',
+                              help='不访问网络，只用 snapshots/ 中的快照重新解析和生成页面')
+    fetch_parser.add_argument('--no-snapshots', action='store_true',
+                              help='抓取时不保存原始 HTML 快照')
+    fetch_parser.add_argument('--discover', action='store_true',
+                              help='先抓取首页和分类列表页，把新发现的产品页面追加到 a.txt')
+    fetch_parser.add_argument('--discover-depth', type=int, default=DEFAULT_MAX_DEPTH,
+                              help=f'从首页和分类页出发跟随列表页链接的最大深度（默认 {DEFAULT_MAX_DEPTH}）')
+    fetch_parser.add_argument('--discover-max-pages', type=int, default=DEFAULT_MAX_PAGES,
+                              help=f'单次运行最多抓取的列表页数，其余留到下次（默认 {DEFAULT_MAX_PAGES}）')
+    fetch_parser.add_argument('--report-dir', default=REPORT_DIR,
+                              help=f'运行报告 {REPORT_FILENAME} 的输出目录（默认 reports/）')
+    fetch_parser.add_argument('--metrics-file', default=None,
+                              help=f'Prometheus textfile 指标文件路径（默认 <report-dir>/{PROMETHEUS_FILENAME}）')
+    resume_group = fetch_parser.add_mutually_exclusive_group()
+    resume_group.add_argument('--resume', action='store_true',
+                              help='根据 data/journal.jsonl 只处理上次未完成或失败的页面')
+    resume_group.add_argument('--retry-failed', action='store_true',
+                              help='根据 data/journal.jsonl 只重试上次失败的页面')
+    _add_compress_argument(fetch_parser)
+    _add_memo_arguments(fetch_parser)
+    fetch_parser.add_argument('--shard', type=shard_spec, default=None, metavar='i/N',
+                              help='只处理按 URL 哈希划分的第 i 个分片（共 N 个，i 从 1 开始），'
+                                   '写出分片清单，不生成汇总页面')
+    fetch_parser.add_argument('--merge-shards', action='store_true',
+                              help='合并全部分片的清单，更新汇总目录和下载索引并生成一次汇总页面')
+    fetch_parser.add_argument('--shard-dir', default=SHARD_DIR,
+                              help='分片清单所在目录（默认 data/shards/）')
+
+    parse_parser = subparsers.add_parser('parse', help='解析单个页面，把提取的数据以 JSON 输出到标准输出（不写文件）')
+    parse_parser.set_defaults(handler=cmd_parse)
+    parse_parser.add_argument('target', metavar='TARGET',
+                              help='页面 URL、docs/ 下的页面路径（读取快照）或本地 HTML 文件')
+    parse_parser.add_argument('--url', default=None,
+                              help='解析本地 HTML 文件时使用的页面地址（默认为文件路径）')
+    _add_parser_argument(parse_parser)
+
+    render_parser = subparsers.add_parser('render', help='不访问网络，重新生成页面（默认用已有的 data.json）')
+    render_parser.set_defaults(handler=cmd_render)
+    render_parser.add_argument('targets', nargs='*', metavar='TARGET', help=TARGETS_HELP)
+    render_parser.add_argument('--offline', action='store_true',
+                               help='用 snapshots/ 中的快照重新解析后再生成，并更新汇总目录和下载索引')
+    render_parser.add_argument('--force', action='store_true',
+                               help='忽略构建清单，重新渲染输入没有变化的页面')
+    _add_worker_arguments(render_parser)
+    _add_parser_argument(render_parser)
+    _add_compress_argument(render_parser)
+    _add_memo_arguments(render_parser)
+
+    index_parser = subparsers.add_parser('index', help='只重新生成汇总页面和搜索索引')
+    index_parser.set_defaults(handler=cmd_index)
+    _add_compress_argument(index_parser)
+
+    report_parser = subparsers.add_parser('report', help='查看上次运行的报告')
+    report_parser.set_defaults(handler=cmd_report)
+    report_parser.add_argument('targets', nargs='*', metavar='TARGET',
+                               help='页面 URL 或 docs/ 下的页面路径，给出时输出这些页面各阶段的耗时')
+    report_parser.add_argument('--report-dir', default=REPORT_DIR,
+                               help=f'运行报告 {REPORT_FILENAME} 所在目录（默认 reports/）')
+    report_parser.add_argument('--shard', type=shard_spec, default=None, metavar='i/N',
+                               help='查看第 i 个分片的运行报告')
+
+    check_parser = subparsers.add_parser('check-links', help='检查各页面 data.json 中的下载链接，输出健康报告')
+    check_parser.set_defaults(handler=cmd_check_links)
+    check_parser.add_argument('targets', nargs='*', metavar='TARGET', help=TARGETS_HELP)
+    check_parser.add_argument('--workers', type=int, default=DEFAULT_CHECK_WORKERS,
+                              help=f'并发检查的线程数（默认 {DEFAULT_CHECK_WORKERS}）')
+    check_parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                              help=f'每个主机同时进行的最大请求数（默认 {DEFAULT_PER_HOST}）')
+    check_parser.add_argument('--rate', type=float, default=None,
+                              help='每个主机每秒允许的请求数（默认 1.0）')
+    check_parser.add_argument('--burst', type=int, default=None,
+                              help='每个主机允许的瞬时突发请求数（默认 2）')
+    check_parser.add_argument('--retries', type=int, default=1,
+                              help='429/5xx、超时和连接错误的最大重试次数（默认 1）')
+    check_parser.add_argument('--backoff', type=float, default=DEFAULT_BACKOFF,
+                              help=f'指数退避的基础秒数（默认 {DEFAULT_BACKOFF}）')
+    check_parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                              help=f'单次请求超时秒数（默认 {DEFAULT_TIMEOUT}）')
+    check_parser.add_argument('--ttl-hours', type=float, default=DEFAULT_TTL_HOURS,
+                              help=f'检查结果的缓存时间，期间不重复请求同一链接（默认 {DEFAULT_TTL_HOURS:g} 小时）')
+    check_parser.add_argument('--no-cache', action='store_true',
+                              help='忽略并且不更新 data/link-check-cache.json，重新请求全部链接')
+    check_parser.add_argument('--report-dir', default=REPORT_DIR,
+                              help='健康报告 link-health.json 的输出目录（默认 reports/）')
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.error('缺少子命令')
+    if args.command == 'fetch' and args.targets and (args.shard or args.merge_shards or args.resume
+                                                     or args.retry_failed):
+        fetch_parser.error('指定页面时不能同时使用 --shard、--merge-shards、--resume 或 --retry-failed')
+    return args
+
+
+def _docs_relpath(target):
+    """target 为 docs/ 下已存在的文件或目录时返回相对于 docs/ 的路径，否则返回 None"""
+    if not os.path.exists(target):
+        return None
+    rel_path = os.path.relpath(os.path.abspath(target), DOCS_DIR)
+    if rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+        return None
+    return rel_path.replace(os.sep, '/')
+
+
+def target_to_path(target):
+    """把命令行目标（页面 URL、docs/ 下的页面目录或其中的文件）转换为页面路径"""
+    if is_http_url(target):
+        return parse_url_to_path(target)
+    rel_path = _docs_relpath(target)
+    if rel_path is None:
+        rel_path = target.replace(os.sep, '/')
+        if rel_path.startswith('docs/'):
+            rel_path = rel_path[len('docs/'):]
+    for filename in ('index.html', 'data.json'):
+        if rel_path == filename or rel_path.endswith('/' + filename):
+            rel_path = rel_path[:-len(filename)]
+    return rel_path.strip('/')
+
+
+def resolve_targets(targets, links):
+    """把命令行目标匹配到 a.txt 中的链接（保持给出的顺序），有找不到的目标时退出"""
+    by_path = {parse_url_to_path(link): link for link in dedupe_links_by_path(links) if link}
+    selected = []
+    missing = []
+    for target in targets:
+        link = by_path.get(target_to_path(target))
+        if link is None:
+            missing.append(target)
+        elif link not in selected:
+            selected.append(link)
+    if missing:
+        for target in missing:
+            print(f"❌ a.txt 中没有该页面: {target}")
+        sys.exit(1)
+    return selected
+
+
+def select_links(links, journal, resume=False, retry_failed=False):
+    """根据处理日志挑选本次要处理的链接；普通运行会清空旧日志"""
+    if not (resume or retry_failed):
+        journal.reset()
+        return links
+    if retry_failed:
+        selected = [link for link in links if journal.status(link) == STATUS_FAILED]
+        print(f"重试上次失败的页面: {len(selected)} 个")
+    else:
+        # a.txt 中新增、日志里还没有的链接同样视为未完成
+        selected = [link for link in links if journal.status(link) != STATUS_DONE]
+        print(f"续跑未完成的页面: {len(selected)}/{len(links)} 个")
+    return selected
+
+
+def shard_spec(text):
+    """--shard 参数的类型转换"""
+    try:
+        return parse_shard_spec(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def shard_page_results(links, journal, snapshots, build):
+    """从处理日志、快照存储和构建清单中取出本分片各页面的结果，用于写出分片清单"""
+    pages = {}
+    snapshot_entries = {}
+    for link in dedupe_links_by_path(links):
+        record = journal.entries.get(link, {})
+        page = {'url': link, 'status': record.get('status', STATUS_PENDING)}
+        for key in ('result', 'reason'):
+            if key in record:
+                page[key] = record[key]
+        path = parse_url_to_path(link)
+        outputs = {rel_path: build.entries[rel_path] for rel_path in (f"{path}/index.html", f"{path}/data.json")
+                   if rel_path in build.entries}
+        if outputs:
+            page['outputs'] = outputs
+        pages[path] = page
+        if snapshots is not None and link in snapshots.manifest:
+            snapshot_entries[link] = snapshots.manifest[link]
+    return pages, snapshot_entries
+
+
+def merge_shards(shard_dir=SHARD_DIR, compress_workers=DEFAULT_PARSE_WORKERS, compress=True):
+    """合并各分片的清单：更新快照清单、汇总目录和下载索引，然后生成一次汇总页面和压缩文件"""
+    try:
+        manifests = load_shard_manifests(shard_dir)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    problems = check_shard_manifests(manifests)
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    pages, snapshot_entries = merge_shard_manifests(manifests)
+    print(f"合并 {len(manifests)} 个分片，共 {len(pages)} 个页面")
+
+    links = read_links()
+    if links_digest(dedupe_links_by_path(links)) != manifests[0][1].get('links_sha256'):
+        print("⚠️ a.txt 在分片运行之后有变化，新增的页面需要重新运行")
+
+    if snapshot_entries:
+        store = SnapshotStore()
+        store.update_entries(snapshot_entries)
+        store.save()
+    build = BuildManifest(DOCS_DIR)
+    for page in pages.values():
+        build.update_entries(page.get('outputs', {}))
+
+    # sqlite3 只在需要更新汇总目录时导入
+    from catalog import Catalog
+
+    catalog = Catalog()
+    download_index = DownloadIndex()
+    change_feed = ChangeFeed()
+    indexes = (catalog, download_index, change_feed)
+    try:
+        for path, page in pages.items():
+            data = load_page_data(path) if page['status'] == STATUS_DONE else None
+            if data is not None:
+                # 内容未变化的页面 put_page 会直接跳过
+                update_page_indexes(path, data, indexes)
+        paths = [parse_url_to_path(link) for link in links]
+        for index in indexes:
+            index.retain(paths)
+    finally:
+        catalog.close()
+        download_index.save()
+        change_feed.save()
+
+    counts = {PAGE_UPDATED: 0, PAGE_NOT_MODIFIED: 0, PAGE_FAILED: 0}
+    failed = []
+    for path, page in pages.items():
+        if page['status'] == STATUS_DONE:
+            counts[page.get('result', PAGE_UPDATED)] += 1
+        else:
+            counts[PAGE_FAILED] += 1
+            failed.append(page)
+    print_run_summary(counts)
+    for page in failed:
+        print(f"  未完成: {page['url']} {page.get('reason', '')}".rstrip())
+    print_download_conflicts(download_index)
+    print_change_summary(change_feed)
+
+    print("\n正在生成汇总页面...")
+    generate_index_html(build)
+    build.retain(paths + INDEX_OUTPUTS)
+    build.save()
+    print("汇总页面生成完成！")
+    print_output_changes(build)
+    if compress:
+        print_compress_summary(precompress_site(DOCS_DIR, compress_workers))
+    # 清单已被合并，避免与下次运行的分片混在一起
+    for path, _ in manifests:
+        os.remove(path)
+
+
+def run_pages(args, links, journal, metrics, snapshots, build, indexes=(), memo=None):
+    """按运行模式（在线抓取 / 离线重建）处理链接，返回各状态的页面数"""
+    if args.offline and args.parse_workers > 0:
+        fetch = functools.partial(load_snapshot_html, snapshots=snapshots, journal=journal)
+        return process_links_pipelined(links, fetch, args.parser, args.workers, args.parse_workers,
+                                       args.max_in_flight, indexes, metrics, journal, build, memo)
+    if args.offline:
+        handler = functools.partial(rebuild_page_from_snapshot, snapshots=snapshots, parser=args.parser,
+                                    indexes=indexes, metrics=metrics, journal=journal, build=build, memo=memo)
+        return process_links(links, args.workers, handler, metrics, journal)
+    rate_limiter = HostRateLimiter(args.rate, args.burst)
+    client = HttpClient(rate_limiter, retries=args.retries, backoff=args.backoff,
+                        timeout=args.timeout, pool_size=max(args.workers, 1))
+    try:
+        if args.parse_workers > 0:
+            fetch = functools.partial(fetch_page_html, client=client, snapshots=snapshots, indexes=indexes,
+                                      metrics=metrics, journal=journal)
+            return process_links_pipelined(links, fetch, args.parser, args.workers, args.parse_workers,
+                                           args.max_in_flight, indexes, metrics, journal, build, memo)
+        handler = functools.partial(save_page_data, client=client, parser=args.parser, snapshots=snapshots,
+                                    indexes=indexes, metrics=metrics, journal=journal, build=build, memo=memo)
+        return process_links(links, args.workers, handler, metrics, journal)
+    finally:
+        client.close()
+
+
+def report_suffix(filename, suffix):
+    """在扩展名前插入后缀，如 run-report.json → run-report-shard-1-of-4.json"""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}{suffix}{ext}"
+
+
+def site_asset_paths():
+    """共享样式和脚本相对于 docs/ 的路径"""
+    return [f"assets/{SITE_CSS_FILE}", f"assets/{SITE_JS_FILE}"]
+
+
+def compress_outputs(build, workers=DEFAULT_PARSE_WORKERS, partial=False):
+    """生成预压缩文件；partial 为 True 时（只处理了部分页面）只检查本次写入的文件和共享资源"""
+    paths = build.written + site_asset_paths() if partial else None
+    print_compress_summary(precompress_site(DOCS_DIR, workers, paths=paths))
+
+
+def open_memo(args):
+    """按命令行参数创建解析和渲染结果缓存，--no-memo 时返回 None"""
+    if args.no_memo:
+        return None
+    return MemoStore(max_bytes=int(args.memo_max_mb * 1024 * 1024))
+
+
+def evict_memo(memo):
+    """运行结束时把缓存裁剪到大小上限以内"""
+    if memo is None:
+        return
+    removed, remaining = memo.evict()
+    if removed:
+        print(f"解析和渲染缓存: 删除 {removed} 个最久未用的条目，剩余 {remaining / 1024 / 1024:.1f} MB")
+
+
+def cmd_fetch(args):
+    """抓取页面（或 --offline 用快照重建），更新索引并生成汇总页面"""
+    if args.merge_shards:
+        merge_shards(args.shard_dir, args.parse_workers, not args.no_compress)
+        return
+    metrics = RunMetrics()
 
-def main():
     # 检查依赖
-    check_dependencies()
+    check_dependencies(PARSER_PACKAGES[args.parser] if args.offline else ('requests',) + PARSER_PACKAGES[args.parser])
+    
+    # 页面引用的共享样式和脚本
+    write_site_assets()
     
     # 读取已采集的链接
-    with open(os.path.join(DOCS_DIR, 'a.txt'), 'r', encoding='utf-8') as f:
-        links = [line.strip() for line in f.readlines()]
+    links_file = os.path.join(DOCS_DIR, 'a.txt')
+    links = read_links()
+    
+    if args.discover and args.offline:
+        print("离线模式下不进行链接发现")
+    elif args.discover and args.shard:
+        # 各分片必须基于同一份 a.txt，链接发现应在分片运行之前单独进行
+        print("分片运行时不进行链接发现")
+    elif args.discover:
+        print("正在发现新页面...")
+        from discover import append_links, discover_links
+
+        discovery_client = HttpClient(HostRateLimiter(args.rate, args.burst), retries=args.retries,
+                                      backoff=args.backoff, timeout=args.timeout)
+        try:
+            with metrics.run_timer('discover'):
+                new_links = discover_links(discovery_client, links, args.discover_depth, args.discover_max_pages)
+        finally:
+            discovery_client.close()
+        append_links(links_file, new_links)
+        links.extend(new_links)
     
-    print(f"开始处理 {len(links)} 个页面...")
+    report_name_suffix = ''
+    if args.shard:
+        shard_index, shard_count = args.shard
+        label = shard_label(shard_index, shard_count)
+        report_name_suffix = f"-{label}"
+        shard_links = select_shard(links, shard_index, shard_count, parse_url_to_path)
+        print(f"分片 {shard_index}/{shard_count}: 负责 {len(shard_links)}/{len(links)} 个链接")
+        # 每个分片使用自己的处理日志，多个分片可以在同一台机器上同时运行
+        journal = Journal(os.path.join(os.path.dirname(JOURNAL_PATH), f"journal-{label}.jsonl"))
+        selected_links = select_links(shard_links, journal, args.resume, args.retry_failed)
+    elif args.targets:
+        # 只处理指定的页面，保留处理日志中其他页面的记录
+        journal = Journal()
+        selected_links = resolve_targets(args.targets, links)
+    else:
+        journal = Journal()
+        selected_links = select_links(links, journal, args.resume, args.retry_failed)
     
-    for i, link in enumerate(links, 1):
-        print(f"\n处理进度: {i}/{len(links)}")
-        save_page_data(link)
-        time.sleep(2)
+    print(f"开始处理 {len(selected_links)} 个页面...")
     
-    print(f"\n所有页面处理完成！")
+    if args.offline:
+        store = SnapshotStore()
+    else:
+        store = None if args.no_snapshots else SnapshotStore()
+    build = BuildManifest(DOCS_DIR)
+    memo = open_memo(args)
+    if args.shard:
+        # 分片只写出自己的页面和分片清单，汇总目录、下载索引、快照清单和汇总页面由合并步骤统一更新
+        try:
+            counts = run_pages(args, selected_links, journal, metrics, store, build, memo=memo)
+        finally:
+            unfinished = journal.close()
+            evict_memo(memo)
+        pages, snapshot_entries = shard_page_results(shard_links, journal, store, build)
+        manifest_path = shard_manifest_path(shard_index, shard_count, args.shard_dir)
+        write_shard_manifest(manifest_path, shard_index, shard_count, links_digest(dedupe_links_by_path(links)),
+                             pages, snapshot_entries)
+        print_run_summary(counts)
+        print(f"分片清单: {manifest_path}")
+    else:
+        from catalog import Catalog
+
+        catalog = Catalog()
+        download_index = DownloadIndex()
+        change_feed = ChangeFeed()
+        indexes = (catalog, download_index, change_feed)
+        try:
+            counts = run_pages(args, selected_links, journal, metrics, store, build, indexes, memo)
+            if not (args.offline or args.targets):
+                # 已从 a.txt 中移除的页面不再保留在索引中
+                paths = [parse_url_to_path(link) for link in links]
+                for index in indexes:
+                    index.retain(paths)
+                build.retain(paths + INDEX_OUTPUTS)
+        finally:
+            catalog.close()
+            download_index.save()
+            change_feed.save()
+            unfinished = journal.close()
+            if store is not None:
+                store.save()
+            evict_memo(memo)
+        if args.offline:
+            print(f"\n离线处理完成！重新生成 {counts[PAGE_UPDATED]} 个，缺少快照或失败 {counts[PAGE_FAILED]} 个")
+        else:
+            if store is not None:
+                store.prune()
+            print_run_summary(counts)
+        print_download_conflicts(download_index)
+        print_change_summary(change_feed)
+    if unfinished:
+        print(f"⚠️ 还有 {unfinished} 个页面未完成，可使用 --resume 续跑或 --retry-failed 只重试失败的页面")
     
-    # 生成汇总页面
-    print("\n正在生成汇总页面...")
-    generate_index_html()
-    print("汇总页面生成完成！")
+    if not args.shard:
+        # 生成汇总页面
+        print("\n正在生成汇总页面...")
+        with metrics.run_timer('generate_index'):
+            generate_index_html(build)
+        build.save()
+        print("汇总页面生成完成！")
+        if not args.no_compress:
+            with metrics.run_timer('compress'):
+                compress_outputs(build, args.parse_workers, partial=bool(args.targets))
+    
+    metrics.record_outputs(build.written, build.unchanged)
+    print_output_changes(build)
+    
+    # 输出各阶段耗时报告
+    metrics.finish()
+    report_path = os.path.join(args.report_dir, report_suffix(REPORT_FILENAME, report_name_suffix))
+    metrics_path = args.metrics_file or os.path.join(args.report_dir,
+                                                     report_suffix(PROMETHEUS_FILENAME, report_name_suffix))
+    print_stage_summary(write_reports(metrics, report_path, metrics_path))
+    print(f"运行报告: {report_path}")
+
+
+def cmd_parse(args):
+    """解析单个页面并输出提取的数据，不写任何文件"""
+    def log(message):
+        # 标准输出只留给 JSON
+        print(message, file=sys.stderr)
+
+    check_dependencies(PARSER_PACKAGES[args.parser], log)
+    if not is_http_url(args.target) and os.path.isfile(args.target) and _docs_relpath(args.target) is None:
+        with open(args.target, 'r', encoding='utf-8') as f:
+            html = f.read()
+        url = args.url or args.target
+    else:
+        url = resolve_targets([args.target], read_links())[0]
+        html = SnapshotStore().get_text(url)
+        if html is None:
+            log(f"❌ 没有该页面的快照，请先运行: python app.py fetch {url}")
+            sys.exit(1)
+    data = parse_page_html(html, url, args.parser)
+    if not data:
+        log(f"无法提取页面数据: {url}")
+        sys.exit(1)
+    print(json.dumps(data, ensure_ascii=False, indent=2))
+
+
+def rerender_page_from_data(url, log=print, build=None, memo=None):
+    """用已有的 data.json 重新渲染页面（如模板变化后），不需要网络和 HTML 解析"""
+    data = load_page_data(parse_url_to_path(url))
+    if data is None:
+        log(f"没有该页面的 data.json，请先抓取: {url}")
+        return PAGE_FAILED
+    start = time.perf_counter()
+    json_content, digest, html = render_page_data(data, current_output_digest(url, build), memo)
+    rendered = {'data': data, 'json': json_content, 'digest': digest, 'html': html, 'error': None,
+                'timings': {'render': time.perf_counter() - start}}
+    write_rendered_page(url, rendered, log, build=build)
+    return PAGE_NOT_MODIFIED if html is None else PAGE_UPDATED
+
+
+def cmd_render(args):
+    """重新生成页面：默认用 data.json 渲染，--offline 时用快照重新解析"""
+    links = read_links()
+    selected_links = resolve_targets(args.targets, links) if args.targets else links
+    write_site_assets()
+    build = BuildManifest(DOCS_DIR)
+    # --force 用于模板改了但 RENDER_VERSION 没变的情况，缓存中的渲染结果同样不可信
+    memo = None if args.force else open_memo(args)
+    if args.force:
+        # 去掉这些页面的输入哈希，写入时仍会与磁盘内容比较，内容相同的文件不会重写
+        build.forget(f"{parse_url_to_path(link)}/index.html" for link in selected_links)
+    if args.offline:
+        check_dependencies(PARSER_PACKAGES[args.parser])
+        from catalog import Catalog
+
+        catalog = Catalog()
+        download_index = DownloadIndex()
+        change_feed = ChangeFeed()
+        try:
+            counts = run_pages(args, selected_links, None, None, SnapshotStore(), build,
+                               (catalog, download_index, change_feed), memo)
+        finally:
+            catalog.close()
+            download_index.save()
+            change_feed.save()
+        print_change_summary(change_feed)
+    else:
+        handler = functools.partial(rerender_page_from_data, build=build, memo=memo)
+        counts = process_links(selected_links, args.workers, handler)
+    build.save()
+    evict_memo(memo)
+    print(f"\n重新生成完成！渲染 {counts[PAGE_UPDATED]} 个，未变化 {counts[PAGE_NOT_MODIFIED]} 个，"
+          f"失败 {counts[PAGE_FAILED]} 个")
+    print_output_changes(build)
+    if not args.no_compress:
+        compress_outputs(build, args.parse_workers, partial=bool(args.targets))
+
+
+def cmd_index(args):
+    """只重新生成汇总页面和搜索索引（读取各页面已有的 data.json）"""
+    build = BuildManifest(DOCS_DIR)
+    generate_index_html(build)
+    build.save()
+    print_output_changes(build)
+    if not args.no_compress:
+        compress_outputs(build, partial=True)
+
+
+def cmd_report(args):
+    """输出上次运行的报告；给出页面时输出这些页面各阶段的耗时"""
+    suffix = f"-{shard_label(*args.shard)}" if args.shard else ''
+    report_path = os.path.join(args.report_dir, report_suffix(REPORT_FILENAME, suffix))
+    try:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        print(f"❌ 无法读取运行报告: {report_path}")
+        sys.exit(1)
+    if not args.targets:
+        started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(report['started_at']))
+        statuses = '，'.join(f"{status} {count} 个" for status, count in report['statuses'].items())
+        print(f"运行报告: {report_path}")
+        print(f"开始于 {started}，耗时 {report['duration_seconds'] or 0:.1f}s，"
+              f"共 {report['pages']} 个页面" + (f"（{statuses}）" if statuses else ''))
+        print(f"生成文件: 写入 {len(report['outputs']['written'])} 个，未变化 {report['outputs']['unchanged']} 个")
+        print_stage_summary(report)
+        return
+    by_path = {parse_url_to_path(url): url for url in report['urls']}
+    for target in args.targets:
+        url = by_path.get(target_to_path(target))
+        if url is None:
+            print(f"报告中没有该页面: {target}")
+            continue
+        page = report['urls'][url]
+        print(f"{url}（{page['status']}）")
+        for stage, seconds in page['stages'].items():
+            nbytes = page['bytes'].get(stage)
+            print(f"  {stage:<12}{seconds * 1000:>8.0f}ms" + (f"  {nbytes} 字节" if nbytes else ''))
+
+
+def cmd_check_links(args):
+    """检查下载链接：http(s) 链接是否可用，ed2k / magnet 链接的格式和文件大小；有问题时退出码为 1"""
+    paths = None
+    if args.targets:
+        paths = [parse_url_to_path(link) for link in resolve_targets(args.targets, read_links())]
+    cache = None if args.no_cache else LinkCheckCache(ttl=args.ttl_hours * 3600)
+    client = HttpClient(HostRateLimiter(args.rate, args.burst), retries=args.retries, backoff=args.backoff,
+                        timeout=args.timeout, pool_size=max(args.workers, 1))
+    try:
+        report = check_links(DOCS_DIR, client, cache, args.workers, args.per_host, paths)
+    finally:
+        client.close()
+    if cache is not None:
+        cache.save()
+    report_path = write_health_report(report, args.report_dir)
+    print_health_summary(report)
+    print(f"健康报告: {report_path}")
+    if report['problems']:
+        sys.exit(1)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.handler(args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,304 @@
+"""离线基准测试
+
+用法:
+    python bench.py run [--repeat N] [--tolerance T] [--filter 关键字] [--update-baseline]
+    python bench.py parsers [--repeat N]
+
+run 按阶段（解析、页面渲染、下载区块渲染、汇总页生成）测量耗时和内存峰值，
+使用 docs/ 下真实页面合成的源站 HTML 以及按规模放大的合成数据，
+与 bench_baseline.json 中保存的基线比较，超出容差时以非零状态退出。
+耗时按各用例相对参照用例（只用标准库的固定负载）的倍数比较，基线可以在不同机器之间共用。
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from html.parser import HTMLParser
+
+import app
+from build_manifest import write_if_changed
+from categories import group_by_category
+from fixtures import build_page_html, synthetic_index_entries, synthetic_page_data
+from search_index import build_search_index
+from golden import iter_golden_files
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# 默认容差：耗时允许比基线慢 50%，内存峰值允许高 20%
+DEFAULT_TIME_TOLERANCE = 0.5
+DEFAULT_MEMORY_TOLERANCE = 0.2
+# 比按基线倍数换算出的预期耗时慢不到该值时视为计时抖动，不判定耗时回归
+NOISE_FLOOR_SECONDS = 0.005
+# 参照用例：与仓库代码无关的固定负载，用来换算机器速度
+REFERENCE_CASE = 'reference/stdlib'
+
+SYNTHETIC_VERSION_COUNTS = (10, 100, 1000)
+SYNTHETIC_INDEX_SIZES = (10000,)
+
+
+def best_time(func, repeat):
+    """重复执行 repeat 次，返回最短耗时（秒）和最后一次的结果"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def bench_parsers(repeat=5):
+    """逐页比较各解析后端的耗时，并确认输出一致；返回不一致的页面数"""
+    backends = app.PARSER_BACKENDS
+    baseline = backends[0]
+    header = f"{'页面':<48}{'大小':>10}" + ''.join(f"{name:>14}" for name in backends)
+    print(header)
+    print('-' * len(header))
+
+    totals = dict.fromkeys(backends, 0.0)
+    mismatches = 0
+    for json_file in iter_golden_files():
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        html = build_page_html(data)
+        url = data['url']
+
+        timings = {}
+        outputs = {}
+        for backend in backends:
+            timings[backend], outputs[backend] = best_time(
+                lambda: app.parse_page_html(html, url, backend), repeat)
+            totals[backend] += timings[backend]
+        if any(outputs[backend] != outputs[baseline] for backend in backends):
+            mismatches += 1
+
+        page = os.path.relpath(os.path.dirname(json_file), app.DOCS_DIR)
+        cells = []
+        for backend in backends:
+            speedup = timings[baseline] / timings[backend]
+            cells.append(f"{timings[backend] * 1000:>7.2f}ms x{speedup:<4.1f}")
+        print(f"{page:<48}{len(html):>10}" + ''.join(f"{cell:>14}" for cell in cells))
+
+    print('-' * len(header))
+    cells = [f"{totals[backend] * 1000:>7.1f}ms x{totals[baseline] / totals[backend]:<4.1f}" for backend in backends]
+    print(f"{'合计':<46}{'':>10}" + ''.join(f"{cell:>14}" for cell in cells))
+    if mismatches:
+        print(f"❌ {mismatches} 个页面的解析结果在不同后端之间不一致")
+    return mismatches
+
+
+# 参照用例的输入：与源站页面相似的重复标签，在导入时生成一次
+REFERENCE_MARKUP = ''.join(
+    f'<div class="row r{i % 7}"><h3>item {i}</h3><p>text {i} &amp; more</p></div>' for i in range(1000))
+
+
+def reference_workload():
+    """参照用例的负载：标准库 html.parser 分词固定的标签串，分配少、耗时稳定"""
+    parser = HTMLParser()
+    parser.feed(REFERENCE_MARKUP)
+    parser.close()
+
+
+def measure_peak_memory(func):
+    """单独执行一次 func，返回 tracemalloc 统计到的内存峰值（字节）"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def load_site_fixtures():
+    """读取 docs/ 下的真实页面数据，返回 [(data, 合成的源站 HTML)]"""
+    fixtures = []
+    for json_file in iter_golden_files():
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        fixtures.append((data, build_page_html(data)))
+    return fixtures
+
+
+def render_category_pages(group):
+    """渲染一个分类的全部分页，返回各页 HTML"""
+    slug, name, entries = group
+    pages = app.paginate(entries)
+    return [''.join(app.iter_category_page_html(slug, name, page_entries, page, len(pages), len(entries)))
+            for page, page_entries in enumerate(pages, 1)]
+
+
+def build_cases():
+    """返回基准用例列表 [(用例名, 函数)]，用例名形如 阶段/数据集"""
+    site = load_site_fixtures()
+    with open(os.path.join(app.DOCS_DIR, 'a.txt'), 'r', encoding='utf-8') as f:
+        site_links = [line.strip() for line in f.readlines()]
+    site_entries = app.index_entries(site_links, build_search_index(app.load_index_pages(site_links)))
+
+    datasets = [('site', site)]
+    for count in SYNTHETIC_VERSION_COUNTS:
+        data = synthetic_page_data(count)
+        datasets.append((f"versions-{count}", [(data, build_page_html(data))]))
+
+    cases = [(REFERENCE_CASE, reference_workload)]
+    for backend in app.PARSER_BACKENDS:
+        for name, pages in datasets:
+            cases.append((
+                f"parse[{backend}]/{name}",
+                lambda pages=pages, backend=backend: [
+                    app.parse_page_html(html, data['url'], backend) for data, html in pages]
+            ))
+    for name, pages in datasets:
+        cases.append((
+            f"generate_html_content/{name}",
+            lambda pages=pages: [app.generate_html_content(data) for data, _ in pages]
+        ))
+
+    downloads = [d for version in synthetic_page_data(500)['versions'] for d in version['downloads']]
+    cases.append((
+        f"render_download_section/downloads-{len(downloads)}",
+        lambda: [app.render_download_section(d) for d in downloads]
+    ))
+
+    cases.append((f"generate_index_html/links-{len(site_entries)}", lambda: app.render_index_html(site_entries)))
+    output_path = os.path.join(tempfile.mkdtemp(prefix='bench-'), 'index.html')
+    for count in SYNTHETIC_INDEX_SIZES:
+        entries = synthetic_index_entries(count)
+        cases.append((f"generate_index_html/links-{count}", lambda entries=entries: app.render_index_html(entries)))
+        # 写入文件：先拼出完整字符串再写入 vs. 逐块渲染直接写入
+        cases.append((
+            f"write_index_html[string]/links-{count}",
+            lambda entries=entries: write_if_changed(output_path, app.render_index_html(entries))
+        ))
+        cases.append((
+            f"write_index_html[stream]/links-{count}",
+            lambda entries=entries: write_if_changed(output_path, app.iter_index_html(entries))
+        ))
+        cases.append((
+            f"render_category_pages/links-{count}",
+            lambda entries=entries: [render_category_pages(group) for group in group_by_category(entries)]
+        ))
+    return cases
+
+
+def load_baseline():
+    try:
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f).get('cases', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baseline(results):
+    baseline = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cases': results,
+    }
+    with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def expected_seconds(base, baseline, reference_seconds):
+    """按基线中相对参照用例的倍数换算出本机的预期耗时"""
+    base_reference = baseline.get(REFERENCE_CASE)
+    if not base_reference or not reference_seconds:
+        return base['seconds']
+    return base['seconds'] / base_reference['seconds'] * reference_seconds
+
+
+def compare_with_baseline(name, result, baseline, time_tolerance, memory_tolerance, reference_seconds=None):
+    """返回回归说明列表，没有回归时为空"""
+    base = baseline.get(name)
+    if not base:
+        return []
+    problems = []
+    seconds = result['seconds']
+    expected = expected_seconds(base, baseline, reference_seconds)
+    if name != REFERENCE_CASE and seconds - expected >= NOISE_FLOOR_SECONDS and seconds > expected * (1 + time_tolerance):
+        problems.append(f"耗时 {seconds * 1000:.1f}ms > 基线换算 {expected * 1000:.1f}ms")
+    peak, base_peak = result['peak_bytes'], base['peak_bytes']
+    if peak > base_peak * (1 + memory_tolerance):
+        problems.append(f"内存峰值 {peak / 1024:.0f}KiB > 基线 {base_peak / 1024:.0f}KiB")
+    return problems
+
+
+def run_suite(repeat=3, name_filter=None, update_baseline=False,
+              time_tolerance=DEFAULT_TIME_TOLERANCE, memory_tolerance=DEFAULT_MEMORY_TOLERANCE):
+    """运行基准用例并与基线比较，返回出现回归的用例数"""
+    baseline = load_baseline()
+    results = {}
+    regressions = 0
+    reference_seconds = None
+
+    print(f"{'用例':<48}{'耗时':>12}{'内存峰值':>14}{'基线换算':>12}  结果")
+    for name, func in build_cases():
+        # 参照用例总是运行，其他用例的耗时都按它换算
+        if name_filter and name_filter not in name and name != REFERENCE_CASE:
+            continue
+        # 参照用例的抖动会传导到所有用例，多重复几次取最短耗时
+        seconds, _ = best_time(func, max(repeat, 10) if name == REFERENCE_CASE else repeat)
+        peak = measure_peak_memory(func)
+        result = {'seconds': round(seconds, 6), 'peak_bytes': peak}
+        results[name] = result
+        if name == REFERENCE_CASE:
+            reference_seconds = seconds
+
+        base = baseline.get(name)
+        base_text = f"{expected_seconds(base, baseline, reference_seconds) * 1000:.1f}ms" if base else '-'
+        problems = [] if update_baseline else compare_with_baseline(
+            name, result, baseline, time_tolerance, memory_tolerance, reference_seconds)
+        if problems:
+            regressions += 1
+        status = '❌ ' + '；'.join(problems) if problems else ('✅' if base else '（无基线）')
+        print(f"{name:<48}{seconds * 1000:>10.1f}ms{peak / 1024:>11.0f}KiB{base_text:>12}  {status}")
+
+    if update_baseline:
+        if name_filter:
+            merged = dict(baseline)
+            merged.update(results)
+            results = merged
+        save_baseline(results)
+        print(f"\n基线已更新: {BASELINE_FILE}")
+    elif regressions:
+        print(f"\n❌ {regressions} 个用例超出基线容差")
+    else:
+        print("\n✅ 没有发现性能回归")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='离线基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_cmd = subparsers.add_parser('run', help='按阶段测量耗时和内存峰值，并与基线比较')
+    run_cmd.add_argument('--repeat', type=int, default=3, help='每个用例重复次数，取最短耗时')
+    run_cmd.add_argument('--filter', dest='name_filter', help='只运行名称包含该关键字的用例')
+    run_cmd.add_argument('--tolerance', type=float, default=DEFAULT_TIME_TOLERANCE,
+                         help=f'耗时回归容差（默认 {DEFAULT_TIME_TOLERANCE}，即慢 50%% 以上视为回归）')
+    run_cmd.add_argument('--memory-tolerance', type=float, default=DEFAULT_MEMORY_TOLERANCE,
+                         help=f'内存峰值回归容差（默认 {DEFAULT_MEMORY_TOLERANCE}）')
+    run_cmd.add_argument('--update-baseline', action='store_true', help='用本次结果覆盖基线')
+    parsers_cmd = subparsers.add_parser('parsers', help='逐页比较各解析后端的耗时')
+    parsers_cmd.add_argument('--repeat', type=int, default=5, help='每个后端重复次数，取最短耗时')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        if run_suite(args.repeat, args.name_filter, args.update_baseline,
+                     args.tolerance, args.memory_tolerance):
+            sys.exit(1)
+    elif args.command == 'parsers':
+        if bench_parsers(args.repeat):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""生成文件的构建清单
+
+data/build-manifest.json 记录 docs/ 下每个生成文件（相对路径）对应的输入哈希
+（页面数据 + 模板版本）。输入没有变化且文件仍然存在时跳过渲染和写入；
+需要写入时先与磁盘上的内容比较，内容相同也不重写，写入通过临时文件 + rename 原子完成。
+这样未变化的页面不会改动文件的 mtime，也不会给 git diff / commit 带来额外的工作。
+
+每次运行写入了哪些文件记录在 written 中，随运行报告一起输出。
+"""
+import hashlib
+import json
+import os
+import threading
+
+from storage import DATA_DIR, write_json_atomic
+
+BUILD_MANIFEST_DIR = DATA_DIR
+BUILD_MANIFEST_FILENAME = 'build-manifest.json'
+
+
+def inputs_hash(*parts):
+    """把若干字符串输入合成一个哈希"""
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = part.encode('utf-8')
+        # 带上长度，避免不同的切分方式得到相同的哈希
+        digest.update(len(encoded).to_bytes(8, 'big'))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+# 流式写入时的文件缓冲区大小
+WRITE_BUFFER_SIZE = 1 << 16
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(WRITE_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_if_changed(path, content):
+    """内容与磁盘上的文件不同时原子写入，返回是否写入
+
+    content 可以是字符串，也可以是逐块产出字符串的可迭代对象（如 iter_index_html）：
+    各块边编码边写入临时文件，不会在内存中拼出完整内容，写完后再与原文件比较。
+    """
+    chunks = (content,) if isinstance(content, str) else content
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            for chunk in chunks:
+                data = chunk.encode('utf-8')
+                digest.update(data)
+                size += len(data)
+                f.write(data)
+        try:
+            unchanged = os.path.getsize(path) == size and _file_sha256(path) == digest.hexdigest()
+        except OSError:
+            unchanged = False
+        if unchanged:
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+class BuildManifest:
+    """生成文件到输入哈希的映射（线程安全）"""
+
+    def __init__(self, output_dir, root=BUILD_MANIFEST_DIR):
+        self.output_dir = output_dir
+        self.root = root
+        self.path = os.path.join(root, BUILD_MANIFEST_FILENAME)
+        self._lock = threading.Lock()
+        self._dirty = False
+        # 相对于 output_dir 的路径 -> 输入哈希
+        self.entries = self._load()
+        # 本次运行实际写入的文件和跳过的文件数
+        self.written = []
+        self.unchanged = 0
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def full_path(self, rel_path):
+        return os.path.join(self.output_dir, *rel_path.split('/'))
+
+    def is_current(self, rel_path, digest):
+        """输入哈希与上次相同且文件仍然存在"""
+        with self._lock:
+            current = self.entries.get(rel_path) == digest
+        return current and os.path.exists(self.full_path(rel_path))
+
+    def skip(self, rel_paths):
+        """记录因输入未变化而跳过的文件"""
+        with self._lock:
+            self.unchanged += len(rel_paths)
+
+    def write(self, rel_path, digest, content):
+        """写出一个生成文件（字符串或逐块产出的字符串）并记录其输入哈希，返回是否写入"""
+        written = write_if_changed(self.full_path(rel_path), content)
+        with self._lock:
+            if written:
+                self.written.append(rel_path)
+            else:
+                self.unchanged += 1
+            if self.entries.get(rel_path) != digest:
+                self.entries[rel_path] = digest
+                self._dirty = True
+        return written
+
+    def update_entries(self, entries):
+        """合并其他进程（如分片运行）记录的条目，返回有变化的条目数"""
+        changed = 0
+        with self._lock:
+            for rel_path, digest in entries.items():
+                if self.entries.get(rel_path) != digest:
+                    self.entries[rel_path] = digest
+                    changed += 1
+            if changed:
+                self._dirty = True
+        return changed
+
+    def forget(self, rel_paths):
+        """删除若干文件的条目，下次写出时不再跳过渲染"""
+        with self._lock:
+            for rel_path in rel_paths:
+                if self.entries.pop(rel_path, None) is not None:
+                    self._dirty = True
+
+    def retain(self, prefixes):
+        """删除不属于任何 prefixes（页面目录或文件路径）的条目，返回删除的条目数"""
+        keep = set(prefixes)
+        with self._lock:
+            stale = [rel_path for rel_path in self.entries
+                     if rel_path not in keep and rel_path.rsplit('/', 1)[0] not in keep]
+            for rel_path in stale:
+                del self.entries[rel_path]
+            if stale:
+                self._dirty = True
+        return len(stale)
+
+    def save(self):
+        """写回清单（仅在有变化时）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            write_json_atomic(self.path, self.entries)
+            self._dirty = False
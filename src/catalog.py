@@ -0,0 +1,318 @@
+"""全部页面、版本和下载链接的汇总目录
+
+在 data/ 下维护一个 SQLite 数据库（catalog.sqlite）和一份 JSONL 导出（catalog.jsonl），
+由 save_page_data 的处理结果增量更新：只有内容变化的页面才会重写对应的行。
+查询时直接使用数据库索引，不再逐个读取 docs/ 下的 data.json。
+
+用法:
+    python catalog.py query [--keyword 词 ...] [--ext iso] [--min-size 5GB] [--max-size 大小]
+                            [--page 路径前缀] [--type 下载类型] [--limit N] [--json]
+    python catalog.py build    # 根据 docs/**/data.json 完整重建
+    python catalog.py export   # 重新导出 catalog.jsonl
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+from metadata import parse_attributes, parse_download_url, parse_size
+from storage import DATA_DIR, open_atomic
+
+CATALOG_DIR = DATA_DIR
+CATALOG_DB_FILENAME = 'catalog.sqlite'
+CATALOG_JSONL_FILENAME = 'catalog.jsonl'
+# 表结构变化时递增；打开旧版本的数据库会清空后重新增量写入
+CATALOG_SCHEMA_VERSION = 2
+_TABLES = ('download_terms', 'downloads', 'versions', 'pages')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    path TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    intro_text TEXT NOT NULL,
+    data_sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    page_path TEXT NOT NULL REFERENCES pages(path) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    version_text TEXT NOT NULL,
+    attributes TEXT NOT NULL,
+    file_name TEXT,
+    size_bytes INTEGER,
+    release_date TEXT,
+    md5 TEXT,
+    sha1 TEXT
+);
+CREATE TABLE IF NOT EXISTS downloads (
+    id INTEGER PRIMARY KEY,
+    version_id INTEGER NOT NULL REFERENCES versions(id) ON DELETE CASCADE,
+    page_path TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    download_url TEXT NOT NULL,
+    download_type TEXT NOT NULL,
+    scheme TEXT NOT NULL,
+    file_name TEXT,
+    ext TEXT,
+    size_bytes INTEGER,
+    ed2k TEXT,
+    btih TEXT
+);
+CREATE TABLE IF NOT EXISTS download_terms (
+    term TEXT NOT NULL,
+    download_id INTEGER NOT NULL REFERENCES downloads(id) ON DELETE CASCADE,
+    PRIMARY KEY (term, download_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS versions_page ON versions(page_path);
+CREATE INDEX IF NOT EXISTS downloads_version ON downloads(version_id);
+CREATE INDEX IF NOT EXISTS downloads_page ON downloads(page_path);
+CREATE INDEX IF NOT EXISTS downloads_ext_size ON downloads(ext, size_bytes);
+CREATE INDEX IF NOT EXISTS downloads_size ON downloads(size_bytes);
+CREATE INDEX IF NOT EXISTS downloads_ed2k ON downloads(ed2k);
+CREATE INDEX IF NOT EXISTS downloads_btih ON downloads(btih);
+CREATE INDEX IF NOT EXISTS versions_release_date ON versions(release_date);
+CREATE INDEX IF NOT EXISTS download_terms_download ON download_terms(download_id);
+"""
+
+_TERM_SPLIT_RE = re.compile(r'[\s_.()\[\]]+')
+
+
+def data_sha256(data):
+    """页面数据的规范化哈希，用于判断是否需要重写"""
+    text = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def file_terms(file_name):
+    """文件名切分出的检索词（小写，按下划线、点和空白切分）"""
+    return {term for term in _TERM_SPLIT_RE.split(file_name.lower()) if term}
+
+
+class Catalog:
+    """SQLite 汇总目录（线程安全，所有写入串行执行）"""
+
+    def __init__(self, root=CATALOG_DIR):
+        self.root = root
+        self.db_path = os.path.join(root, CATALOG_DB_FILENAME)
+        self.jsonl_path = os.path.join(root, CATALOG_JSONL_FILENAME)
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] != CATALOG_SCHEMA_VERSION:
+            # 目录是派生数据，旧表结构直接丢弃，之后由页面处理结果重新写入
+            with self.conn:
+                for table in _TABLES:
+                    self.conn.execute(f'DROP TABLE IF EXISTS {table}')
+            self.conn.execute(f'PRAGMA user_version = {CATALOG_SCHEMA_VERSION}')
+        self.conn.executescript(_SCHEMA)
+
+    def page_hashes(self):
+        with self._lock:
+            return dict(self.conn.execute('SELECT path, data_sha256 FROM pages'))
+
+    def has_page(self, path):
+        with self._lock:
+            return self.conn.execute('SELECT 1 FROM pages WHERE path = ?', (path,)).fetchone() is not None
+
+    def put_page(self, path, data, digest=None):
+        """写入或替换一个页面的全部数据；内容未变化时不做任何修改，返回是否写入"""
+        digest = digest or data_sha256(data)
+        with self._lock, self.conn:
+            row = self.conn.execute('SELECT data_sha256 FROM pages WHERE path = ?', (path,)).fetchone()
+            if row is not None and row[0] == digest:
+                return False
+            # 级联删除旧的版本、下载和检索词
+            self.conn.execute('DELETE FROM pages WHERE path = ?', (path,))
+            self.conn.execute(
+                'INSERT INTO pages (path, url, title, intro_text, data_sha256) VALUES (?, ?, ?, ?, ?)',
+                (path, data.get('url', ''), data.get('title', ''), data.get('intro_text', ''), digest))
+            for version_position, version in enumerate(data.get('versions', [])):
+                # 补充结构化字段之前生成的 data.json 没有 fields / link，现场解析
+                fields = version['fields'] if 'fields' in version else parse_attributes(version.get('attributes', []))
+                version_id = self.conn.execute(
+                    'INSERT INTO versions (page_path, position, version_text, attributes, '
+                    'file_name, size_bytes, release_date, md5, sha1) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (path, version_position, version.get('version_text', ''),
+                     json.dumps(version.get('attributes', []), ensure_ascii=False),
+                     fields.get('file_name'), fields.get('size_bytes'), fields.get('release_date'),
+                     fields.get('md5'), fields.get('sha1'))).lastrowid
+                for position, download in enumerate(version.get('downloads', [])):
+                    self._insert_download(path, version_id, position, download)
+            self._dirty = True
+        return True
+
+    def _insert_download(self, path, version_id, position, download):
+        download_url = download.get('download_url', '')
+        link = download['link'] if 'link' in download else parse_download_url(download_url)
+        file_name = link.get('file_name')
+        ext = os.path.splitext(file_name)[1].lstrip('.').lower() if file_name else None
+        download_id = self.conn.execute(
+            'INSERT INTO downloads (version_id, page_path, position, download_url, download_type, '
+            'scheme, file_name, ext, size_bytes, ed2k, btih) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (version_id, path, position, download_url, download.get('download_type', ''),
+             link.get('scheme', ''), file_name, ext or None, link.get('size_bytes'),
+             link.get('ed2k'), link.get('btih'))).lastrowid
+        if file_name:
+            self.conn.executemany('INSERT OR IGNORE INTO download_terms (term, download_id) VALUES (?, ?)',
+                                  [(term, download_id) for term in file_terms(file_name)])
+
+    def retain(self, paths):
+        """删除不在 paths 中的页面，返回删除的页面数"""
+        keep = set(paths)
+        with self._lock, self.conn:
+            stale = [path for (path,) in self.conn.execute('SELECT path FROM pages') if path not in keep]
+            self.conn.executemany('DELETE FROM pages WHERE path = ?', [(path,) for path in stale])
+            if stale:
+                self._dirty = True
+        return len(stale)
+
+    def iter_download_records(self):
+        """按页面、版本、链接顺序逐条产出扁平化的下载记录"""
+        cursor = self.conn.execute("""
+            SELECT p.path, p.url, p.title, v.position AS version_position, v.version_text, v.attributes,
+                   v.release_date, d.download_url, d.download_type, d.scheme, d.file_name, d.ext,
+                   d.size_bytes, d.ed2k, d.btih
+            FROM downloads d
+            JOIN versions v ON v.id = d.version_id
+            JOIN pages p ON p.path = d.page_path
+            ORDER BY p.path, v.position, d.position
+        """)
+        for row in cursor:
+            record = dict(row)
+            record['attributes'] = json.loads(record['attributes'])
+            yield record
+
+    def export_jsonl(self):
+        """流式导出 catalog.jsonl，每行一个下载链接，返回写入的行数"""
+        count = 0
+        with self._lock, open_atomic(self.jsonl_path) as f:
+            for record in self.iter_download_records():
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write('\n')
+                count += 1
+        return count
+
+    def query(self, keywords=(), ext=None, min_size=None, max_size=None, page=None,
+              download_type=None, limit=None):
+        """按条件查询下载记录；keywords 为文件名检索词，多个词之间取交集"""
+        conditions = []
+        params = []
+        for keyword in keywords:
+            for term in file_terms(keyword):
+                conditions.append('d.id IN (SELECT download_id FROM download_terms WHERE term = ?)')
+                params.append(term)
+        if ext:
+            conditions.append('d.ext = ?')
+            params.append(ext.lstrip('.').lower())
+        if min_size is not None:
+            conditions.append('d.size_bytes >= ?')
+            params.append(min_size)
+        if max_size is not None:
+            conditions.append('d.size_bytes <= ?')
+            params.append(max_size)
+        if page:
+            conditions.append('d.page_path LIKE ? ESCAPE \'\\\'')
+            params.append(page.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+        if download_type:
+            conditions.append('d.download_type LIKE ?')
+            params.append(f"%{download_type}%")
+        sql = """
+            SELECT d.page_path AS path, v.version_text, v.release_date, d.download_type, d.scheme,
+                   d.file_name, d.size_bytes, d.ed2k, d.btih, d.download_url
+            FROM downloads d
+            JOIN versions v ON v.id = d.version_id
+        """
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY d.page_path, v.position, d.position'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def close(self, export=True):
+        """提交并关闭数据库；有变化时同时重新导出 JSONL"""
+        if export and (self._dirty or not os.path.exists(self.jsonl_path)):
+            self.export_jsonl()
+        self._dirty = False
+        self.conn.close()
+
+
+def format_size(size):
+    if size is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.2f}{unit}" if unit != 'B' else f"{size}B"
+        size /= 1024
+
+
+def build_catalog(catalog, docs_dir):
+    """根据 docs/ 下的全部 data.json 重建目录，返回写入的页面数"""
+    paths = []
+    written = 0
+    for dirpath, _, filenames in os.walk(docs_dir):
+        if 'data.json' not in filenames:
+            continue
+        path = os.path.relpath(dirpath, docs_dir).replace(os.sep, '/')
+        with open(os.path.join(dirpath, 'data.json'), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        paths.append(path)
+        if catalog.put_page(path, data):
+            written += 1
+    catalog.retain(paths)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='查询汇总目录中的版本和下载链接')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    query_cmd = subparsers.add_parser('query', help='按条件查询下载链接')
+    query_cmd.add_argument('--keyword', '-k', action='append', default=[],
+                           help='文件名检索词（按下划线和点切分，可重复，如 -k x64 -k zh-cn）')
+    query_cmd.add_argument('--ext', help='文件扩展名，如 iso、exe')
+    query_cmd.add_argument('--min-size', type=parse_size, help='最小文件大小，如 5GB')
+    query_cmd.add_argument('--max-size', type=parse_size, help='最大文件大小')
+    query_cmd.add_argument('--page', help='页面路径前缀，如 windows-11/')
+    query_cmd.add_argument('--type', dest='download_type', help='下载类型，如 BT、迅雷')
+    query_cmd.add_argument('--limit', type=int, help='最多返回的记录数')
+    query_cmd.add_argument('--json', action='store_true', help='以 JSONL 格式输出')
+    build_cmd = subparsers.add_parser('build', help='根据 docs/**/data.json 完整重建目录')
+    build_cmd.add_argument('--docs', default=os.path.join(os.path.dirname(CATALOG_DIR), 'docs'),
+                           help='docs 目录位置')
+    subparsers.add_parser('export', help='重新导出 catalog.jsonl')
+    args = parser.parse_args(argv)
+
+    catalog = Catalog()
+    if args.command == 'query':
+        rows = catalog.query(args.keyword, args.ext, args.min_size, args.max_size,
+                             args.page, args.download_type, args.limit)
+        catalog.close(export=False)
+        for row in rows:
+            if args.json:
+                print(json.dumps(row, ensure_ascii=False))
+            else:
+                print(f"{row['path']:<36}{format_size(row['size_bytes']):>10}  {row['file_name'] or row['download_url']}")
+        if not args.json:
+            print(f"共 {len(rows)} 条记录", file=sys.stderr)
+    elif args.command == 'build':
+        written = build_catalog(catalog, args.docs)
+        catalog.close()
+        print(f"目录已重建: 更新 {written} 个页面 → {catalog.db_path}")
+    elif args.command == 'export':
+        count = catalog.export_jsonl()
+        catalog.close(export=False)
+        print(f"已导出 {count} 条记录 → {catalog.jsonl_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""汇总页的分类规则
+
+CATEGORY_RULES 按汇总页上的显示顺序列出各分类：slug（分类页的目录名）、显示名称，
+以及匹配页面路径（parse_url_to_path 的结果）开头的正则表达式。新增分类只需在表中加一行。
+
+全部规则预先编译为一个带命名分组的正则，每个页面只匹配一次：各分支都从路径开头匹配，
+同一位置上正则按分支顺序尝试，因此结果与按顺序逐条检查规则相同。
+没有任何规则匹配的页面归入"其他"，不会从汇总页中丢失。
+"""
+import re
+
+CATEGORY_RULES = (
+    ('office', 'Office 系列', r'applications/office'),
+    ('windows-legacy', 'Windows 早期版本', r'operating-systems/windows'),
+    ('sql-server', 'SQL Server 系列', r'servers/sql-server'),
+    ('windows-10', 'Windows 10 系列', r'windows-10/win10'),
+    ('windows-11', 'Windows 11 系列', r'windows-11/win11'),
+    ('windows-server', 'Windows Server 系列', r'windows-server/windows-server'),
+)
+OTHER_CATEGORY = ('other', '其他')
+
+
+def compile_category_rules(rules):
+    """把规则表编译为一个正则，分组名 c<i> 对应第 i 条规则"""
+    return re.compile('|'.join(f"(?P<c{i}>{pattern})" for i, (_, _, pattern) in enumerate(rules)))
+
+
+_CATEGORY_RE = compile_category_rules(CATEGORY_RULES)
+
+
+def category_slugs(rules=CATEGORY_RULES):
+    """全部分类（含"其他"）的 slug，按显示顺序"""
+    return [slug for slug, _, _ in rules] + [OTHER_CATEGORY[0]]
+
+
+def categorize(path, rules=CATEGORY_RULES, pattern=_CATEGORY_RE):
+    """页面路径所属分类的 (slug, 名称)"""
+    match = pattern.match(path)
+    if match is None:
+        return OTHER_CATEGORY
+    slug, name, _ = rules[int(match.lastgroup[1:])]
+    return slug, name
+
+
+def group_by_category(entries, path=lambda entry: entry[0], rules=CATEGORY_RULES, pattern=_CATEGORY_RE):
+    """按分类分组，返回 [(slug, 名称, [条目])]：分类按规则顺序（"其他"在最后），
+    组内保持条目原有顺序，没有条目的分类不出现"""
+    groups = {slug: (slug, name, []) for slug, name, _ in rules}
+    groups[OTHER_CATEGORY[0]] = OTHER_CATEGORY + ([],)
+    for entry in entries:
+        groups[categorize(path(entry), rules, pattern)[0]][2].append(entry)
+    return [group for group in groups.values() if group[2]]
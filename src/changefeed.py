@@ -0,0 +1,322 @@
+"""版本变更记录和订阅源（JSON Feed / Atom）
+
+每天的运行会提交新的 data.json，但要知道出现了哪些新的镜像（如"2025.01更新"）只能去翻 git diff。
+ChangeFeed 与 Catalog、DownloadIndex 一样作为索引接收 put_page(path, data)，只有内容变化
+（或首次收录）的页面才会被调用，因此每次运行的开销只与变化的页面数有关，不需要重新扫描 docs/：
+
+- data/changefeed-state.json：每个页面上次的版本摘要，按版本键（版本标题）记录下载文件
+  （ed2k / btih 哈希，其他链接为原始地址）和结构化属性（文件名、大小、日期、MD5 / SHA1）；
+- data/changelog.jsonl：只追加的变更记录，每行一个版本的新增、删除或变化；
+- data/feed-items.json：最近 FEED_MAX_ITEMS 条订阅条目（每次运行中每个有变化的页面一条），
+  生成汇总页面时据此写出 docs/feed.json（JSON Feed 1.1）和 docs/feed.atom。
+
+状态文件不存在时（首次运行）只记录基线，不产生变更。源站"所有版本"汇总版本
+（没有属性、下载链接都在其他版本中出现过）不参与比较，否则每个新版本都会让它一起变化。
+"""
+import html
+import json
+import os
+import re
+import threading
+import time
+
+from metadata import parse_attributes, parse_download_url
+from storage import DATA_DIR, write_json_atomic
+
+CHANGEFEED_DIR = DATA_DIR
+CHANGEFEED_STATE_FILENAME = 'changefeed-state.json'
+CHANGELOG_FILENAME = 'changelog.jsonl'
+FEED_ITEMS_FILENAME = 'feed-items.json'
+FEED_JSON_FILENAME = 'feed.json'
+FEED_ATOM_FILENAME = 'feed.atom'
+
+# 订阅源中保留的条目数
+FEED_MAX_ITEMS = 50
+
+CHANGE_ADDED = 'added'
+CHANGE_REMOVED = 'removed'
+CHANGE_CHANGED = 'changed'
+_CHANGE_LABELS = {CHANGE_ADDED: '新增', CHANGE_REMOVED: '删除', CHANGE_CHANGED: '变化'}
+
+# 参与比较的下载哈希类型（download['link'] 中的键）
+_HASH_KINDS = ('ed2k', 'btih')
+_SPACE_RE = re.compile(r'\s+')
+
+FEED_TITLE = 'Microsoft 资源版本更新'
+
+
+def version_key(version):
+    """版本键：空白规范化后的版本标题（同一页面上重复的标题由 page_versions 编号）"""
+    return _SPACE_RE.sub(' ', version.get('version_text', '')).strip()
+
+
+def _download_key(download):
+    link = download['link'] if 'link' in download else parse_download_url(download.get('download_url', ''))
+    for kind in _HASH_KINDS:
+        if kind in link:
+            return f"{kind}:{link[kind]}"
+    return download.get('download_url', '')
+
+
+def _is_summary_version(version, other_urls):
+    """源站"所有版本"页签：没有属性，下载链接都在其他版本中出现过"""
+    downloads = version.get('downloads', [])
+    return (not version.get('attributes') and bool(downloads)
+            and all(download.get('download_url') in other_urls for download in downloads))
+
+
+def page_versions(data):
+    """页面的版本摘要 {版本键: {'files': [下载文件键], 'fields': {结构化属性}}}"""
+    versions = data.get('versions', [])
+    url_counts = {}
+    for version in versions:
+        for download in version.get('downloads', []):
+            url = download.get('download_url')
+            url_counts[url] = url_counts.get(url, 0) + 1
+    summary = {}
+    for version in versions:
+        own_urls = {download.get('download_url') for download in version.get('downloads', [])}
+        other_urls = {url for url, count in url_counts.items() if url not in own_urls or count > 1}
+        if _is_summary_version(version, other_urls):
+            continue
+        key = version_key(version)
+        if not key:
+            continue
+        # 同一页面上标题相同的版本按出现顺序编号
+        base_key, number = key, 1
+        while key in summary:
+            number += 1
+            key = f"{base_key} #{number}"
+        fields = version['fields'] if 'fields' in version else parse_attributes(version.get('attributes', []))
+        summary[key] = {
+            'files': sorted({_download_key(download) for download in version.get('downloads', [])}),
+            'fields': dict(fields),
+        }
+    return summary
+
+
+def diff_versions(old, new):
+    """比较两份版本摘要，返回变更列表 [{'change', 'version', …}]，按新页面中的版本顺序"""
+    changes = []
+    for key, entry in new.items():
+        previous = old.get(key)
+        if previous is None:
+            changes.append({'change': CHANGE_ADDED, 'version': key, 'files': entry['files'], 'fields': entry['fields']})
+            continue
+        if previous == entry:
+            continue
+        change = {'change': CHANGE_CHANGED, 'version': key}
+        files_added = [f for f in entry['files'] if f not in previous['files']]
+        files_removed = [f for f in previous['files'] if f not in entry['files']]
+        if files_added:
+            change['files_added'] = files_added
+        if files_removed:
+            change['files_removed'] = files_removed
+        fields = {name: [previous['fields'].get(name), entry['fields'].get(name)]
+                  for name in sorted(set(previous['fields']) | set(entry['fields']))
+                  if previous['fields'].get(name) != entry['fields'].get(name)}
+        if fields:
+            change['fields'] = fields
+        changes.append(change)
+    for key, entry in old.items():
+        if key not in new:
+            changes.append({'change': CHANGE_REMOVED, 'version': key, 'files': entry['files'], 'fields': entry['fields']})
+    return changes
+
+
+def format_time(timestamp):
+    """RFC 3339 格式的 UTC 时间"""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(timestamp))
+
+
+def load_feed_items(root=CHANGEFEED_DIR):
+    """最近的订阅条目，新的在前"""
+    try:
+        with open(os.path.join(root, FEED_ITEMS_FILENAME), 'r', encoding='utf-8') as f:
+            items = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return items if isinstance(items, list) else []
+
+
+class ChangeFeed:
+    """按页面比较版本摘要，记录变更（线程安全）；与 Catalog、DownloadIndex 一样通过 put_page / retain 增量更新"""
+
+    def __init__(self, root=CHANGEFEED_DIR, max_items=FEED_MAX_ITEMS):
+        self.root = root
+        self.state_path = os.path.join(root, CHANGEFEED_STATE_FILENAME)
+        self.changelog_path = os.path.join(root, CHANGELOG_FILENAME)
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.pages = self._load()
+        # 没有状态文件时只记录基线，避免第一次运行把全部版本都报告为新增
+        self.bootstrap = not os.path.exists(self.state_path)
+        self.run_time = time.time()
+        # 尚未写入变更记录的变更：页面路径 -> {'title', 'url', 'changes'}
+        self.changes = {}
+        # 本次运行各类变更的版本数和有变更的页面
+        self.totals = dict.fromkeys(_CHANGE_LABELS, 0)
+        self.changed_pages = set()
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                pages = json.load(f).get('pages', {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+        return pages if isinstance(pages, dict) else {}
+
+    def has_page(self, path):
+        with self._lock:
+            return path in self.pages
+
+    def _record(self, path, title, url, changes):
+        if not changes or self.bootstrap:
+            return
+        page = self.changes.setdefault(path, {'title': title, 'url': url, 'changes': []})
+        page['title'] = title
+        page['changes'].extend(changes)
+        self.changed_pages.add(path)
+        for change in changes:
+            self.totals[change['change']] += 1
+
+    def put_page(self, path, data):
+        """用页面的最新数据更新版本摘要并记录变更，返回是否有变化"""
+        versions = page_versions(data)
+        title = data.get('title', '')
+        url = data.get('url', '')
+        with self._lock:
+            old = self.pages.get(path)
+            if old is not None and old['versions'] == versions and old['title'] == title and old['url'] == url:
+                return False
+            self.pages[path] = {'title': title, 'url': url, 'versions': versions}
+            self._dirty = True
+            self._record(path, title, url, diff_versions(old['versions'] if old else {}, versions))
+        return True
+
+    def retain(self, paths):
+        """删除不在 paths 中的页面，其全部版本记为删除；返回删除的页面数"""
+        keep = set(paths)
+        with self._lock:
+            stale = [path for path in self.pages if path not in keep]
+            for path in stale:
+                old = self.pages.pop(path)
+                self._record(path, old['title'], old['url'], diff_versions(old['versions'], {}))
+            if stale:
+                self._dirty = True
+        return len(stale)
+
+    def save(self):
+        """追加变更记录、更新订阅条目并写回状态（仅在有变化时）"""
+        with self._lock:
+            if self.changes:
+                updated = format_time(self.run_time)
+                with open(self.changelog_path, 'a', encoding='utf-8') as f:
+                    for path, page in self.changes.items():
+                        for change in page['changes']:
+                            record = {'time': updated, 'page': path, 'title': page['title'], 'url': page['url']}
+                            record.update(change)
+                            f.write(json.dumps(record, ensure_ascii=False, sort_keys=True) + '\n')
+                items = [{'page': path, 'title': page['title'], 'url': page['url'],
+                          'updated': updated, 'changes': page['changes']}
+                         for path, page in sorted(self.changes.items())]
+                items += load_feed_items(self.root)
+                write_json_atomic(os.path.join(self.root, FEED_ITEMS_FILENAME), items[:self.max_items])
+                self.changes = {}
+            if self._dirty:
+                write_json_atomic(self.state_path, {'pages': self.pages})
+                self._dirty = False
+
+
+def item_summary(item):
+    """订阅条目的一句话摘要，如"新增 2 个版本，删除 1 个版本" """
+    counts = {}
+    for change in item['changes']:
+        counts[change['change']] = counts.get(change['change'], 0) + 1
+    return '，'.join(f"{label} {counts[change]} 个版本" for change, label in _CHANGE_LABELS.items() if change in counts)
+
+
+def _change_html(change):
+    label = _CHANGE_LABELS[change['change']]
+    text = f"<li>{label}: {html.escape(change['version'])}"
+    details = []
+    fields = change.get('fields', {})
+    if change['change'] == CHANGE_CHANGED:
+        details += [f"{html.escape(name)}: {html.escape(str(old))} → {html.escape(str(new))}"
+                    for name, (old, new) in fields.items()]
+        details += [f"新文件 {html.escape(key)}" for key in change.get('files_added', [])]
+        details += [f"移除文件 {html.escape(key)}" for key in change.get('files_removed', [])]
+    elif fields.get('file_name'):
+        details.append(html.escape(fields['file_name']))
+    if details:
+        text += '<br>' + '<br>'.join(details)
+    return text + '</li>'
+
+
+def item_html(item):
+    return '<ul>' + ''.join(_change_html(change) for change in item['changes']) + '</ul>'
+
+
+def _item_link(item, site_url):
+    return f"{site_url}{item['page']}/"
+
+
+def _item_id(item, site_url):
+    """条目 id：页面地址加上本次运行的时间，同一页面在不同运行中的变更是不同的条目"""
+    return f"{_item_link(item, site_url)}#{item['updated']}"
+
+
+def render_json_feed(items, site_url):
+    """JSON Feed 1.1"""
+    feed = {
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': FEED_TITLE,
+        'home_page_url': site_url,
+        'feed_url': f"{site_url}{FEED_JSON_FILENAME}",
+        'language': 'zh-CN',
+        'items': [{
+            'id': _item_id(item, site_url),
+            'url': _item_link(item, site_url),
+            'title': f"{item['title']}: {item_summary(item)}",
+            'content_html': item_html(item),
+            'date_published': item['updated'],
+            '_changes': item['changes'],
+        } for item in items],
+    }
+    return json.dumps(feed, ensure_ascii=False, indent=1)
+
+
+def render_atom_feed(items, site_url):
+    """Atom 1.0"""
+    updated = items[0]['updated'] if items else format_time(0)
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>\n',
+        '<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="zh-CN">\n',
+        f"<title>{html.escape(FEED_TITLE)}</title>\n",
+        f"<id>{html.escape(site_url)}</id>\n",
+        f'<link href="{html.escape(site_url)}"/>\n',
+        f'<link rel="self" href="{html.escape(site_url + FEED_ATOM_FILENAME)}"/>\n',
+        f"<updated>{updated}</updated>\n",
+    ]
+    for item in items:
+        parts += [
+            '<entry>\n',
+            f"<title>{html.escape(item['title'] + ': ' + item_summary(item))}</title>\n",
+            f"<id>{html.escape(_item_id(item, site_url))}</id>\n",
+            f'<link href="{html.escape(_item_link(item, site_url))}"/>\n',
+            f"<updated>{item['updated']}</updated>\n",
+            f'<content type="html">{html.escape(item_html(item))}</content>\n',
+            '</entry>\n',
+        ]
+    parts.append('</feed>\n')
+    return ''.join(parts)
+
+
+def print_change_summary(change_feed):
+    if change_feed.bootstrap:
+        print(f"版本变更记录: 首次运行，记录 {len(change_feed.pages)} 个页面的基线")
+        return
+    if change_feed.changed_pages:
+        counts = '，'.join(f"{label} {change_feed.totals[change]} 个" for change, label in _CHANGE_LABELS.items())
+        print(f"版本变更: {counts}（{len(change_feed.changed_pages)} 个页面），订阅源: docs/{FEED_ATOM_FILENAME}")
@@ -0,0 +1,209 @@
+"""生成站点的压缩和精简
+
+- minify_html / iter_minified：去掉模板中的缩进和空行（把包含换行的空白合并为一个换行），
+  行内空格保持不变，<pre>、<textarea>、<script>、<style> 中的内容原样保留，渲染结果不变；
+- precompress_site：为 docs/ 下的 HTML、JSON、CSS、JS 生成最高压缩级别的 .gz 和 .br 旁路文件，
+  供支持预压缩文件的静态服务器直接返回。安装了 brotli 时才生成 .br。
+
+data/compress-manifest.json 记录每个文件上次压缩时的内容哈希，只有内容变化
+（或缺少旁路文件）的文件才会重新压缩，压缩在多个进程中并行进行。
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from storage import DATA_DIR, write_json_atomic
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+COMPRESS_MANIFEST_DIR = DATA_DIR
+COMPRESS_MANIFEST_FILENAME = 'compress-manifest.json'
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.json', '.css', '.js')
+CODEC_GZIP = 'gz'
+CODEC_BROTLI = 'br'
+
+# 内容需要原样保留的标签
+_PRESERVED_RE = re.compile(r'<(pre|textarea|script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+# 包含换行的空白（缩进、空行、行尾空格）
+_LINE_BREAK_RE = re.compile(r'[ \t\r\f\v]*\n\s*')
+_TRAILING_SPACE_RE = re.compile(r'\s+$')
+
+
+def available_codecs():
+    return (CODEC_GZIP, CODEC_BROTLI) if brotli is not None else (CODEC_GZIP,)
+
+
+def minify_html(text):
+    """去掉缩进和空行，保留受保护标签中的内容"""
+    parts = []
+    pos = 0
+    for match in _PRESERVED_RE.finditer(text):
+        parts.append(_LINE_BREAK_RE.sub('\n', text[pos:match.start()]))
+        parts.append(match.group(0))
+        pos = match.end()
+    parts.append(_LINE_BREAK_RE.sub('\n', text[pos:]))
+    return ''.join(parts)
+
+
+def iter_minified(chunks):
+    """逐块精简 HTML，结果与 minify_html(''.join(chunks)).lstrip() 相同
+
+    每块末尾的空白留到与下一块合并后再处理；受保护的标签不能跨块（渲染器产出的每块都是完整的元素）。
+    """
+    carry = ''
+    started = False
+    for chunk in chunks:
+        text = minify_html(carry + chunk)
+        match = _TRAILING_SPACE_RE.search(text)
+        carry = match.group(0) if match else ''
+        if match:
+            text = text[:match.start()]
+        if not started:
+            text = text.lstrip()
+            started = bool(text)
+        if text:
+            yield text
+    if carry and started:
+        yield _LINE_BREAK_RE.sub('\n', carry)
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def compress_file(path, codecs):
+    """生成 path 的压缩旁路文件，返回 (原始字节数, {编码: 压缩后字节数})"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    sizes = {}
+    for codec in codecs:
+        if codec == CODEC_BROTLI:
+            blob = brotli.compress(content, quality=11)
+        else:
+            # mtime=0 保证相同内容压缩结果一致
+            blob = gzip.compress(content, compresslevel=9, mtime=0)
+        _write_atomic(f"{path}.{codec}", blob)
+        sizes[codec] = len(blob)
+    return len(content), sizes
+
+
+def _file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_compress_manifest(root=COMPRESS_MANIFEST_DIR):
+    try:
+        with open(os.path.join(root, COMPRESS_MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def save_compress_manifest(manifest, root=COMPRESS_MANIFEST_DIR):
+    write_json_atomic(os.path.join(root, COMPRESS_MANIFEST_FILENAME), manifest)
+
+
+def _site_files(site_dir, paths):
+    """逐个产出 (相对路径, 完整路径, 同目录下的文件名集合)，顺带删除源文件已不存在的旁路文件
+
+    paths 为 None 时遍历整个 site_dir，否则只检查给出的相对路径。
+    """
+    if paths is not None:
+        for rel_path in paths:
+            path = os.path.join(site_dir, *rel_path.split('/'))
+            if os.path.isfile(path):
+                yield rel_path, path, set(os.listdir(os.path.dirname(path)))
+        return
+    for dirpath, _, filenames in os.walk(site_dir):
+        names = set(filenames)
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            stem, ext = os.path.splitext(filename)
+            if ext.lstrip('.') in (CODEC_GZIP, CODEC_BROTLI):
+                # 源文件已删除的旁路文件
+                if stem not in names:
+                    os.remove(path)
+                    yield None, path, None
+                continue
+            yield os.path.relpath(path, site_dir).replace(os.sep, '/'), path, names
+
+
+def precompress_site(site_dir, workers=None, root=COMPRESS_MANIFEST_DIR, paths=None):
+    """为 site_dir 下内容有变化的文件重新生成压缩旁路文件，删除源文件已不存在的旁路文件
+
+    workers 为压缩进程数（None 为 CPU 核数，0 表示在当前进程中压缩）；
+    paths 为相对路径列表时只检查这些文件（如单个页面重新生成后），不清理其他文件。返回统计信息。
+    """
+    codecs = available_codecs()
+    manifest = load_compress_manifest(root)
+    stats = {'compressed': 0, 'unchanged': 0, 'removed': 0, 'bytes': 0,
+             'compressed_bytes': dict.fromkeys(codecs, 0)}
+    pending = []
+    seen = set()
+    for rel_path, path, names in _site_files(site_dir, paths):
+        if rel_path is None:
+            stats['removed'] += 1
+            continue
+        filename = os.path.basename(path)
+        # .http-cache.json 等隐藏文件不对外提供
+        if os.path.splitext(filename)[1] not in COMPRESSIBLE_EXTENSIONS or filename.startswith('.'):
+            continue
+        seen.add(rel_path)
+        digest = _file_sha256(path)
+        entry = manifest.get(rel_path) or {}
+        if (entry.get('sha256') == digest and entry.get('codecs') == list(codecs)
+                and all(f"{filename}.{codec}" in names for codec in codecs)):
+            stats['unchanged'] += 1
+            continue
+        pending.append((rel_path, path, digest))
+
+    def record(rel_path, digest, result):
+        size, sizes = result
+        manifest[rel_path] = {'sha256': digest, 'codecs': list(codecs)}
+        stats['compressed'] += 1
+        stats['bytes'] += size
+        for codec, compressed in sizes.items():
+            stats['compressed_bytes'][codec] += compressed
+
+    if workers == 0 or len(pending) <= 1:
+        for rel_path, path, digest in pending:
+            record(rel_path, digest, compress_file(path, codecs))
+    else:
+        # 进程池只在需要时导入，避免拖慢只查看报告等子命令的启动
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [(rel_path, digest, executor.submit(compress_file, path, codecs))
+                       for rel_path, path, digest in pending]
+            for rel_path, digest, future in futures:
+                record(rel_path, digest, future.result())
+
+    stale = [rel_path for rel_path in manifest if rel_path not in seen] if paths is None else []
+    for rel_path in stale:
+        del manifest[rel_path]
+    if pending or stale:
+        save_compress_manifest(manifest, root)
+    return stats
+
+
+def print_compress_summary(stats):
+    ratios = '，'.join(
+        f"{codec} {compressed / stats['bytes'] * 100:.0f}%"
+        for codec, compressed in stats['compressed_bytes'].items()
+    ) if stats['bytes'] else ''
+    print(f"预压缩: 压缩 {stats['compressed']} 个文件，未变化 {stats['unchanged']} 个"
+          + (f"（压缩后大小 {ratios}）" if ratios else ''))
+    if stats['removed']:
+        print(f"  删除 {stats['removed']} 个源文件已不存在的压缩文件")
+    if brotli is None:
+        print("  未安装 brotli，只生成 .gz 文件: pip install brotli")
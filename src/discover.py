@@ -0,0 +1,275 @@
+"""增量发现新的产品页面
+
+从首页和分类页出发抓取列表页，用 URL 队列（frontier）、持久化的哈希集合（seen-set）
+以及深度和主机限制控制范围，把新发现的产品详情页追加到 docs/a.txt。
+
+为了让每次运行的开销只与新增内容成正比：
+- 列表页使用 ETag / Last-Modified 条件请求，304 或内容哈希未变化时不解析，
+  直接把上次从该页得到的子列表页（分页、分类页）放回队列；
+- 已见过的详情页（包括确认不是产品页的）记录在 seen.bin 中，不会再次请求；
+- 只有新出现的详情页才会被请求一次，确认是产品页后才写入 a.txt；
+- 超出单次抓取上限的列表页留在 frontier 中，下次运行继续。
+
+状态保存在 data/discovery/ 下：state.json（frontier、列表页校验信息和子列表页）和 seen.bin
+（每个 URL 的 8 字节 BLAKE2b 摘要）。
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from http_client import body_sha256, conditional_headers, validators_from_response
+from storage import DATA_DIR, write_json_atomic
+
+DISCOVERY_DIR = os.path.join(DATA_DIR, 'discovery')
+STATE_FILENAME = 'state.json'
+SEEN_FILENAME = 'seen.bin'
+
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_MAX_PAGES = 100
+
+# 分页参数（Joomla 列表页使用 ?start=N），其余查询参数一律去掉
+PAGINATION_PARAMS = ('start', 'limitstart', 'page')
+# 不属于内容页面的路径前缀和静态资源
+EXCLUDED_SECTIONS = ('component', 'components', 'images', 'media', 'templates', 'modules',
+                     'plugins', 'cache', 'administrator', 'index.php')
+_DIGEST_SIZE = 8
+
+
+def url_digest(url):
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=_DIGEST_SIZE).digest()
+
+
+class SeenSet:
+    """已见过 URL 的哈希集合，只追加写入磁盘（线程安全）"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._digests = set()
+        self._pending = []
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+        except OSError:
+            blob = b''
+        for i in range(0, len(blob) - len(blob) % _DIGEST_SIZE, _DIGEST_SIZE):
+            self._digests.add(blob[i:i + _DIGEST_SIZE])
+
+    def __len__(self):
+        return len(self._digests)
+
+    def __contains__(self, url):
+        return url_digest(url) in self._digests
+
+    def add(self, url):
+        """加入集合，返回是否为新 URL"""
+        digest = url_digest(url)
+        with self._lock:
+            if digest in self._digests:
+                return False
+            self._digests.add(digest)
+            self._pending.append(digest)
+        return True
+
+    def save(self):
+        with self._lock:
+            if not self._pending:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'ab') as f:
+                f.write(b''.join(self._pending))
+            self._pending = []
+
+
+def normalize_url(url, keep_pagination=False):
+    """统一 URL 写法：小写主机、去掉片段和多余的查询参数以及末尾斜杠"""
+    parts = urlsplit(url)
+    query = ''
+    if keep_pagination and parts.query:
+        query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if k in PAGINATION_PARAMS])
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ''))
+
+
+def url_segments(url):
+    return [segment for segment in urlsplit(url).path.split('/') if segment]
+
+
+def classify_url(url, categories):
+    """返回 'detail'（分类/产品 两级路径）、'listing'（首页、分类页及其分页）或 None"""
+    segments = url_segments(url)
+    if segments and (segments[0] in EXCLUDED_SECTIONS or '.' in segments[-1]):
+        return None
+    if not segments:
+        return 'listing'
+    if segments[0] not in categories:
+        return None
+    if len(segments) == 1:
+        return 'listing'
+    if len(segments) == 2:
+        return 'detail'
+    return None
+
+
+def extract_links(html, base_url):
+    """取出页面中所有 <a href> 的绝对地址"""
+    if not html or not html.strip():
+        return []
+    # 只有抓取列表页时才需要 lxml
+    import lxml.html
+    from lxml import etree
+
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (ValueError, etree.ParserError):
+        return []
+    links = []
+    for anchor in root.iter('a'):
+        href = (anchor.get('href') or '').strip()
+        if href and not href.startswith(('#', 'javascript:', 'mailto:')):
+            links.append(urljoin(base_url, href))
+    return links
+
+
+def looks_like_detail_page(html):
+    """产品详情页一定有标题区块和下载链接"""
+    return 'sppb-addon-title' in html and 'dl-link' in html
+
+
+def load_state(root=DISCOVERY_DIR):
+    try:
+        with open(os.path.join(root, STATE_FILENAME), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    if not isinstance(state, dict):
+        state = {}
+    state.setdefault('frontier', [])
+    state.setdefault('listings', {})
+    return state
+
+
+def save_state(state, root=DISCOVERY_DIR):
+    write_json_atomic(os.path.join(root, STATE_FILENAME), state, indent=2)
+
+
+def seed_urls(known_links):
+    """从已知链接推出种子：各主机首页和各分类页"""
+    seeds = []
+    for link in known_links:
+        parts = urlsplit(link)
+        segments = url_segments(link)
+        for url in (f"{parts.scheme}://{parts.netloc}/",
+                    f"{parts.scheme}://{parts.netloc}/{segments[0]}" if segments else None):
+            if url and normalize_url(url) not in seeds:
+                seeds.append(normalize_url(url))
+    return seeds
+
+
+def discover_links(client, known_links, max_depth=DEFAULT_MAX_DEPTH, max_pages=DEFAULT_MAX_PAGES,
+                   root=DISCOVERY_DIR, log=print):
+    """抓取列表页发现新的产品详情页，返回新链接列表（按发现顺序）
+
+    known_links 为 a.txt 中已有的链接，用来确定种子、允许的主机和产品分类。
+    """
+    known_links = [link for link in known_links if link]
+    hosts = {urlsplit(link).netloc.lower() for link in known_links}
+    categories = {url_segments(link)[0] for link in known_links if url_segments(link)}
+
+    state = load_state(root)
+    seen = SeenSet(os.path.join(root, SEEN_FILENAME))
+    for link in known_links:
+        seen.add(normalize_url(link))
+
+    # 上次未处理完的列表页优先，然后从种子重新开始
+    frontier = deque(tuple(item) for item in state['frontier'])
+    queued = {url for url, _ in frontier}
+    for seed in seed_urls(known_links):
+        if seed not in queued:
+            queued.add(seed)
+            frontier.append((seed, 0))
+    fetched = 0
+    new_links = []
+
+    def enqueue_listing(link, depth):
+        if depth < max_depth and link not in queued:
+            queued.add(link)
+            frontier.append((link, depth + 1))
+
+    def fetch(url, validators=None):
+        response = client.get(url, headers=conditional_headers(validators or {}), log=log)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    while frontier and fetched < max_pages:
+        url, depth = frontier.popleft()
+        fetched += 1
+        validators = state['listings'].get(url, {})
+        # 旧版本保存的校验信息没有记录子列表页，完整抓取一次
+        if 'children' not in validators:
+            validators = {}
+        try:
+            response = fetch(url, validators)
+        except Exception as e:
+            log(f"抓取列表页失败 {url}: {e}")
+            continue
+        body_hash = None if response.status_code == 304 else body_sha256(response.content)
+        if body_hash is None or validators.get('body_sha256') == body_hash:
+            # 列表页未变化时不解析，但它的分页和分类页仍可能有新内容，按上次记录的子列表页继续抓取
+            for link in validators.get('children', []):
+                enqueue_listing(link, depth)
+            continue
+        complete = True
+        children = []
+
+        for link in extract_links(response.text, url):
+            if urlsplit(link).netloc.lower() not in hosts:
+                continue
+            kind = classify_url(link, categories)
+            if kind == 'listing':
+                link = normalize_url(link, keep_pagination=True)
+                if link not in children:
+                    children.append(link)
+                enqueue_listing(link, depth)
+            elif kind == 'detail':
+                link = normalize_url(link)
+                if link in seen:
+                    continue
+                # 只请求从未见过的详情页，确认是产品页后才加入；
+                # 失败的页面不记入 seen-set，列表页也不保存校验信息，下次运行重试
+                try:
+                    html = fetch(link).text
+                except Exception as e:
+                    log(f"抓取候选页面失败 {link}: {e}")
+                    complete = False
+                    continue
+                seen.add(link)
+                if looks_like_detail_page(html):
+                    log(f"发现新页面: {link}")
+                    new_links.append(link)
+
+        if complete:
+            state['listings'][url] = validators_from_response(url, response, body_hash)
+            state['listings'][url]['children'] = children
+
+    state['frontier'] = [list(item) for item in frontier if item[1] > 0]
+    save_state(state, root)
+    seen.save()
+    log(f"链接发现完成：抓取列表页 {fetched} 个，新页面 {len(new_links)} 个，待抓取 {len(state['frontier'])} 个")
+    return new_links
+
+
+def append_links(links_file, new_links):
+    """把新链接追加到链接列表文件末尾"""
+    if not new_links:
+        return
+    with open(links_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+    with open(links_file, 'a', encoding='utf-8') as f:
+        if content and not content.endswith('\n'):
+            f.write('\n')
+        f.write(''.join(f"{link}\n" for link in new_links))
@@ -0,0 +1,233 @@
+"""跨页面的全局下载索引
+
+同一个 ISO 常常出现在多个页面上。这里按 ed2k MD4 哈希和 BitTorrent infohash（btih）
+建立全局索引，save_page_data 每处理完一个页面就增量更新该页面对应的条目，
+可以 O(1) 查到某个文件出现在哪些页面，并找出"文件名相同但哈希不同"的冲突。
+
+索引持久化在 data/download-index.json，只保存每个页面包含的文件，
+按哈希和文件名的反向索引在加载时重建。
+
+用法:
+    python download_index.py lookup <ed2k/btih 哈希或下载链接>
+    python download_index.py conflicts
+    python download_index.py build    # 根据 docs/**/data.json 完整重建
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+from metadata import parse_download_url
+from storage import DATA_DIR, write_json_atomic
+
+DOWNLOAD_INDEX_DIR = DATA_DIR
+DOWNLOAD_INDEX_FILENAME = 'download-index.json'
+
+# 参与索引的哈希类型（download['link'] 中的键）
+HASH_KINDS = ('ed2k', 'btih')
+
+
+def file_key(kind, digest):
+    """索引键，如 ed2k:0DC147C1B38DD5431F2C39D7491CFC8E、btih:9b0ca6ee…"""
+    return f"{kind}:{digest}"
+
+
+def page_files(data):
+    """页面中带哈希的下载文件，返回 {索引键: [文件名, 字节数]}（同一页面内去重）"""
+    files = {}
+    for version in data.get('versions', []):
+        for download in version.get('downloads', []):
+            link = download['link'] if 'link' in download else parse_download_url(download.get('download_url', ''))
+            for kind in HASH_KINDS:
+                if kind in link:
+                    files.setdefault(file_key(kind, link[kind]), [link.get('file_name'), link.get('size_bytes')])
+    return files
+
+
+def normalize_query(text):
+    """把哈希或 ed2k / magnet 链接转换为索引键列表"""
+    text = text.strip()
+    if text.lower().startswith(('ed2k://', 'magnet:')):
+        link = parse_download_url(text)
+        return [file_key(kind, link[kind]) for kind in HASH_KINDS if kind in link]
+    if ':' in text:
+        kind, _, digest = text.partition(':')
+        return [file_key(kind, digest.upper() if kind == 'ed2k' else digest.lower())]
+    # 裸哈希：32 位按 ed2k，40 位按 btih
+    if len(text) == 32:
+        return [file_key('ed2k', text.upper())]
+    if len(text) == 40:
+        return [file_key('btih', text.lower())]
+    return []
+
+
+class DownloadIndex:
+    """按 ed2k / btih 哈希索引的全局下载表（线程安全）"""
+
+    def __init__(self, root=DOWNLOAD_INDEX_DIR):
+        self.root = root
+        self.path = os.path.join(root, DOWNLOAD_INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self._dirty = False
+        # 页面路径 -> {索引键: [文件名, 字节数]}，持久化的唯一数据
+        self.pages = self._load()
+        # 索引键 -> {页面路径: [文件名, 字节数]}
+        self.files = {}
+        for path, files in self.pages.items():
+            self._add(path, files)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                pages = json.load(f).get('pages', {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+        return pages if isinstance(pages, dict) else {}
+
+    def _add(self, path, files):
+        for key, info in files.items():
+            self.files.setdefault(key, {})[path] = info
+
+    def _remove(self, path, files):
+        for key in files:
+            holders = self.files.get(key)
+            if holders is None:
+                continue
+            holders.pop(path, None)
+            if not holders:
+                del self.files[key]
+
+    def has_page(self, path):
+        with self._lock:
+            return path in self.pages
+
+    def put_page(self, path, data):
+        """用页面的最新数据替换其在索引中的条目，返回是否有变化"""
+        files = page_files(data)
+        with self._lock:
+            old = self.pages.get(path)
+            if old == files:
+                return False
+            if old:
+                self._remove(path, old)
+            self.pages[path] = files
+            self._add(path, files)
+            self._dirty = True
+        return True
+
+    def retain(self, paths):
+        """删除不在 paths 中的页面，返回删除的页面数"""
+        keep = set(paths)
+        with self._lock:
+            stale = [path for path in self.pages if path not in keep]
+            for path in stale:
+                self._remove(path, self.pages.pop(path))
+            if stale:
+                self._dirty = True
+        return len(stale)
+
+    def lookup(self, key):
+        """返回包含该文件的页面路径列表"""
+        with self._lock:
+            return sorted(self.files.get(key, ()))
+
+    def duplicates(self):
+        """出现在多个页面上的文件，返回 {索引键: [页面路径]}"""
+        with self._lock:
+            return {key: sorted(holders) for key, holders in self.files.items() if len(holders) > 1}
+
+    def conflicts(self):
+        """文件名相同但哈希不同的冲突，返回 [(哈希类型, 文件名, {哈希: [页面路径]})]"""
+        by_name = {}
+        with self._lock:
+            for key, holders in self.files.items():
+                kind, _, digest = key.partition(':')
+                for path, (file_name, _) in holders.items():
+                    if file_name:
+                        by_name.setdefault((kind, file_name), {}).setdefault(digest, set()).add(path)
+        return [
+            (kind, file_name, {digest: sorted(paths) for digest, paths in sorted(digests.items())})
+            for (kind, file_name), digests in sorted(by_name.items())
+            if len(digests) > 1
+        ]
+
+    def save(self):
+        """写回索引文件（仅在有变化时）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            write_json_atomic(self.path, {'pages': self.pages})
+            self._dirty = False
+
+
+def print_conflicts(conflicts, limit=None):
+    shown = conflicts if limit is None else conflicts[:limit]
+    for kind, file_name, digests in shown:
+        print(f"  {file_name} ({kind})")
+        for digest, paths in digests.items():
+            print(f"    {digest}: {', '.join(paths)}")
+    if len(shown) < len(conflicts):
+        print(f"  …… 另有 {len(conflicts) - len(shown)} 个，完整列表: python download_index.py conflicts")
+
+
+def build_download_index(index, docs_dir):
+    """根据 docs/ 下的全部 data.json 重建索引，返回有变化的页面数"""
+    paths = []
+    changed = 0
+    for dirpath, _, filenames in os.walk(docs_dir):
+        if 'data.json' not in filenames:
+            continue
+        path = os.path.relpath(dirpath, docs_dir).replace(os.sep, '/')
+        with open(os.path.join(dirpath, 'data.json'), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        paths.append(path)
+        if index.put_page(path, data):
+            changed += 1
+    index.retain(paths)
+    return changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='查询跨页面的全局下载索引')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    lookup_cmd = subparsers.add_parser('lookup', help='查询某个文件出现在哪些页面')
+    lookup_cmd.add_argument('query', help='ed2k / btih 哈希（可带 ed2k: / btih: 前缀）或完整下载链接')
+    subparsers.add_parser('conflicts', help='列出文件名相同但哈希不同的文件')
+    subparsers.add_parser('duplicates', help='列出出现在多个页面上的文件')
+    build_cmd = subparsers.add_parser('build', help='根据 docs/**/data.json 完整重建索引')
+    build_cmd.add_argument('--docs', default=os.path.join(os.path.dirname(DOWNLOAD_INDEX_DIR), 'docs'),
+                           help='docs 目录位置')
+    args = parser.parse_args(argv)
+
+    index = DownloadIndex()
+    if args.command == 'lookup':
+        keys = normalize_query(args.query)
+        if not keys:
+            print(f"无法识别的哈希或链接: {args.query}")
+            sys.exit(2)
+        found = False
+        for key in keys:
+            for path in index.lookup(key):
+                found = True
+                print(f"{key}\t{path}")
+        if not found:
+            print("索引中没有该文件")
+            sys.exit(1)
+    elif args.command == 'conflicts':
+        conflicts = index.conflicts()
+        print_conflicts(conflicts)
+        print(f"共 {len(conflicts)} 个文件名存在哈希冲突")
+    elif args.command == 'duplicates':
+        duplicates = index.duplicates()
+        for key, paths in sorted(duplicates.items()):
+            print(f"{key}\t{', '.join(paths)}")
+        print(f"共 {len(duplicates)} 个文件出现在多个页面上")
+    elif args.command == 'build':
+        changed = build_download_index(index, args.docs)
+        index.save()
+        print(f"下载索引已重建: 更新 {changed} 个页面 → {index.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""离线校验用的测试数据
+
+- 根据 data.json 合成与源站结构一致的页面 HTML，供黄金校验和基准测试使用；
+- StandInServer：在本机端口上模拟下载服务器，供链接检查自检使用。
+"""
+import html
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 源站页面中与数据无关、但解析时仍需处理的部分（导航、页脚、脚本）
+_PAGE_HEAD = '''<!DOCTYPE html>
+<html lang="zh-cn" dir="ltr">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<link href="/templates/shaper_helixultimate/css/template.css" rel="stylesheet">
+<script src="/media/vendor/jquery/js/jquery.min.js"></script>
+<script>window.dataLayer = window.dataLayer || []; function gtag(){{dataLayer.push(arguments);}}</script>
+</head>
+<body class="site helix-ultimate com-sppagebuilder view-page">
+<header id="sp-header"><div class="container"><nav class="sp-megamenu-wrapper"><ul class="sp-megamenu-parent">
+<li class="sp-menu-item"><a href="/">首页</a></li>
+<li class="sp-menu-item sp-has-child"><a href="/windows-11">Windows 11</a><div class="sp-dropdown"><ul>
+<li class="sp-menu-item"><a href="/windows-11/win11-24h2">Windows 11 24H2</a></li>
+<li class="sp-menu-item"><a href="/windows-11/win11-23h2">Windows 11 23H2</a></li>
+</ul></div></li>
+<li class="sp-menu-item"><a href="/windows-10">Windows 10</a></li>
+<li class="sp-menu-item"><a href="/windows-server">Windows Server</a></li>
+<li class="sp-menu-item"><a href="/applications">Office</a></li>
+</ul></nav></div></header>
+<div id="sp-main-body"><div class="container"><div class="row"><main id="sp-component" class="col-lg-12">
+<div id="sp-page-builder" class="sp-page-builder page-1">
+'''
+
+_PAGE_FOOT = '''</div>
+</main></div></div></div>
+<footer id="sp-footer"><div class="container"><div class="sp-copyright">本站资源均来自微软官方原版，仅供学习交流使用。</div>
+<ul class="footer-links"><li><a href="/about">关于本站</a></li><li><a href="/contact">联系我们</a></li></ul></div></footer>
+<script>jQuery(function($){ $('.dl-link').on('click', function(){ $(this).toggleClass('active'); }); });</script>
+</body>
+</html>
+'''
+
+
+def _text(value):
+    return html.escape(value, quote=False)
+
+
+def _find_nested_span(versions, index):
+    """判断 versions[index] 是否为外层汇总 section，返回其包含的后续版本数量
+
+    源站的“所有版本”页签是一个外层 section，内部嵌套各版本自己的 section，
+    因此外层的下载列表恰好是其后若干个版本下载列表的拼接，且没有属性。
+    """
+    version = versions[index]
+    if version.get('attributes') or not version.get('downloads'):
+        return 0
+    expected = version['downloads']
+    collected = []
+    span = 0
+    for inner in versions[index + 1:]:
+        collected.extend(inner.get('downloads', []))
+        span += 1
+        if collected == expected:
+            return span
+        if len(collected) >= len(expected):
+            break
+    return 0
+
+
+def _render_version_body(version):
+    parts = ['<div class="version-info">\n', f'<h3>{_text(version.get("version_text", ""))}</h3>\n']
+    for attr in version.get('attributes', []):
+        parts.append(f'<p>{_text(attr)}</p>\n')
+    parts.append('</div>\n<div class="version-downloads">\n')
+    for download in version.get('downloads', []):
+        parts.append(
+            '<div class="dl-item">'
+            f'<strong>{_text(download.get("download_type", ""))}</strong>'
+            f'<div class="dl-link">{_text(download.get("download_url", ""))}</div>'
+            '</div>\n'
+        )
+    parts.append('</div>\n')
+    return parts
+
+
+def _render_versions(versions, start, stop, parts):
+    index = start
+    while index < stop:
+        version = versions[index]
+        span = _find_nested_span(versions, index)
+        parts.append('<section class="sppb-section"><div class="sppb-row-container">\n')
+        if span:
+            # 外层 section：标题单独放在页签容器里，内部是各版本的 section
+            parts.append('<div class="sppb-tab-title">'
+                         f'<h3>{_text(version.get("version_text", ""))}</h3></div>\n')
+            parts.append('<div class="sppb-tab-content">\n')
+            _render_versions(versions, index + 1, index + 1 + span, parts)
+            parts.append('</div>\n')
+            index += span
+        else:
+            parts.extend(_render_version_body(version))
+        parts.append('</div></section>\n')
+        index += 1
+
+
+def build_page_html(data):
+    """根据一条页面数据合成源站结构的 HTML"""
+    title = data.get('title', '')
+    parts = [_PAGE_HEAD.format(title=_text(title))]
+    parts.append(
+        '<div class="sppb-section page-title"><div class="sppb-row-container">'
+        '<div class="sppb-addon sppb-addon-text-block">'
+        f'<h1 class="sppb-addon-title">{_text(title)}</h1>'
+        f'<div class="sppb-addon-content"><p>{_text(data.get("intro_text", ""))}</p></div>'
+        '</div></div></div>\n'
+    )
+    versions = data.get('versions', [])
+    _render_versions(versions, 0, len(versions), parts)
+    parts.append(_PAGE_FOOT)
+    return ''.join(parts)
+
+
+# 合成数据使用的产品类别（与 docs/ 下的目录结构一致）
+_SYNTHETIC_CATEGORIES = [
+    ('applications', 'office'),
+    ('operating-systems', 'windows'),
+    ('servers', 'sql-server'),
+    ('windows-10', 'win10'),
+    ('windows-11', 'win11'),
+    ('windows-server', 'windows-server'),
+]
+
+
+def synthetic_page_data(version_count, url='https://www.imsdn.cn/windows-11/win11-synthetic'):
+    """生成包含 version_count 个版本的页面数据，字段格式与真实 data.json 相同"""
+    versions = []
+    for i in range(version_count):
+        arch = 'x64' if i % 2 == 0 else 'x86'
+        lang = ('zh-cn', 'zh-tw', 'en-us')[i % 3]
+        filename = f"{lang}_windows_11_business_editions_version_{i:04d}_{arch}_dvd_{i * 7919 % 0xffffffff:08x}.iso"
+        size = 4_000_000_000 + i * 1_048_576
+        ed2k_hash = f"{i * 2654435761 % (1 << 128):032X}"
+        btih = f"{i * 40503 % (1 << 160):040x}"
+        versions.append({
+            'version_text': f"Windows 11 合成版本 {i} {lang} {arch} (2025.{i % 12 + 1:02d}更新)",
+            'attributes': [
+                f"文件名：{filename}",
+                f"文件大小：{size / 1024 ** 3:.2f}GB",
+                f"发布时间：2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                f"MD5：{i * 11400714819323198485 % (1 << 128):032X}",
+                f"SHA1：{i * 14029467366897019727 % (1 << 160):040X}",
+            ],
+            'downloads': [
+                {
+                    'download_url': f"ed2k://|file|{filename}|{size}|{ed2k_hash}|/",
+                    'download_type': '迅雷下载：'
+                },
+                {
+                    'download_url': f"magnet:?xt=urn:btih:{btih}&dn={filename}&xl={size}",
+                    'download_type': 'BT：'
+                },
+            ]
+        })
+    return {
+        'title': f"合成页面（{version_count} 个版本）",
+        'intro_text': '发行时间：2025年01月01日主流支持结束日期：2030年01月01日内核版本号：Windows NT 10.0' * 3,
+        'versions': versions,
+        'url': url
+    }
+
+
+def synthetic_index_entries(count):
+    """synthetic_links(count) 对应的汇总页条目 [(页面路径, 链接, 标题)]"""
+    return [(link.replace('https://www.imsdn.cn/', ''), link, f"合成页面 {i}")
+            for i, link in enumerate(synthetic_links(count))]
+
+
+def synthetic_links(count):
+    """生成 count 个分布在各产品类别下的详情页链接"""
+    links = []
+    for i in range(count):
+        section, prefix = _SYNTHETIC_CATEGORIES[i % len(_SYNTHETIC_CATEGORIES)]
+        links.append(f"https://www.imsdn.cn/{section}/{prefix}-synthetic-{i}")
+    return links
+
+
+class StandInServer:
+    """在 127.0.0.1 的随机端口上模拟下载服务器（后台线程），用法:
+
+        with StandInServer({'/ok.iso': {'size': 1024}, '/gone': {'status': 404}}) as server:
+            url = server.url('/ok.iso')
+
+    每个路径的行为：status（默认 200）、size（Content-Length / Content-Range 中的文件大小）、
+    head_status（HEAD 请求单独返回的状态码，如 405）、redirect（302 跳转到的路径）、delay（响应前等待的秒数）、
+    body（GET 返回的页面内容）、etag（响应的 ETag，请求带有相同的 If-None-Match 时返回 304）。
+    未配置的路径返回 404。requests 记录每个路径收到的 (方法, Range)，max_active 为同时处理的最大请求数。
+    """
+
+    def __init__(self, routes):
+        self.routes = dict(routes)
+        self.requests = {}
+        self.max_active = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self._server.server_address[1]}{path}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _enter_request(self, path, method, range_header):
+        with self._lock:
+            self.requests.setdefault(path, []).append((method, range_header))
+            self._active += 1
+            self.max_active = max(self.max_active, self._active)
+
+    def _leave_request(self):
+        with self._lock:
+            self._active -= 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self._respond(head=True)
+
+            def do_GET(self):
+                self._respond(head=False)
+
+            def _respond(self, head):
+                server._enter_request(self.path, self.command, self.headers.get('Range'))
+                try:
+                    route = server.routes.get(self.path)
+                    if route is None:
+                        self._send(404, {})
+                        return
+                    time.sleep(route.get('delay', 0))
+                    if route.get('redirect'):
+                        self._send(302, {'Location': server.url(route['redirect'])})
+                        return
+                    status = route.get('head_status', route.get('status', 200)) if head else route.get('status', 200)
+                    headers = {}
+                    size = route.get('size')
+                    body = b''
+                    if route.get('etag'):
+                        headers['ETag'] = route['etag']
+                        if self.headers.get('If-None-Match') == route['etag']:
+                            self._send(304, headers)
+                            return
+                    if status == 200 and route.get('body') is not None:
+                        body = route['body'].encode('utf-8')
+                        headers['Content-Type'] = 'text/html; charset=utf-8'
+                    if status == 200 and size is not None:
+                        if not head and self.headers.get('Range') == 'bytes=0-0':
+                            status = 206
+                            headers['Content-Range'] = f"bytes 0-0/{size}"
+                            body = b'\0'
+                        else:
+                            headers['Content-Length'] = str(size)
+                    self._send(status, headers, body, head)
+                finally:
+                    server._leave_request()
+
+            def _send(self, status, headers, body=b'', head=False):
+                self.send_response(status)
+                headers.setdefault('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                # 文件下载的完整响应只在 HEAD 中模拟，GET 只发送配置了 body 的页面内容
+                if body and not head:
+                    self.wfile.write(body)
+
+        return Handler
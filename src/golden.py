@@ -0,0 +1,112 @@
+"""黄金校验：用 docs/**/data.json 合成源站页面，确认各解析后端的结果与已有 data.json 逐字节一致
+
+data.json 中的结构化字段（fields / link）由原始内容重新生成后再比较，
+因此补充这些字段之前生成的 data.json 同样可以作为基准。
+
+用法: python golden.py
+"""
+import glob
+import json
+import os
+import sys
+
+from bs4 import BeautifulSoup
+
+import app
+from fixtures import build_page_html
+from metadata import enrich_page_data, strip_page_data
+
+
+def reference_parse_page_html(html, url):
+    """原始的逐 section 解析实现（find_all / find_previous），作为对照基准"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    title_element = soup.find('h1', class_='sppb-addon-title')
+    title = title_element.get_text(strip=True) if title_element else "未知标题"
+
+    intro_text = ""
+    if title_element and title_element.parent:
+        content_div = title_element.parent.find('div', class_='sppb-addon-content')
+        if content_div:
+            intro_text = content_div.get_text(strip=True)
+
+    versions = []
+    for section in soup.find_all('section'):
+        version_info = {}
+        h3_element = section.find('h3')
+        if h3_element:
+            version_info['version_text'] = h3_element.get_text(strip=True)
+
+            attributes = []
+            current_element = h3_element.next_sibling
+            while current_element and current_element.name != 'h3':
+                if hasattr(current_element, 'get_text'):
+                    text = current_element.get_text(strip=True)
+                    if text and text not in ['', '迅雷下载：']:
+                        attributes.append(text)
+                current_element = current_element.next_sibling
+            version_info['attributes'] = attributes
+
+            downloads = []
+            for dl_link in section.find_all('div', class_='dl-link'):
+                download_info = {}
+                download_info['download_url'] = dl_link.get_text(strip=True)
+                strong_element = dl_link.find_previous('strong')
+                if strong_element:
+                    download_info['download_type'] = strong_element.get_text(strip=True)
+                else:
+                    download_info['download_type'] = "下载"
+                if download_info['download_url']:
+                    downloads.append(download_info)
+            version_info['downloads'] = downloads
+
+            if version_info['version_text'] and (version_info['attributes'] or version_info['downloads']):
+                versions.append(version_info)
+
+    return {
+        'title': title,
+        'intro_text': intro_text,
+        'versions': versions,
+        'url': url
+    }
+
+
+def serialize(data):
+    """与 save_page_data 写入 data.json 的格式保持一致"""
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def iter_golden_files(docs_dir=app.DOCS_DIR):
+    pattern = os.path.join(docs_dir, '**', 'data.json')
+    return sorted(glob.glob(pattern, recursive=True))
+
+
+def check_file(json_file, parsers):
+    """校验单个 data.json，返回不一致的解析器名称列表"""
+    with open(json_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data = strip_page_data(data)
+    html = build_page_html(data)
+    expected = serialize(enrich_page_data(data))
+    return [name for name, parse in parsers if serialize(parse(html, data['url'])) != expected]
+
+
+def main():
+    parsers = [('reference', lambda html, url: enrich_page_data(reference_parse_page_html(html, url)))]
+    for backend in app.PARSER_BACKENDS:
+        parsers.append((backend, lambda html, url, backend=backend: app.parse_page_html(html, url, backend)))
+    files = iter_golden_files()
+    failures = 0
+    for json_file in files:
+        mismatched = check_file(json_file, parsers)
+        if mismatched:
+            failures += 1
+            print(f"❌ {os.path.relpath(json_file, app.REPO_ROOT)}: {', '.join(mismatched)} 输出不一致")
+    if failures:
+        print(f"黄金校验失败: {failures}/{len(files)} 个文件不一致")
+        sys.exit(1)
+    print(f"✅ 黄金校验通过: {len(files)} 个 data.json 逐字节一致")
+
+
+if __name__ == '__main__':
+    main()
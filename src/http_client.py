@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from storage import write_json_atomic
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# 每个主机默认的限速参数：每秒补充的令牌数、令牌桶容量（允许的瞬时突发请求数）
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 2
+
+# 已知数据源主机，可单独覆盖限速参数
+HOST_RATE_LIMITS = {
+    'windows.unblock.win': (DEFAULT_RATE, DEFAULT_BURST),
+    'www.imsdn.cn': (DEFAULT_RATE, DEFAULT_BURST),
+}
+
+# 自适应限速：出错时速率乘以该系数，成功时每次恢复配置速率的一定比例
+THROTTLE_DECREASE_FACTOR = 0.5
+THROTTLE_RECOVERY_STEP = 0.1
+# 降速的下限（相对配置速率的比例）
+THROTTLE_MIN_RATIO = 0.05
+
+# 重试相关默认值
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+DEFAULT_TIMEOUT = 15
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """线程安全的令牌桶限速器"""
+
+    def __init__(self, rate: float, capacity: int):
+        if rate <= 0:
+            raise ValueError(f"令牌补充速率必须大于 0: {rate}")
+        self.rate = float(rate)
+        self.max_rate = self.rate
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self) -> float:
+        """取走一个令牌，令牌不足时阻塞等待；返回实际等待的秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def slow_down(self, factor: float = THROTTLE_DECREASE_FACTOR) -> None:
+        """服务器报错时降低补充速率，并清空已积攒的令牌"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.max_rate * THROTTLE_MIN_RATIO, self.rate * factor)
+            self._tokens = min(self._tokens, 0.0)
+
+    def speed_up(self, step: float = THROTTLE_RECOVERY_STEP) -> None:
+        """请求成功时逐步恢复到配置速率"""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate * step)
+
+    def pause(self, seconds: float) -> None:
+        """在指定秒数内暂停发放令牌（用于遵守 Retry-After）"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class HostRateLimiter:
+    """按主机维护独立的令牌桶，不同主机之间互不阻塞"""
+
+    def __init__(self, rate: float = None, burst: int = None, overrides: dict = None):
+        # 显式指定 rate/burst 时对所有主机生效，否则使用 HOST_RATE_LIMITS 中的主机配置
+        self.rate = rate
+        self.burst = burst
+        self.overrides = dict(HOST_RATE_LIMITS if overrides is None else overrides)
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, host: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self.overrides.get(host, (DEFAULT_RATE, DEFAULT_BURST))
+                bucket = TokenBucket(self.rate or rate, self.burst or burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def bucket_for_url(self, url: str) -> TokenBucket:
+        return self.bucket_for(urlsplit(url).hostname or '')
+
+    def acquire(self, url: str) -> float:
+        """在请求 url 之前调用，按其主机限速"""
+        return self.bucket_for_url(url).acquire()
+
+
+def parse_retry_after(value) -> float:
+    """解析 Retry-After 头（秒数或 HTTP 日期），无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    # email.utils 会连带导入 socket、calendar 等模块，只在遇到 HTTP 日期时才导入
+    from email.utils import parsedate_to_datetime
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base: float = DEFAULT_BACKOFF, cap: float = MAX_BACKOFF) -> float:
+    """指数退避加全抖动：在 [0, min(cap, base * 2^attempt)] 内随机取值"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class HttpClient:
+    """共享连接池的 HTTP 客户端，带重试、Retry-After 支持和按主机自适应限速"""
+
+    def __init__(self, rate_limiter: HostRateLimiter = None, retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF, timeout: float = DEFAULT_TIMEOUT,
+                 pool_size: int = 10, log=print):
+        # requests 在创建客户端时才导入，只渲染页面、生成汇总页的命令不需要加载它
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.rate_limiter = rate_limiter
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.timeout = timeout
+        self.log = log
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        # 重试由本类自己控制（需要配合限速器），连接池只负责 keep-alive 复用
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._retryable_errors = (requests.Timeout, requests.ConnectionError)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _bucket(self, url):
+        return self.rate_limiter.bucket_for_url(url) if self.rate_limiter is not None else None
+
+    def get(self, url: str, headers: dict = None, log=None, **kwargs):
+        """发送 GET 请求；429/5xx、超时和连接错误会按退避策略重试"""
+        return self.request('GET', url, headers, log, **kwargs)
+
+    def request(self, method: str, url: str, headers: dict = None, log=None, **kwargs):
+        """发送请求，重试和限速与 get 相同"""
+        log = log or self.log
+        kwargs.setdefault('timeout', self.timeout)
+        bucket = self._bucket(url)
+        attempt = 0
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            try:
+                response = self.session.request(method, url, headers=headers, **kwargs)
+            except self._retryable_errors as e:
+                if attempt >= self.retries:
+                    raise
+                if bucket is not None:
+                    bucket.slow_down()
+                delay = backoff_delay(attempt, self.backoff)
+                log(f"请求失败，{delay:.1f} 秒后重试 ({attempt + 1}/{self.retries}) {url}: {e}")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    if bucket is not None:
+                        bucket.speed_up()
+                    return response
+                if attempt >= self.retries:
+                    return response
+                if bucket is not None:
+                    bucket.slow_down()
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None:
+                    delay = min(retry_after, MAX_BACKOFF)
+                    # 同一主机的其他线程也要等待 Retry-After 指定的时间
+                    if bucket is not None:
+                        bucket.pause(delay)
+                else:
+                    delay = backoff_delay(attempt, self.backoff)
+                response.close()
+                log(f"服务器返回 {response.status_code}，{delay:.1f} 秒后重试 ({attempt + 1}/{self.retries}) {url}")
+            time.sleep(delay)
+            attempt += 1
+
+
+# 条件请求校验信息缓存，与每个页面的 data.json 放在同一目录
+VALIDATORS_FILENAME = '.http-cache.json'
+
+
+def body_sha256(content: bytes) -> str:
+    """计算响应体的 SHA-256"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def load_validators(page_dir: str, url: str) -> dict:
+    """读取页面目录下的校验信息；链接不一致或文件损坏时视为无缓存"""
+    path = os.path.join(page_dir, VALIDATORS_FILENAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            validators = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(validators, dict) or validators.get('url') != url:
+        return {}
+    return validators
+
+
+def save_validators(page_dir: str, validators: dict) -> None:
+    """写入页面目录下的校验信息（临时文件 + os.replace，中途终止不会留下不完整的文件）"""
+    write_json_atomic(os.path.join(page_dir, VALIDATORS_FILENAME), validators, indent=2, sort_keys=False)
+
+
+def conditional_headers(validators: dict) -> dict:
+    """根据已保存的校验信息构造 If-None-Match / If-Modified-Since 请求头"""
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+
+def validators_from_response(url: str, response, body_hash: str) -> dict:
+    """从响应中提取下次条件请求需要的校验信息"""
+    return {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'body_sha256': body_hash,
+    }
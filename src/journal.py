@@ -0,0 +1,110 @@
+"""页面处理日志（断点续跑）
+
+每次运行开始时把待处理的链接记为 pending，每个页面处理完后立即追加一行
+done（附处理结果）或 failed（附失败原因），写入 data/journal.jsonl。
+任务被取消或崩溃后，--resume 只处理上次没有完成或失败的链接，
+--retry-failed 只重试失败的链接。所有链接都完成后日志文件会被删除，
+有未完成的链接时压缩为每个链接一行。
+"""
+import json
+import os
+import threading
+import time
+
+from storage import DATA_DIR, open_atomic
+
+JOURNAL_PATH = os.path.join(DATA_DIR, 'journal.jsonl')
+
+STATUS_PENDING = 'pending'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+class Journal:
+    """只追加写入的页面状态日志（线程安全）"""
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self.run_id = time.strftime('%Y%m%dT%H%M%S')
+        # url -> 最新一条记录
+        self.entries = self._load()
+
+    def _load(self):
+        entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 进程中途退出时最后一行可能不完整
+                        continue
+                    if isinstance(record, dict) and record.get('url'):
+                        entries[record['url']] = record
+        except OSError:
+            pass
+        return entries
+
+    def reset(self):
+        """开始一次全新的运行，丢弃以前的记录"""
+        with self._lock:
+            self._close_file()
+            self.entries = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _append(self, record):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        # 每行立即落盘，进程被杀掉时已完成的页面不会丢失
+        self._file.flush()
+
+    def record(self, url, status, result=None, reason=None):
+        record = {'url': url, 'status': status, 'run': self.run_id,
+                  'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        if result is not None:
+            record['result'] = result
+        if reason is not None:
+            record['reason'] = reason
+        with self._lock:
+            self.entries[url] = record
+            self._append(record)
+
+    def start(self, urls):
+        """把本次要处理的链接记为 pending"""
+        for url in urls:
+            self.record(url, STATUS_PENDING)
+
+    def done(self, url, result):
+        self.record(url, STATUS_DONE, result=result)
+
+    def fail(self, url, reason):
+        self.record(url, STATUS_FAILED, reason=reason)
+
+    def status(self, url):
+        with self._lock:
+            record = self.entries.get(url)
+            return record.get('status') if record else None
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """结束运行：全部完成时删除日志，否则压缩为每个链接一行；返回未完成的链接数"""
+        with self._lock:
+            self._close_file()
+            remaining = [record for record in self.entries.values() if record.get('status') != STATUS_DONE]
+            if not remaining:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return 0
+            with open_atomic(self.path) as f:
+                for record in self.entries.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            return len(remaining)
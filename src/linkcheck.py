@@ -0,0 +1,311 @@
+"""下载链接健康检查
+
+页面上的"立即下载"按钮直接指向 data.json 中的 http(s) 链接，ed2k / magnet 链接也只是原样展示，
+文件失效或链接抄错后不会有任何提示。这里读取 docs/ 下的 data.json 逐个检查：
+
+- http(s)：发送 HEAD 请求（跟随重定向），服务器不接受 HEAD 时改为只取第一个字节的 GET（Range: bytes=0-0），
+  最终状态码为 2xx 视为可用，响应中给出文件大小时一并记录；
+- ed2k / magnet：检查链接格式（ed2k 的文件名、字节数和 MD4 哈希，magnet 的 btih），
+  并与版本属性中的文件大小比较。属性中的大小只保留两位小数，允许 SIZE_TOLERANCE 的误差；
+  一个版本包含多个文件时，只比较文件名与属性中文件名相同的链接。
+
+http(s) 链接按主机轮流提交到线程池，每个主机同时最多 per_host 个请求，并由 HttpClient 按主机限速。
+同一链接出现在多个页面上时只请求一次。结果缓存在 data/link-check-cache.json，
+ttl 内不重复请求；连接失败、超时等没有拿到状态码的结果不缓存，下次重新检查。
+"""
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from metadata import parse_attributes, parse_download_url
+from storage import DATA_DIR, write_json_atomic
+
+LINK_CHECK_DIR = DATA_DIR
+LINK_CHECK_CACHE_FILENAME = 'link-check-cache.json'
+LINK_HEALTH_FILENAME = 'link-health.json'
+
+DEFAULT_CHECK_WORKERS = 16
+DEFAULT_PER_HOST = 2
+DEFAULT_TTL_HOURS = 24.0
+
+# 链接中的字节数与属性中的文件大小允许的相对误差
+SIZE_TOLERANCE = 0.01
+
+# 这些状态码往往表示服务器不接受 HEAD，而不是链接失效，改用 GET 再确认一次
+HEAD_FALLBACK_STATUSES = frozenset({403, 405, 501})
+
+# ed2k://|file|文件名|字节数|MD4 哈希|[h=AICH 哈希|…]/
+_ED2K_RE = re.compile(r'^ed2k://\|file\|[^|]+\|[0-9]+\|[0-9A-Fa-f]{32}\|(?:[a-z]+=[^|]*\|)*/?$')
+_CONTENT_RANGE_RE = re.compile(r'^bytes\s+[0-9]+-[0-9]+/([0-9]+)$')
+
+
+def iter_page_data(docs_dir, paths=None):
+    """逐个产出 (页面路径, 页面数据)；paths 为 None 时读取 docs_dir 下全部 data.json"""
+    if paths is None:
+        paths = []
+        for dirpath, _, filenames in os.walk(docs_dir):
+            if 'data.json' in filenames:
+                paths.append(os.path.relpath(dirpath, docs_dir).replace(os.sep, '/'))
+        paths.sort()
+    for path in paths:
+        try:
+            with open(os.path.join(docs_dir, *path.split('/'), 'data.json'), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        yield path, data
+
+
+def _format_size(size):
+    return f"{size / 1024 ** 3:.2f}GB" if size >= 1024 ** 3 else f"{size / 1024 ** 2:.2f}MB"
+
+
+def validate_p2p_link(url, link, declared_size=None):
+    """检查 ed2k / magnet 链接，返回问题描述列表；declared_size 为版本属性中的文件大小"""
+    problems = []
+    if link['scheme'] == 'ed2k':
+        if not _ED2K_RE.match(url):
+            problems.append('ed2k 链接格式错误')
+        elif not link.get('size_bytes'):
+            problems.append('ed2k 链接中的文件大小为 0')
+    elif 'btih' not in link:
+        problems.append('magnet 链接缺少有效的 btih')
+    size = link.get('size_bytes')
+    if size and declared_size and abs(size - declared_size) > declared_size * SIZE_TOLERANCE:
+        problems.append(f"文件大小 {_format_size(size)}（{size} 字节）与属性中的 {_format_size(declared_size)} "
+                        f"相差 {abs(size - declared_size) / declared_size * 100:.1f}%")
+    return problems
+
+
+def _response_size(response):
+    """从响应头中取出文件大小：206 取 Content-Range 中的总长度，200 取 Content-Length"""
+    if response.status_code == 206:
+        match = _CONTENT_RANGE_RE.match(response.headers.get('Content-Range', '').strip())
+        return int(match.group(1)) if match else None
+    length = response.headers.get('Content-Length', '')
+    return int(length) if response.status_code == 200 and length.isdigit() else None
+
+
+def probe_url(client, url):
+    """检查 http(s) 链接，返回 {'status', 'ok', 'method', 'size_bytes', 'final_url'}；请求失败时抛出异常"""
+    method = 'HEAD'
+    response = client.request(method, url)
+    response.close()
+    if response.status_code in HEAD_FALLBACK_STATUSES:
+        method = 'GET'
+        # stream=True 且不读取响应体：服务器忽略 Range 返回整个文件时也只读到响应头
+        response = client.request(method, url, headers={'Range': 'bytes=0-0'}, stream=True)
+        response.close()
+    return {
+        'status': response.status_code,
+        'ok': 200 <= response.status_code < 300,
+        'method': method,
+        'size_bytes': _response_size(response),
+        'final_url': response.url,
+    }
+
+
+class LinkCheckCache:
+    """http(s) 链接检查结果缓存，检查时间早于 ttl 秒前的结果视为过期（线程安全）"""
+
+    def __init__(self, root=LINK_CHECK_DIR, ttl=DEFAULT_TTL_HOURS * 3600):
+        self.root = root
+        self.path = os.path.join(root, LINK_CHECK_CACHE_FILENAME)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f).get('urls', {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _fresh(self, entry, now):
+        return isinstance(entry, dict) and now - entry.get('checked_at', 0) < self.ttl
+
+    def get(self, url, now=None):
+        """返回未过期的检查结果，没有时返回 None"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self.entries.get(url)
+            return dict(entry) if self._fresh(entry, now) else None
+
+    def put(self, url, result, now=None):
+        with self._lock:
+            self.entries[url] = dict(result, checked_at=time.time() if now is None else now)
+            self._dirty = True
+
+    def save(self, now=None):
+        """删除过期条目后写回磁盘（没有变化时不写）"""
+        now = time.time() if now is None else now
+        with self._lock:
+            stale = [url for url, entry in self.entries.items() if not self._fresh(entry, now)]
+            for url in stale:
+                del self.entries[url]
+            if not (self._dirty or stale):
+                return
+            write_json_atomic(self.path, {'urls': self.entries})
+            self._dirty = False
+
+
+class HostSlots:
+    """限制每个主机同时进行的请求数"""
+
+    def __init__(self, limit):
+        self.limit = max(1, limit)
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def slot(self, url):
+        host = urlsplit(url).hostname or ''
+        with self._lock:
+            slot = self._slots.get(host)
+            if slot is None:
+                slot = self._slots[host] = threading.BoundedSemaphore(self.limit)
+            return slot
+
+
+def interleave_by_host(urls):
+    """按主机轮流排列链接，避免线程池中的线程都在等待同一个主机的名额"""
+    queues = {}
+    for url in urls:
+        queues.setdefault(urlsplit(url).hostname or '', []).append(url)
+    return [url for batch in itertools.zip_longest(*queues.values()) for url in batch if url is not None]
+
+
+def check_links(docs_dir, client, cache=None, workers=DEFAULT_CHECK_WORKERS, per_host=DEFAULT_PER_HOST,
+                paths=None, log=print):
+    """检查 docs_dir 下各页面的下载链接，返回健康报告
+
+    client 为 HttpClient；cache（LinkCheckCache）为 None 时每个 http(s) 链接都重新请求；
+    paths 为页面路径列表时只检查这些页面。
+    """
+    started = time.time()
+    links = {'ed2k': 0, 'magnet': 0, 'http': 0, 'other': 0}
+    problems = []
+    reported = set()
+    # http(s) 链接 -> {引用它的页面路径: 版本}
+    http_refs = {}
+    pages = 0
+
+    def report_problem(path, version_text, url, kind, problem):
+        # 源站"所有版本"的汇总版本会重复列出各版本的链接，同一页面上的同一问题只报告一次
+        if (path, url, problem) not in reported:
+            reported.add((path, url, problem))
+            problems.append({'page': path, 'version': version_text, 'url': url, 'kind': kind, 'problem': problem})
+
+    for path, data in iter_page_data(docs_dir, paths):
+        pages += 1
+        for version in data.get('versions', []):
+            version_text = version.get('version_text', '')
+            fields = version['fields'] if 'fields' in version else parse_attributes(version.get('attributes', []))
+            downloads = [(d.get('download_url', ''), d['link'] if 'link' in d else parse_download_url(d.get('download_url', '')))
+                         for d in version.get('downloads', [])]
+            hashed_files = {link.get('file_name') for _, link in downloads if 'ed2k' in link or 'btih' in link}
+            for url, link in downloads:
+                scheme = link['scheme']
+                if scheme in ('http', 'https'):
+                    links['http'] += 1
+                    http_refs.setdefault(url, {}).setdefault(path, version_text)
+                elif scheme in ('ed2k', 'magnet'):
+                    links[scheme] += 1
+                    # 属性中的文件大小只对应版本中的一个文件
+                    declared = (fields.get('size_bytes')
+                                if len(hashed_files) == 1 or link.get('file_name') == fields.get('file_name') else None)
+                    for problem in validate_p2p_link(url, link, declared):
+                        report_problem(path, version_text, url, scheme, problem)
+                else:
+                    links['other'] += 1
+
+    results = {}
+    pending = []
+    for url in http_refs:
+        cached = cache.get(url) if cache is not None else None
+        if cached is not None:
+            results[url] = cached
+        else:
+            pending.append(url)
+    log(f"检查 {pages} 个页面: http(s) 链接 {len(http_refs)} 个（缓存 {len(results)} 个，"
+        f"需要请求 {len(pending)} 个），ed2k {links['ed2k']} 个，magnet {links['magnet']} 个")
+
+    slots = HostSlots(per_host)
+
+    def check(url):
+        with slots.slot(url):
+            try:
+                result = probe_url(client, url)
+            except Exception as e:
+                return {'status': None, 'ok': False, 'error': type(e).__name__, 'detail': str(e)}
+        if cache is not None:
+            cache.put(url, result)
+        return result
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            ordered = interleave_by_host(pending)
+            for url, result in zip(ordered, executor.map(check, ordered)):
+                results[url] = result
+
+    hosts = {}
+    for url, refs in http_refs.items():
+        result = results[url]
+        host = hosts.setdefault(urlsplit(url).hostname or '', {'ok': 0, 'failed': 0})
+        host['ok' if result['ok'] else 'failed'] += 1
+        if result['ok']:
+            continue
+        problem = f"HTTP {result['status']}" if result.get('status') is not None else result.get('error', '请求失败')
+        for path, version_text in refs.items():
+            report_problem(path, version_text, url, 'http', problem)
+
+    return {
+        'generated_at': started,
+        'duration_seconds': time.time() - started,
+        'pages': pages,
+        'links': links,
+        'http': {
+            'unique': len(http_refs),
+            'requested': len(pending),
+            'cached': len(http_refs) - len(pending),
+            'ok': sum(1 for result in results.values() if result['ok']),
+            'failed': sum(1 for result in results.values() if not result['ok']),
+        },
+        'hosts': hosts,
+        'results': results,
+        'problems': problems,
+    }
+
+
+def write_health_report(report, report_dir):
+    """写入 <report_dir>/link-health.json，返回文件路径"""
+    path = os.path.join(report_dir, LINK_HEALTH_FILENAME)
+    write_json_atomic(path, report, indent=2, sort_keys=False)
+    return path
+
+
+def print_health_summary(report, limit=20):
+    http = report['http']
+    print(f"\n链接检查: {report['pages']} 个页面，耗时 {report['duration_seconds']:.1f}s")
+    print(f"  http(s): {http['unique']} 个链接，可用 {http['ok']} 个，失效 {http['failed']} 个"
+          f"（请求 {http['requested']} 个，使用缓存 {http['cached']} 个）")
+    for host, counts in sorted(report['hosts'].items()):
+        if counts['failed']:
+            print(f"    {host}: 失效 {counts['failed']}/{counts['ok'] + counts['failed']}")
+    problems = report['problems']
+    if not problems:
+        print("✅ 没有发现问题")
+        return
+    print(f"⚠️ 发现 {len(problems)} 个问题:")
+    for problem in problems[:limit]:
+        print(f"  {problem['page']} / {problem['version']}: {problem['problem']}")
+        print(f"    {problem['url']}")
+    if len(problems) > limit:
+        print(f"  …… 另有 {len(problems) - limit} 个，完整列表见健康报告")
@@ -0,0 +1,148 @@
+"""链接检查自检：在本机启动模拟下载服务器，用合成的 data.json 运行 check_links，
+确认可用 / 失效链接、HEAD 回退、重定向、ed2k / magnet 校验、每主机并发上限和结果缓存都符合预期
+
+用法: python linkcheck_selftest.py
+"""
+import json
+import os
+import socket
+import sys
+import tempfile
+
+from fixtures import StandInServer
+from http_client import HostRateLimiter, HttpClient
+from linkcheck import LinkCheckCache, check_links
+
+GB = 1024 ** 3
+ED2K_HASH = '0DC147C1B38DD5431F2C39D7491CFC8E'
+BTIH = '9b0ca6ee95d13a35be062f62cba36959aef0c4f3'
+PER_HOST = 2
+
+ROUTES = {
+    '/ok.iso': {'size': 3 * GB, 'delay': 0.05},
+    '/gone.iso': {'status': 404},
+    '/no-head.iso': {'size': GB, 'head_status': 405},
+    '/moved.iso': {'redirect': '/ok.iso'},
+}
+ROUTES.update({f"/bulk-{i}.iso": {'size': GB, 'delay': 0.05} for i in range(8)})
+
+
+def closed_port_url():
+    """本机上没有进程监听的地址，用于模拟连接失败"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/unreachable.iso"
+
+
+def version(text, size, downloads, file_name='a.iso'):
+    return {
+        'version_text': text,
+        'attributes': [f"文件名：{file_name}", f"文件大小：{size}"],
+        'downloads': [{'download_url': url, 'download_type': '下载'} for url in downloads],
+    }
+
+
+def write_pages(docs_dir, server, unreachable):
+    pages = {
+        'windows-11/good': [
+            version('单文件', '1.00GB', [
+                f"ed2k://|file|a.iso|{GB}|{ED2K_HASH}|/",
+                f"magnet:?xt=urn:btih:{BTIH}&dn=a.iso&xl={GB}",
+                server.url('/ok.iso'),
+                server.url('/no-head.iso'),
+                server.url('/moved.iso'),
+            ]),
+            # 多个文件时只比较与属性文件名相同的链接，b.iso 的大小不参与比较
+            version('多文件', '1.00GB', [
+                f"ed2k://|file|a.iso|{GB}|{ED2K_HASH}|/",
+                f"ed2k://|file|b.iso|{2 * GB}|{ED2K_HASH}|/",
+            ]),
+        ],
+        'windows-11/bad': [
+            version('坏链接', '1.00GB', [
+                f"ed2k://|file|a.iso|{GB}|{ED2K_HASH[:20]}|/",
+                'magnet:?dn=a.iso',
+                server.url('/gone.iso'),
+                unreachable,
+            ]),
+            version('大小不符', '1.00GB', [f"ed2k://|file|a.iso|{int(1.5 * GB)}|{ED2K_HASH}|/"]),
+        ],
+        'windows-10/bulk': [
+            version('同一主机的多个链接', '1.00GB', [server.url('/ok.iso')]
+                    + [server.url(f"/bulk-{i}.iso") for i in range(8)]),
+        ],
+    }
+    for path, versions in pages.items():
+        page_dir = os.path.join(docs_dir, *path.split('/'))
+        os.makedirs(page_dir)
+        with open(os.path.join(page_dir, 'data.json'), 'w', encoding='utf-8') as f:
+            json.dump({'title': path, 'intro_text': '', 'versions': versions, 'url': path}, f, ensure_ascii=False)
+
+
+def run(docs_dir, cache):
+    client = HttpClient(HostRateLimiter(rate=1000, burst=1000), retries=0, timeout=5, pool_size=8)
+    try:
+        return check_links(docs_dir, client, cache, workers=8, per_host=PER_HOST, log=lambda message: None)
+    finally:
+        client.close()
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    tmp_dir = tempfile.mkdtemp()
+    docs_dir = os.path.join(tmp_dir, 'docs')
+    unreachable = closed_port_url()
+    with StandInServer(ROUTES) as server:
+        write_pages(docs_dir, server, unreachable)
+        cache = LinkCheckCache(root=tmp_dir, ttl=3600)
+        report = run(docs_dir, cache)
+        cache.save()
+
+        found = sorted((p['page'], p['kind'], p['problem'].split('（')[0]) for p in report['problems'])
+        expected = sorted([
+            ('windows-11/bad', 'ed2k', 'ed2k 链接格式错误'),
+            ('windows-11/bad', 'magnet', 'magnet 链接缺少有效的 btih'),
+            ('windows-11/bad', 'http', 'HTTP 404'),
+            ('windows-11/bad', 'http', 'ConnectionError'),
+            ('windows-11/bad', 'ed2k', '文件大小 1.50GB'),
+        ])
+        expect(found == expected, f"问题列表不符: {found}")
+        results = report['results']
+        expect(results[server.url('/ok.iso')]['size_bytes'] == 3 * GB, '未从 HEAD 响应中取得文件大小')
+        no_head = results[server.url('/no-head.iso')]
+        expect(no_head['ok'] and no_head['method'] == 'GET' and no_head['size_bytes'] == GB,
+               f"HEAD 返回 405 时没有改用 Range GET: {no_head}")
+        expect(server.requests.get('/no-head.iso', [])[-1:] == [('GET', 'bytes=0-0')], 'Range GET 请求头不符')
+        moved = results[server.url('/moved.iso')]
+        expect(moved['ok'] and moved['final_url'] == server.url('/ok.iso'), f"没有跟随重定向: {moved}")
+        expect(len(server.requests['/ok.iso']) == 2, '同一链接被重复请求（重定向之外）')
+        expect(server.max_active <= PER_HOST, f"同一主机的并发请求数 {server.max_active} 超过上限 {PER_HOST}")
+        expect(report['http']['requested'] == 13, f"首次运行的请求数不符: {report['http']}")
+
+        # 第二次运行：有状态码的结果来自缓存，连接失败的链接重新请求
+        before = sum(len(requests) for requests in server.requests.values())
+        report = run(docs_dir, LinkCheckCache(root=tmp_dir, ttl=3600))
+        after = sum(len(requests) for requests in server.requests.values())
+        expect(report['http']['requested'] == 1 and after == before,
+               f"缓存未生效: {report['http']}，服务器新收到 {after - before} 个请求")
+        expect(len(report['problems']) == 5, '使用缓存后问题列表不符')
+        # ttl 为 0 时全部重新请求
+        report = run(docs_dir, LinkCheckCache(root=tmp_dir, ttl=0))
+        expect(report['http']['requested'] == 13, f"缓存过期后没有重新请求: {report['http']}")
+
+    for message in failures:
+        print(f"❌ {message}")
+    if failures:
+        print(f"链接检查自检失败: {len(failures)} 项")
+        sys.exit(1)
+    print("✅ 链接检查自检通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""直接基于 lxml/XPath 的页面解析后端（--parser=lxml-direct）
+
+不构建 BeautifulSoup 树，只按文档顺序取出标题、section、h3、strong 和
+dl-link 节点（lxml 在 C 层按标签名过滤），导航、页脚、脚本等无关内容
+不会进入 Python。输出与 app.parse_page_html 的 BeautifulSoup 实现保持一致。
+"""
+import lxml.html
+from lxml import etree
+
+
+def _class_test(class_name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+# 解析需要的标签；不用 XPath 并集是因为 libxml2 对并集结果做文档顺序排序，
+# 兄弟节点很多时开销会随页面规模超线性增长
+_NODE_TAGS = ('h1', 'section', 'h3', 'strong', 'div')
+_FIND_CONTENT_DIV = etree.XPath(f"(.//div[{_class_test('sppb-addon-content')}])[1]")
+# 与 BeautifulSoup（4.10 起，见 requirements.txt）的 get_text 一致：跳过注释以及 script/style/template 中的文本，
+# 但直接对这几种标签取文本时只返回它们自己的内容
+_TEXT_NODES = etree.XPath(".//text()[not(ancestor::script or ancestor::style or ancestor::template)]")
+_TEMPLATE_TEXT_NODES = etree.XPath(".//text()[not(ancestor::script or ancestor::style)]")
+
+_UTF8_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+
+def _has_class(element, class_name):
+    return class_name in (element.get('class') or '').split()
+
+
+def _get_text(element):
+    """等价于 BeautifulSoup 的 get_text(strip=True)"""
+    if not isinstance(element.tag, str):
+        # 注释、处理指令
+        return ''
+    if element.tag in ('script', 'style'):
+        return ''.join(text.strip() for text in element.itertext())
+    if element.tag == 'template':
+        return ''.join(text.strip() for text in _TEMPLATE_TEXT_NODES(element))
+    return ''.join(text.strip() for text in _TEXT_NODES(element))
+
+
+def _collect_attributes(h3_element):
+    """提取属性信息（h3后面的文本，直到下一个h3或section结束）"""
+    attributes = []
+
+    def add(text):
+        if text:
+            text = text.strip()
+            if text and text != '迅雷下载：':
+                attributes.append(text)
+
+    add(h3_element.tail)
+    for sibling in h3_element.itersiblings():
+        if sibling.tag == 'h3':
+            break
+        add(_get_text(sibling))
+        add(sibling.tail)
+    return attributes
+
+
+def _parse_document(html):
+    if not html or not html.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # 带编码声明的 XML 风格文档不能以 str 形式传给 lxml
+        return lxml.html.document_fromstring(html.encode('utf-8'), parser=_UTF8_PARSER)
+    except etree.ParserError:
+        return None
+
+
+def parse_page_html(html, url):
+    """从页面 HTML 中解析数据（lxml 直接解析版本）"""
+    root = _parse_document(html)
+
+    title_element = None
+    current_download_type = None
+    section_records = {}
+    section_order = []
+
+    nodes = root.iter(*_NODE_TAGS) if root is not None else ()
+    for element in nodes:
+        tag = element.tag
+        if tag == 'div':
+            if not _has_class(element, 'dl-link'):
+                continue
+            download_url = _get_text(element)
+            if not download_url:
+                continue
+            download_type = current_download_type if current_download_type is not None else "下载"
+            for section in element.iterancestors('section'):
+                section_records[section][1].append({
+                    'download_url': download_url,
+                    'download_type': download_type
+                })
+        elif tag == 'section':
+            record = [None, []]
+            section_records[element] = record
+            section_order.append(record)
+        elif tag == 'h3':
+            # section.find('h3') 取的是 section 内第一个 h3
+            for section in element.iterancestors('section'):
+                record = section_records[section]
+                if record[0] is None:
+                    record[0] = element
+        elif tag == 'strong':
+            current_download_type = _get_text(element)
+        elif tag == 'h1':
+            if title_element is None and _has_class(element, 'sppb-addon-title'):
+                title_element = element
+
+    title = _get_text(title_element) if title_element is not None else "未知标题"
+
+    intro_text = ""
+    if title_element is not None and title_element.getparent() is not None:
+        content_divs = _FIND_CONTENT_DIV(title_element.getparent())
+        if content_divs:
+            intro_text = _get_text(content_divs[0])
+
+    versions = []
+    attributes_by_h3 = {}
+    for h3_element, downloads in section_order:
+        if h3_element is None:
+            continue
+        version_text = _get_text(h3_element)
+        if h3_element not in attributes_by_h3:
+            attributes_by_h3[h3_element] = _collect_attributes(h3_element)
+        attributes = list(attributes_by_h3[h3_element])
+        if version_text and (attributes or downloads):
+            versions.append({
+                'version_text': version_text,
+                'attributes': attributes,
+                'downloads': downloads
+            })
+
+    return {
+        'title': title,
+        'intro_text': intro_text,
+        'versions': versions,
+        'url': url
+    }
@@ -0,0 +1,81 @@
+"""解析和渲染结果的内容哈希缓存（memo）
+
+源站并不总是返回可靠的 ETag / Last-Modified，页面目录下的 .http-cache.json 或构建清单
+也可能不存在（新检出、删除了输出、换了 URL），这时相同的 HTML 仍会被重新解析和渲染。
+这里按内容哈希缓存两类结果，与 HTTP 缓存无关：
+- parse：键为 解析版本 + 解析后端 + URL + HTML 的 SHA-256，值为提取的数据（JSON）；
+- render：键为 数据 JSON + 模板版本 的哈希（即构建清单中的输入哈希），值为精简后的页面 HTML。
+
+条目以 zlib 压缩后存放在 data/memo/<命名空间>/<键前两位>/<键> 中，写入通过临时文件 + rename 原子完成，
+多个进程（解析进程池、同一台机器上的分片）可以同时读写。命中时更新文件的 mtime，
+运行结束时 evict() 按 mtime 从旧到新删除条目，直到总大小不超过上限（LRU）。
+"""
+import os
+import threading
+import zlib
+
+from storage import DATA_DIR
+
+MEMO_DIR = os.path.join(DATA_DIR, 'memo')
+DEFAULT_MEMO_MAX_BYTES = 256 * 1024 * 1024
+
+MEMO_PARSE = 'parse'
+MEMO_RENDER = 'render'
+MEMO_NAMESPACES = (MEMO_PARSE, MEMO_RENDER)
+
+
+class MemoStore:
+    """按内容哈希缓存文本结果的磁盘存储；只保存路径和上限，可以传给解析子进程"""
+
+    def __init__(self, root=MEMO_DIR, max_bytes=DEFAULT_MEMO_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def entry_path(self, namespace, key):
+        return os.path.join(self.root, namespace, key[:2], key)
+
+    def get(self, namespace, key):
+        """返回缓存的文本，不存在或已损坏时返回 None；命中时刷新条目的 LRU 时间"""
+        path = self.entry_path(namespace, key)
+        try:
+            with open(path, 'rb') as f:
+                text = zlib.decompress(f.read()).decode('utf-8')
+            os.utime(path)
+        except (OSError, zlib.error, UnicodeDecodeError):
+            return None
+        return text
+
+    def put(self, namespace, key, text):
+        path = self.entry_path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(text.encode('utf-8'), 1))
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """按最近使用时间删除最旧的条目，直到总大小不超过 max_bytes；返回 (删除的条目数, 剩余字节数)"""
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        removed = 0
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+        return removed, total
@@ -0,0 +1,155 @@
+"""版本属性和下载链接的结构化解析
+
+页面上的属性是"文件大小：6.01GB"、"MD5：…"这样的自由文本，下载链接也只有原始字符串。
+提取页面数据时在保留原始字符串的同时补充结构化字段，后续的排序、筛选和去重
+直接使用整数和固定宽度的摘要，不必再各自用正则解析文本：
+
+    version['fields']  文件名、字节数（int）、发布日期（YYYY-MM-DD）、MD5 / SHA1（大写十六进制）
+    download['link']   链接类型；ed2k 的文件名、字节数和 MD4 哈希，magnet 的 btih（小写十六进制）、dn 和 xl
+"""
+import base64
+import re
+from urllib.parse import unquote, unquote_plus
+
+# 属性名（冒号前的部分）到字段名的映射
+_ATTRIBUTE_KEYS = {
+    '文件名': 'file_name',
+    '文件': 'file_name',
+    '文件大小': 'size_bytes',
+    '大小': 'size_bytes',
+    '发布时间': 'release_date',
+    'MD5': 'md5',
+    'SHA1': 'sha1',
+    'SHA-1': 'sha1',
+}
+_ATTRIBUTE_RE = re.compile(r'^\s*([^：:]+?)\s*[：:]\s*(.*?)\s*$')
+_SIZE_RE = re.compile(r'^\s*([0-9]+(?:\.[0-9]+)?)\s*([KMGT]?)I?B?\s*$', re.IGNORECASE)
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+_DATE_RE = re.compile(r'^(\d{4})[-/.年](\d{1,2})[-/.月](\d{1,2})日?$')
+_HEX_LENGTHS = {'md5': 32, 'sha1': 40}
+_HEX_RE = re.compile(r'[0-9A-Fa-f]+')
+
+
+def parse_size(text):
+    """把 6.01GB、700 MB、1.5T 这类大小写法转换为字节数（按 1024 进制）"""
+    match = _SIZE_RE.match(text)
+    if not match:
+        raise ValueError(f"无法识别的大小: {text}")
+    number, unit = match.groups()
+    return int(float(number) * _SIZE_UNITS[unit.upper()])
+
+
+def parse_date(text):
+    """把 2014-9-1、2014/09/01 这类日期转换为 YYYY-MM-DD，无法识别时返回 None"""
+    match = _DATE_RE.match(text.strip())
+    if not match:
+        return None
+    year, month, day = (int(part) for part in match.groups())
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def _parse_hex(text, length):
+    text = text.strip()
+    if len(text) == length and _HEX_RE.fullmatch(text):
+        return text.upper()
+    return None
+
+
+def parse_attributes(attributes):
+    """从属性文本列表中解析结构化字段，只包含能识别的字段"""
+    fields = {}
+    for attribute in attributes:
+        match = _ATTRIBUTE_RE.match(attribute)
+        if not match:
+            continue
+        key = _ATTRIBUTE_KEYS.get(match.group(1))
+        value = match.group(2)
+        if key is None or not value or key in fields:
+            continue
+        if key == 'file_name':
+            fields['file_name'] = value
+        elif key == 'size_bytes':
+            try:
+                fields['size_bytes'] = parse_size(value)
+            except ValueError:
+                pass
+        elif key == 'release_date':
+            date = parse_date(value)
+            if date:
+                fields['release_date'] = date
+        else:
+            digest = _parse_hex(value, _HEX_LENGTHS[key])
+            if digest:
+                fields[key] = digest
+    return fields
+
+
+def _parse_btih(xt):
+    """取出 urn:btih: 后的 infohash，32 位 base32 形式转换为 40 位十六进制"""
+    if not xt.lower().startswith('urn:btih:'):
+        return None
+    infohash = xt[len('urn:btih:'):]
+    if len(infohash) == 40 and _parse_hex(infohash, 40):
+        return infohash.lower()
+    if len(infohash) == 32:
+        try:
+            return base64.b32decode(infohash.upper()).hex()
+        except ValueError:
+            return None
+    return None
+
+
+def parse_download_url(download_url):
+    """解析下载链接；ed2k / magnet 之外的链接只记录类型"""
+    scheme = download_url.split(':', 1)[0].lower() if ':' in download_url else ''
+    link = {'scheme': scheme}
+    if scheme == 'ed2k':
+        # ed2k://|file|文件名|大小|MD4 哈希|/
+        parts = download_url.split('|')
+        if len(parts) >= 5 and parts[1] == 'file':
+            if parts[2]:
+                link['file_name'] = unquote(parts[2])
+            if parts[3].isdigit():
+                link['size_bytes'] = int(parts[3])
+            digest = _parse_hex(parts[4], 32)
+            if digest:
+                link['ed2k'] = digest
+    elif scheme == 'magnet':
+        # 只取需要的参数，同名参数以第一次出现的为准
+        for param in download_url.partition('?')[2].split('&'):
+            name, _, value = param.partition('=')
+            if name == 'xt' and 'btih' not in link:
+                btih = _parse_btih(unquote_plus(value))
+                if btih:
+                    link['btih'] = btih
+            elif name == 'dn' and value and 'file_name' not in link:
+                link['file_name'] = unquote_plus(value)
+            elif name == 'xl' and value.isdigit() and 'size_bytes' not in link:
+                link['size_bytes'] = int(value)
+    return link
+
+
+def enrich_page_data(data):
+    """为页面数据补充 version['fields'] 和 download['link']（原地修改并返回）"""
+    for version in data.get('versions', []):
+        version['fields'] = parse_attributes(version.get('attributes', []))
+        for download in version.get('downloads', []):
+            download['link'] = parse_download_url(download.get('download_url', ''))
+    return data
+
+
+def strip_page_data(data):
+    """去掉结构化字段，只保留页面上的原始内容（返回新的字典）"""
+    versions = []
+    for version in data.get('versions', []):
+        versions.append({
+            'version_text': version['version_text'],
+            'attributes': version['attributes'],
+            'downloads': [
+                {'download_url': d['download_url'], 'download_type': d['download_type']}
+                for d in version['downloads']
+            ],
+        })
+    return {'title': data['title'], 'intro_text': data['intro_text'], 'versions': versions, 'url': data['url']}
@@ -0,0 +1,296 @@
+"""按页面、按阶段的耗时统计和运行报告
+
+save_page_data / extract_page_data 在各阶段（请求、解析、渲染、写入等）记录耗时和字节数，
+运行结束时输出 JSON 报告和 Prometheus textfile 格式的指标文件（可直接交给
+node_exporter 的 textfile collector），包含各阶段的 p50 / p95 和最慢的页面。
+
+fetch 是完整的请求耗时（含限速等待、重试和读取响应体），ttfb 是最后一次请求从发出到
+收到响应头的时间（requests 的 response.elapsed，包含 DNS、TCP/TLS 建连和服务器处理）。
+"""
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from storage import REPO_ROOT, open_atomic
+
+REPORT_DIR = os.path.join(REPO_ROOT, 'reports')
+REPORT_FILENAME = 'run-report.json'
+PROMETHEUS_FILENAME = 'scraper.prom'
+METRIC_PREFIX = 'msdn_scraper'
+
+# 报告中各阶段的展示顺序，未列出的阶段排在后面
+STAGE_ORDER = ('fetch', 'ttfb', 'snapshot', 'parse', 'render', 'write', 'index')
+# 计入页面总耗时的阶段：互不重叠（ttfb 已包含在 fetch 中），index 是索引维护，不属于页面处理
+PAGE_TOTAL_STAGES = ('fetch', 'snapshot', 'parse', 'render', 'write')
+SLOWEST_URL_COUNT = 10
+
+
+def percentile(sorted_values, fraction):
+    """最近秩百分位数，sorted_values 需已排序"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def page_total_seconds(stages):
+    """页面的总耗时：只累加 PAGE_TOTAL_STAGES 中的阶段"""
+    return sum(stages.get(name, 0.0) for name in PAGE_TOTAL_STAGES)
+
+
+class RunMetrics:
+    """一次运行中各页面各阶段的耗时和字节数（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.finished_at = None
+        self.duration = None
+        # url -> {'stages': {阶段: 秒}, 'bytes': {阶段: 字节数}, 'status': 状态}
+        self.pages = {}
+        # 不属于单个页面的阶段（链接发现、汇总页生成等）
+        self.run_stages = {}
+        # 本次实际写入的生成文件和内容未变化的文件数
+        self.outputs_written = []
+        self.outputs_unchanged = 0
+        # 流水线各阶段的吞吐量（pipeline.StageStats.report()）
+        self.pipeline = None
+        # 解析和渲染结果缓存的命中情况：{命名空间: {'hits': 次数, 'misses': 次数}}
+        self.memo = {}
+
+    def _page(self, url):
+        page = self.pages.get(url)
+        if page is None:
+            page = self.pages[url] = {'stages': {}, 'bytes': {}, 'status': None}
+        return page
+
+    def record(self, url, stage, seconds, nbytes=None):
+        """累加某页面某阶段的耗时（同一阶段多次记录时相加）"""
+        with self._lock:
+            page = self._page(url)
+            page['stages'][stage] = page['stages'].get(stage, 0.0) + seconds
+            if nbytes is not None:
+                page['bytes'][stage] = page['bytes'].get(stage, 0) + nbytes
+
+    def record_bytes(self, url, stage, nbytes):
+        with self._lock:
+            page = self._page(url)
+            page['bytes'][stage] = page['bytes'].get(stage, 0) + nbytes
+
+    def record_run_stage(self, stage, seconds):
+        with self._lock:
+            self.run_stages[stage] = self.run_stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def run_timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_run_stage(stage, time.perf_counter() - start)
+
+    def record_outputs(self, written, unchanged):
+        with self._lock:
+            self.outputs_written = sorted(written)
+            self.outputs_unchanged = unchanged
+
+    def record_pipeline(self, pipeline_report):
+        with self._lock:
+            self.pipeline = pipeline_report
+
+    def record_memo(self, namespace, hit):
+        with self._lock:
+            counts = self.memo.setdefault(namespace, {'hits': 0, 'misses': 0})
+            counts['hits' if hit else 'misses'] += 1
+
+    def set_status(self, url, status):
+        with self._lock:
+            self._page(url)['status'] = status
+
+    @contextmanager
+    def timer(self, url, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(url, stage, time.perf_counter() - start)
+
+    def finish(self):
+        self.finished_at = time.time()
+        self.duration = time.perf_counter() - self._start
+
+    def report(self):
+        """汇总为可序列化的报告"""
+        with self._lock:
+            pages = {url: {'stages': dict(page['stages']), 'bytes': dict(page['bytes']),
+                           'status': page['status']} for url, page in self.pages.items()}
+            run_stages = {stage: round(seconds, 6) for stage, seconds in self.run_stages.items()}
+            outputs = {'written': list(self.outputs_written), 'unchanged': self.outputs_unchanged}
+            pipeline = self.pipeline
+            memo = {namespace: dict(counts) for namespace, counts in self.memo.items()}
+        stage_names = sorted({stage for page in pages.values() for stage in page['stages']},
+                             key=lambda name: (STAGE_ORDER.index(name) if name in STAGE_ORDER else len(STAGE_ORDER), name))
+        stages = {}
+        for name in stage_names:
+            values = sorted(page['stages'][name] for page in pages.values() if name in page['stages'])
+            stages[name] = {
+                'count': len(values),
+                'total_seconds': round(sum(values), 6),
+                'p50_seconds': round(percentile(values, 0.50), 6),
+                'p95_seconds': round(percentile(values, 0.95), 6),
+                'max_seconds': round(values[-1], 6),
+                'bytes': sum(page['bytes'].get(name, 0) for page in pages.values()),
+            }
+        statuses = {}
+        for page in pages.values():
+            statuses[page['status']] = statuses.get(page['status'], 0) + 1
+        totals = sorted(((page_total_seconds(page['stages']), url) for url, page in pages.items()), reverse=True)
+        slowest = [
+            {'url': url, 'total_seconds': round(total, 6),
+             'stages': {name: round(seconds, 6) for name, seconds in pages[url]['stages'].items()}}
+            for total, url in totals[:SLOWEST_URL_COUNT]
+        ]
+        return {
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'duration_seconds': round(self.duration, 6) if self.duration is not None else None,
+            'pages': len(pages),
+            'statuses': {str(status): count for status, count in statuses.items()},
+            'stages': stages,
+            'run_stages': run_stages,
+            'slowest': slowest,
+            'outputs': outputs,
+            'pipeline': pipeline,
+            'memo': memo,
+            'urls': {url: {'status': page['status'],
+                           'stages': {name: round(seconds, 6) for name, seconds in page['stages'].items()},
+                           'bytes': page['bytes']}
+                     for url, page in sorted(pages.items())},
+        }
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def render_prometheus(report):
+    """把报告转换为 Prometheus textfile 格式"""
+    name = METRIC_PREFIX
+    lines = [
+        f"# HELP {name}_stage_seconds Per-page duration of each scraping stage.",
+        f"# TYPE {name}_stage_seconds summary",
+    ]
+    for stage, stats in report['stages'].items():
+        label = _escape_label(stage)
+        lines.append(f'{name}_stage_seconds{{stage="{label}",quantile="0.5"}} {stats["p50_seconds"]}')
+        lines.append(f'{name}_stage_seconds{{stage="{label}",quantile="0.95"}} {stats["p95_seconds"]}')
+        lines.append(f'{name}_stage_seconds_sum{{stage="{label}"}} {stats["total_seconds"]}')
+        lines.append(f'{name}_stage_seconds_count{{stage="{label}"}} {stats["count"]}')
+    lines += [
+        f"# HELP {name}_stage_bytes Bytes handled by each stage during the last run.",
+        f"# TYPE {name}_stage_bytes gauge",
+    ]
+    for stage, stats in report['stages'].items():
+        lines.append(f'{name}_stage_bytes{{stage="{_escape_label(stage)}"}} {stats["bytes"]}')
+    lines += [
+        f"# HELP {name}_run_stage_seconds Duration of run-level stages such as discovery and index generation.",
+        f"# TYPE {name}_run_stage_seconds gauge",
+    ]
+    for stage, seconds in report['run_stages'].items():
+        lines.append(f'{name}_run_stage_seconds{{stage="{_escape_label(stage)}"}} {seconds}')
+    lines += [
+        f"# HELP {name}_pages Pages processed during the last run by result.",
+        f"# TYPE {name}_pages gauge",
+    ]
+    for status, count in sorted(report['statuses'].items()):
+        lines.append(f'{name}_pages{{status="{_escape_label(status)}"}} {count}')
+    lines += [
+        f"# HELP {name}_slowest_page_seconds Total fetch/snapshot/parse/render/write time of the slowest pages in the last run.",
+        f"# TYPE {name}_slowest_page_seconds gauge",
+    ]
+    for rank, entry in enumerate(report['slowest'], 1):
+        lines.append(f'{name}_slowest_page_seconds{{rank="{rank}",url="{_escape_label(entry["url"])}"}} '
+                     f'{entry["total_seconds"]}')
+    lines += [
+        f"# HELP {name}_outputs Generated files written or skipped as unchanged during the last run.",
+        f"# TYPE {name}_outputs gauge",
+        f'{name}_outputs{{result="written"}} {len(report["outputs"]["written"])}',
+        f'{name}_outputs{{result="unchanged"}} {report["outputs"]["unchanged"]}',
+    ]
+    if report['pipeline']:
+        lines += [
+            f"# HELP {name}_pipeline_pages_per_second Pages completed per second by each pipeline stage.",
+            f"# TYPE {name}_pipeline_pages_per_second gauge",
+        ]
+        for stage, stats in report['pipeline']['stages'].items():
+            lines.append(f'{name}_pipeline_pages_per_second{{stage="{_escape_label(stage)}"}} '
+                         f'{stats["pages_per_second"]}')
+        lines += [
+            f"# HELP {name}_pipeline_utilization Busy fraction of each pipeline stage's workers.",
+            f"# TYPE {name}_pipeline_utilization gauge",
+        ]
+        for stage, stats in report['pipeline']['stages'].items():
+            lines.append(f'{name}_pipeline_utilization{{stage="{_escape_label(stage)}"}} {stats["utilization"]}')
+    if report['memo']:
+        lines += [
+            f"# HELP {name}_memo_lookups Parse/render memo lookups during the last run by result.",
+            f"# TYPE {name}_memo_lookups gauge",
+        ]
+        for namespace, counts in sorted(report['memo'].items()):
+            for result in ('hits', 'misses'):
+                lines.append(f'{name}_memo_lookups{{namespace="{_escape_label(namespace)}",result="{result}"}} '
+                             f'{counts[result]}')
+    if report['duration_seconds'] is not None:
+        lines += [
+            f"# HELP {name}_run_duration_seconds Wall-clock duration of the last run.",
+            f"# TYPE {name}_run_duration_seconds gauge",
+            f"{name}_run_duration_seconds {report['duration_seconds']}",
+            f"# HELP {name}_last_run_timestamp_seconds Unix time the last run finished.",
+            f"# TYPE {name}_last_run_timestamp_seconds gauge",
+            f"{name}_last_run_timestamp_seconds {report['finished_at']:.3f}",
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path, text):
+    # textfile collector 可能随时读取，必须整体替换
+    with open_atomic(path) as f:
+        f.write(text)
+
+
+def write_reports(metrics, report_path, prometheus_path):
+    """写出 JSON 报告和 Prometheus 指标文件，返回报告"""
+    report = metrics.report()
+    _write_atomic(report_path, json.dumps(report, ensure_ascii=False, indent=2) + '\n')
+    _write_atomic(prometheus_path, render_prometheus(report))
+    return report
+
+
+def print_stage_summary(report):
+    """在运行汇总中输出各阶段耗时分布和最慢的页面"""
+    print(f"\n{'阶段':<12}{'次数':>6}{'合计':>10}{'p50':>10}{'p95':>10}{'最大':>10}")
+    for stage, stats in report['stages'].items():
+        print(f"{stage:<12}{stats['count']:>6}{stats['total_seconds']:>9.2f}s"
+              f"{stats['p50_seconds'] * 1000:>8.0f}ms{stats['p95_seconds'] * 1000:>8.0f}ms"
+              f"{stats['max_seconds'] * 1000:>8.0f}ms")
+    for stage, seconds in report['run_stages'].items():
+        print(f"{stage:<12}{'':>6}{seconds:>9.2f}s")
+    if report['pipeline']:
+        for stage, stats in report['pipeline']['stages'].items():
+            print(f"  流水线 {stage}: {stats['workers']} 并发，{stats['pages']} 页，"
+                  f"{stats['pages_per_second']:.1f} 页/秒，利用率 {stats['utilization'] * 100:.0f}%")
+        print(f"  流水线中最多同时 {report['pipeline']['max_in_flight']} 个页面")
+    for namespace, counts in report.get('memo', {}).items():
+        lookups = counts['hits'] + counts['misses']
+        print(f"  缓存 {namespace}: 命中 {counts['hits']}/{lookups}")
+    for entry in report['slowest'][:3]:
+        print(f"  最慢: {entry['total_seconds']:.2f}s {entry['url']}")
+
+
+def stage_timer(metrics, url, stage):
+    """metrics 为 None 时不计时"""
+    return metrics.timer(url, stage) if metrics is not None else nullcontext()
@@ -0,0 +1,130 @@
+"""输出版本自检：在本机启动模拟源站，确认解析版本或模板版本变化后 fetch 会重新解析、渲染页面，
+即使源站返回 304 或响应体与上次相同
+
+用法: python output_version_selftest.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+import app
+from build_manifest import BuildManifest, inputs_hash
+from fixtures import StandInServer, build_page_html
+from http_client import HostRateLimiter, HttpClient
+from memo import MemoStore
+
+SITE = 'https://windows.unblock.win/'
+PAGE_DATA = {
+    'title': 'Windows 11 测试页',
+    'intro_text': '介绍',
+    'versions': [{
+        'version_text': 'Windows 11 24H2',
+        'attributes': ['文件名：a.iso', '文件大小：1.00GB'],
+        'downloads': [{'download_url': 'magnet:?xt=urn:btih:9b0ca6ee95d13a35be062f62cba36959aef0c4f3',
+                       'download_type': 'BT'}],
+    }],
+}
+# 支持 ETag 的页面走 304，不支持的页面走响应体哈希比较
+ROUTES = {
+    '/windows-11/etag/': {'body': build_page_html(PAGE_DATA), 'etag': '"v1"'},
+    '/windows-11/plain/': {'body': build_page_html(PAGE_DATA)},
+}
+TEMPLATE_MARKER = 'template-bump-selftest'
+PARSE_SUFFIX = '（新解析逻辑）'
+
+
+class StandInSiteClient(HttpClient):
+    """把源站链接改写到本机模拟服务器"""
+
+    def __init__(self, server):
+        super().__init__(HostRateLimiter(rate=1000, burst=1000), retries=0, timeout=5)
+        self.server = server
+
+    def request(self, method, url, headers=None, log=None, **kwargs):
+        return super().request(method, self.server.url('/' + url[len(SITE):]), headers, log, **kwargs)
+
+
+def read_text(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    tmp_dir = tempfile.mkdtemp()
+    app.DOCS_DIR = os.path.join(tmp_dir, 'docs')
+    build = BuildManifest(app.DOCS_DIR, root=tmp_dir)
+    memo = MemoStore(root=os.path.join(tmp_dir, 'memo'))
+    quiet = lambda message: None
+
+    with StandInServer(ROUTES) as server:
+        client = StandInSiteClient(server)
+
+        def fetch(url):
+            return app.save_page_data(url, client, log=quiet, build=build, memo=memo)
+
+        urls = [SITE + path.lstrip('/') for path in ROUTES]
+        for url in urls:
+            expect(fetch(url) == app.PAGE_UPDATED, f"首次抓取没有写出页面: {url}")
+            expect(fetch(url) == app.PAGE_NOT_MODIFIED, f"页面未变化时没有跳过: {url}")
+
+        # 模拟模板改动：提升版本号，生成的 HTML 中带上标记
+        original_generate = app.generate_html_content
+        app.TEMPLATE_VERSION += ':selftest'
+        app.generate_html_content = lambda data: original_generate(data).replace(
+            '</body>', f'<p id="{TEMPLATE_MARKER}"></p></body>')
+        try:
+            for url in urls:
+                path = app.parse_url_to_path(url)
+                expect(fetch(url) == app.PAGE_UPDATED, f"模板版本变化后没有重新渲染: {url}")
+                page_html = read_text(os.path.join(app.DOCS_DIR, path, 'index.html'))
+                expect(TEMPLATE_MARKER in page_html, f"index.html 不是新模板生成的: {url}")
+                json_content = read_text(os.path.join(app.DOCS_DIR, path, 'data.json'))
+                digest = inputs_hash(app.TEMPLATE_VERSION, json_content)
+                expect(build.entries.get(f"{path}/index.html") == digest, f"构建清单中的输入哈希没有更新: {url}")
+                expect(json.loads(json_content)['title'] == PAGE_DATA['title'], f"data.json 内容不符: {url}")
+                expect(fetch(url) == app.PAGE_NOT_MODIFIED, f"重新渲染后页面未变化时没有跳过: {url}")
+        finally:
+            app.generate_html_content = original_generate
+
+        # 模拟解析逻辑改动：提升版本号，解析结果的标题带上后缀（解析缓存不能返回旧结果）
+        original_parse = app.parse_page_html
+        app.PARSE_VERSION += 1
+
+        def patched_parse(html, url, parser=app.DEFAULT_PARSER):
+            data = original_parse(html, url, parser)
+            data['title'] += PARSE_SUFFIX
+            return data
+
+        app.parse_page_html = patched_parse
+        try:
+            for url in urls:
+                path = app.parse_url_to_path(url)
+                expect(fetch(url) == app.PAGE_UPDATED, f"解析版本变化后没有重新解析: {url}")
+                data = json.loads(read_text(os.path.join(app.DOCS_DIR, path, 'data.json')))
+                expect(data['title'] == PAGE_DATA['title'] + PARSE_SUFFIX, f"data.json 不是新解析逻辑生成的: {url}")
+                page_html = read_text(os.path.join(app.DOCS_DIR, path, 'index.html'))
+                expect(PARSE_SUFFIX in page_html, f"index.html 没有随解析结果更新: {url}")
+                expect(fetch(url) == app.PAGE_NOT_MODIFIED, f"重新解析后页面未变化时没有跳过: {url}")
+        finally:
+            app.parse_page_html = original_parse
+            client.close()
+        expect([method for method, _ in server.requests['/windows-11/etag/']] == ['GET'] * 6,
+               f"请求次数不符: {server.requests['/windows-11/etag/']}")
+
+    for message in failures:
+        print(f"❌ {message}")
+    if failures:
+        print(f"输出版本自检失败: {len(failures)} 项")
+        sys.exit(1)
+    print("✅ 输出版本自检通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""分阶段的页面处理流水线
+
+请求 → 解析/渲染 → 写入 三个阶段各自并发执行：
+- 请求和写入是 I/O，分别在线程池中运行；
+- 解析和渲染是 CPU 密集的 BeautifulSoup / 字符串拼接，在进程池中运行，可以利用多个 CPU 核心，
+  也不会因为 GIL 阻塞网络请求。
+
+同时处于流水线中（已开始请求、尚未写完）的页面数不超过 max_in_flight，
+请求阶段跑得比解析快时会在这里等待，避免抓取下来的 HTML 在内存中堆积。
+StageStats 记录每个阶段处理的页面数和忙碌时间，用于计算各阶段的吞吐量。
+
+解析进程用 forkserver（不支持时用 spawn）启动：进程池在请求线程运行期间才创建子进程，
+此时直接 fork 会复制其他线程持有的锁（连接池、限速器、logging），子进程可能因此死锁。
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+STAGE_FETCH = 'fetch'
+STAGE_PARSE = 'parse'
+STAGE_WRITE = 'write'
+STAGES = (STAGE_FETCH, STAGE_PARSE, STAGE_WRITE)
+
+
+def _timed_call(func, *args):
+    """在子进程中执行并返回 (耗时, 结果)，耗时不包含排队等待的时间"""
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def process_context():
+    """解析进程池使用的启动方式：forkserver，不支持时（Windows）用 spawn"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class StageStats:
+    """各阶段处理的页面数、忙碌时间和流水线中的最大页面数（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.items = {stage: 0 for stage in STAGES}
+        self.busy = {stage: 0.0 for stage in STAGES}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.items[stage] += 1
+            self.busy[stage] += seconds
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def report(self, workers):
+        """workers: {阶段: 并发数}；utilization 为忙碌时间占该阶段全部工作线程/进程时间的比例"""
+        duration = self.duration if self.duration is not None else time.perf_counter() - self._start
+        stages = {}
+        for stage in STAGES:
+            capacity = duration * max(workers.get(stage, 1), 1)
+            stages[stage] = {
+                'workers': workers.get(stage, 1),
+                'pages': self.items[stage],
+                'busy_seconds': round(self.busy[stage], 6),
+                'pages_per_second': round(self.items[stage] / duration, 3) if duration else 0.0,
+                'utilization': round(self.busy[stage] / capacity, 3) if capacity else 0.0,
+            }
+        return {'duration_seconds': round(duration, 6), 'max_in_flight': self.max_in_flight, 'stages': stages}
+
+
+def run_pipeline(items, fetch, parse, write, fetch_workers, parse_workers, write_workers=1,
+                 max_in_flight=None, stats=None):
+    """按 items 的顺序逐个产出处理结果
+
+    fetch(item) 在线程池中运行，返回 (result, None) 表示该 item 已处理完（如 304、请求失败），
+    或 (None, args) 把 args 交给解析阶段；parse(*args) 在进程池中运行，必须是可 pickle 的模块级函数；
+    write(item, args, parsed, error) 在线程池中运行并返回最终结果，解析阶段出错时 parsed 为 None、
+    error 为异常对象。
+
+    调用方提前停止迭代或 fetch / write 抛出异常时，不再开始新的 item，已进入流水线的 item
+    按 请求 → 解析 → 写入 的顺序处理完后再依次关闭各个池。
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    items = list(items)
+    max_in_flight = max_in_flight or (fetch_workers + parse_workers) * 2
+    stats = stats if stats is not None else StageStats()
+    slots = threading.BoundedSemaphore(max_in_flight)
+    stopping = threading.Event()
+    results = [Future() for _ in items]
+
+    def settle(index, result=None, error=None):
+        if error is not None:
+            results[index].set_exception(error)
+        else:
+            results[index].set_result(result)
+        stats.leave()
+        slots.release()
+
+    def do_write(index, item, args, parse_future):
+        try:
+            try:
+                seconds, parsed = parse_future.result()
+                stats.record(STAGE_PARSE, seconds)
+                error = None
+            except Exception as e:
+                parsed, error = None, e
+            start = time.perf_counter()
+            result = write(item, args, parsed, error)
+            stats.record(STAGE_WRITE, time.perf_counter() - start)
+        except Exception as e:
+            settle(index, error=e)
+        else:
+            settle(index, result)
+
+    fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers)
+    parse_pool = ProcessPoolExecutor(max_workers=parse_workers, mp_context=process_context())
+    write_pool = ThreadPoolExecutor(max_workers=write_workers)
+
+    def hand_to_writer(index, item, args, parse_future):
+        # 回调在进程池的管理线程中执行，只负责把写入任务交给写入线程池；
+        # 写入线程池总是最后关闭，这里的 submit 不会遇到已关闭的池
+        try:
+            write_pool.submit(do_write, index, item, args, parse_future)
+        except Exception as e:
+            settle(index, error=e)
+
+    def do_fetch(index, item):
+        try:
+            start = time.perf_counter()
+            result, args = fetch(item)
+            stats.record(STAGE_FETCH, time.perf_counter() - start)
+            if args is None:
+                settle(index, result)
+                return
+            parse_future = parse_pool.submit(_timed_call, parse, *args)
+            parse_future.add_done_callback(
+                lambda future: hand_to_writer(index, item, args, future))
+        except Exception as e:
+            settle(index, error=e)
+
+    def feed():
+        for index, item in enumerate(items):
+            # 流水线已满时在这里等待，形成反压；停止后不再提交新的 item
+            while not slots.acquire(timeout=0.1):
+                if stopping.is_set():
+                    return
+            if stopping.is_set():
+                slots.release()
+                return
+            stats.enter()
+            fetch_pool.submit(do_fetch, index, item)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        for future in results:
+            yield future.result()
+    finally:
+        stopping.set()
+        feeder.join()
+        # 按阶段顺序关闭：请求线程可能还在提交解析任务，解析完成的回调还会提交写入任务
+        fetch_pool.shutdown(wait=True)
+        parse_pool.shutdown(wait=True)
+        write_pool.shutdown(wait=True)
+        stats.finish()
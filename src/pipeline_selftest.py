@@ -0,0 +1,194 @@
+"""流水线自检：确认多进程解析的流水线与串行处理写出相同的文件，提前停止和阶段出错时能干净退出
+
+在本机启动模拟源站，用 golden 样例的 data.json 合成页面，分别用
+process_links_pipelined（parse_workers > 1）和 save_page_data 逐个处理，比较两边写出的文件。
+
+用法: python pipeline_selftest.py
+"""
+import contextlib
+import functools
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+from urllib.parse import urlsplit
+
+import app
+from build_manifest import BuildManifest
+from fixtures import StandInServer, build_page_html
+from golden import iter_golden_files
+from http_client import HostRateLimiter, HttpClient
+from pipeline import run_pipeline
+
+PARSE_WORKERS = 2
+
+
+class StandInSiteClient(HttpClient):
+    """按路径把任意源站链接改写到本机模拟服务器"""
+
+    def __init__(self, server):
+        super().__init__(HostRateLimiter(rate=1000, burst=1000), retries=0, timeout=5)
+        self.server = server
+
+    def request(self, method, url, headers=None, log=None, **kwargs):
+        return super().request(method, self.server.url(urlsplit(url).path), headers, log, **kwargs)
+
+
+class ErrorRecords(logging.Handler):
+    """收集 concurrent.futures 记录的回调异常（如向已关闭的线程池提交任务）"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record.getMessage())
+
+
+def square(x):
+    return x * x
+
+
+def fetch_item(x):
+    if x == 'boom':
+        raise RuntimeError('fetch failed')
+    return None, (x,)
+
+
+def write_item(x, args, parsed, error):
+    if x == 13:
+        raise RuntimeError('write failed')
+    return parsed
+
+
+def read_tree(root):
+    """返回 {相对路径: 文件内容}"""
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+def build_tree(docs_dir, routes, process):
+    """在 docs_dir 下运行 process(client, build)，返回写出的文件"""
+    app.DOCS_DIR = docs_dir
+    build = BuildManifest(docs_dir, root=os.path.dirname(docs_dir))
+    with StandInServer(routes) as server:
+        client = StandInSiteClient(server)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                process(client, build)
+        finally:
+            client.close()
+    return read_tree(docs_dir)
+
+
+def golden_pages():
+    """返回 ({路径: 路由}, 链接列表)"""
+    routes = {}
+    links = []
+    for json_path in iter_golden_files():
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        routes[urlsplit(data['url']).path] = {'body': build_page_html(data)}
+        links.append(data['url'])
+    return routes, links
+
+
+def check_same_output(expect):
+    routes, links = golden_pages()
+    tmp_dir = tempfile.mkdtemp()
+    quiet = lambda message: None
+
+    def pipelined(client, build):
+        fetch = functools.partial(app.fetch_page_html, client=client)
+        counts = app.process_links_pipelined(links, fetch, workers=4, parse_workers=PARSE_WORKERS, build=build)
+        expect(counts[app.PAGE_UPDATED] == len(links), f"流水线处理结果不符: {counts}")
+
+    def serial(client, build):
+        for url in links:
+            status = app.save_page_data(url, client, log=quiet, build=build)
+            expect(status == app.PAGE_UPDATED, f"串行处理没有写出页面: {url}")
+
+    original_docs = app.DOCS_DIR
+    try:
+        pipelined_files = build_tree(os.path.join(tmp_dir, 'pipelined', 'docs'), routes, pipelined)
+        serial_files = build_tree(os.path.join(tmp_dir, 'serial', 'docs'), routes, serial)
+    finally:
+        app.DOCS_DIR = original_docs
+    expect(len(serial_files) >= len(links) * 2, f"串行处理写出的文件太少: {len(serial_files)}")
+    for rel_path in sorted(set(pipelined_files) | set(serial_files)):
+        if rel_path not in pipelined_files:
+            expect(False, f"流水线没有写出 {rel_path}")
+        elif rel_path not in serial_files:
+            expect(False, f"流水线多写出了 {rel_path}")
+        else:
+            expect(pipelined_files[rel_path] == serial_files[rel_path], f"流水线与串行处理的输出不同: {rel_path}")
+    return len(links)
+
+
+def check_early_stop(expect):
+    threads = threading.active_count()
+    results = run_pipeline(range(200), lambda x: (None, (x,)), square, write_item, 4, PARSE_WORKERS,
+                           max_in_flight=4)
+    first = [next(results) for _ in range(5)]
+    results.close()
+    expect(first == [square(x) for x in range(5)], f"提前停止前的结果不符: {first}")
+    expect(threading.active_count() == threads, f"提前停止后仍有 {threading.active_count() - threads} 个线程未退出")
+
+
+def check_errors(expect):
+    results = run_pipeline([1, 2, 'boom', 4], fetch_item, square, write_item, 2, PARSE_WORKERS)
+    try:
+        got = [next(results), next(results)]
+        next(results)
+        expect(False, "请求阶段的异常没有传给调用方")
+    except RuntimeError as e:
+        expect(str(e) == 'fetch failed', f"请求阶段的异常不符: {e}")
+        expect(got == [1, 4], f"出错前的结果不符: {got}")
+    finally:
+        results.close()
+
+    results = run_pipeline(range(40), lambda x: (None, (x,)), square, write_item, 2, PARSE_WORKERS)
+    try:
+        got = [next(results) for _ in range(13)]
+        next(results)
+        expect(False, "写入阶段的异常没有传给调用方")
+    except RuntimeError as e:
+        expect(str(e) == 'write failed', f"写入阶段的异常不符: {e}")
+        expect(got == [square(x) for x in range(13)], f"出错前的结果不符: {got}")
+    finally:
+        results.close()
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    errors = ErrorRecords()
+    logging.getLogger('concurrent.futures').addHandler(errors)
+    pages = check_same_output(expect)
+    check_early_stop(expect)
+    check_errors(expect)
+    for message in errors.records:
+        expect(False, f"线程池回调出错: {message}")
+
+    for message in failures:
+        print(f"❌ {message}")
+    if failures:
+        print(f"流水线自检失败: {len(failures)} 项")
+        sys.exit(1)
+    print(f"✅ 流水线自检通过（{pages} 个页面，{PARSE_WORKERS} 个解析进程）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""汇总页使用的客户端搜索索引
+
+根据各页面的 data.json 生成紧凑的倒排索引（docs/search-index.json），
+汇总页在首次搜索时才加载，并在浏览器中用二分查找完成查询。
+
+索引按字段拆分，对应汇总页的三个搜索选项：
+    t: 标题、页面路径和链接
+    i: 介绍文本
+    d: 版本名称、文件属性（文件名、大小、MD5、SHA1 等）和下载链接
+分词规则必须与 app.SITE_JS 中的 tokenizeQuery 保持一致：
+英文和数字按连续的 [0-9a-z] 切分，中日韩文字生成单字和相邻二字组合。
+
+docs 和 titles 一一对应（页面路径和标题），汇总页直接用它们渲染搜索结果，
+不需要把全部页面都放进汇总页的 DOM。
+"""
+import hashlib
+import json
+import re
+
+SEARCH_INDEX_FILENAME = 'search-index.json'
+SEARCH_INDEX_VERSION = 2
+
+_TOKEN_RE = re.compile(r'[0-9a-z]+|[\u3400-\u9fff\uf900-\ufaff]+')
+
+
+def tokenize(text):
+    """把文本切分为索引词（去重，保持首次出现顺序）"""
+    tokens = {}
+    for run in _TOKEN_RE.findall(text.lower()):
+        if run[0].isascii():
+            tokens[run] = None
+            continue
+        for i, char in enumerate(run):
+            tokens[char] = None
+            if i + 1 < len(run):
+                tokens[run[i:i + 2]] = None
+    return list(tokens)
+
+
+def page_title(path, data):
+    """页面标题：优先使用 data.json 中提取的标题，没有数据时由路径生成"""
+    if data and data.get('title'):
+        return data['title']
+    return path.split('/')[-1].replace('-', ' ').title()
+
+
+def page_field_texts(path, url, data):
+    """返回页面各字段需要索引的文本"""
+    title_parts = [path, url]
+    intro_parts = []
+    detail_parts = []
+    if data:
+        title_parts.append(data.get('title', ''))
+        intro_parts.append(data.get('intro_text', ''))
+        for version in data.get('versions', []):
+            detail_parts.append(version.get('version_text', ''))
+            detail_parts.extend(version.get('attributes', []))
+            for download in version.get('downloads', []):
+                detail_parts.append(download.get('download_url', ''))
+    return {
+        't': ' '.join(title_parts),
+        'i': ' '.join(intro_parts),
+        'd': ' '.join(detail_parts),
+    }
+
+
+def build_search_index(pages):
+    """pages 为 (path, url, data) 的可迭代对象，data 可以为 None；返回可直接序列化的索引
+
+    pages 只遍历一次，可以传入逐个读取 data.json 的生成器，不必同时持有全部页面数据。
+    """
+    docs = []
+    titles = []
+    postings = {'t': {}, 'i': {}, 'd': {}}
+    for doc_id, (path, url, data) in enumerate(pages):
+        docs.append(path)
+        titles.append(page_title(path, data))
+        for field, text in page_field_texts(path, url, data).items():
+            field_postings = postings[field]
+            for token in tokenize(text):
+                field_postings.setdefault(token, []).append(doc_id)
+
+    fields = {}
+    for field, field_postings in postings.items():
+        terms = sorted(field_postings)
+        fields[field] = {
+            'terms': terms,
+            'postings': [field_postings[term] for term in terms],
+        }
+    return {'v': SEARCH_INDEX_VERSION, 'docs': docs, 'titles': titles, 'fields': fields}
+
+
+def serialize_search_index(index):
+    """紧凑序列化，返回 (文本, 用于缓存失效的内容哈希)"""
+    text = json.dumps(index, ensure_ascii=False, separators=(',', ':'))
+    return text, hashlib.sha256(text.encode('utf-8')).hexdigest()[:10]
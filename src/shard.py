@@ -0,0 +1,126 @@
+"""分片运行（--shard i/N）
+
+按输出路径的哈希把 a.txt 中的链接确定性地分成 N 份，每个分片（CI 矩阵中的一个任务或
+本机的一个进程）只处理属于自己的页面，并在 data/shards/ 下写出一份分片清单：
+各页面的处理结果、本分片保存的快照条目以及链接列表的摘要。
+
+所有分片完成后由合并步骤（python app.py --merge-shards）读取全部清单，检查分片是否齐全、
+是否基于同一份链接列表，然后合并快照清单、更新汇总目录和下载索引，最后只生成一次汇总页面。
+"""
+import glob
+import hashlib
+import json
+import os
+
+from storage import DATA_DIR, write_json_atomic
+
+SHARD_DIR = os.path.join(DATA_DIR, 'shards')
+
+
+def parse_shard_spec(text):
+    """解析 'i/N'（i 从 1 开始），返回 (i, N)"""
+    index, sep, count = text.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        index = count = 0
+    if not sep or count < 1 or not 1 <= index <= count:
+        raise ValueError(f"分片参数应为 i/N 且 1 <= i <= N，例如 1/4: {text}")
+    return index, count
+
+
+def shard_label(index, count):
+    return f"shard-{index}-of-{count}"
+
+
+def shard_of(key, count):
+    """key 所属的分片（从 1 开始）；同一个 key 在任何机器上结果都相同"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count + 1
+
+
+def select_shard(links, index, count, key):
+    """挑出属于第 index 个分片的链接，保持原有顺序
+
+    key(link) 为分片依据，应与输出目录一致，保证写入同一目录的链接落在同一个分片。
+    """
+    return [link for link in links if link and shard_of(key(link), count) == index]
+
+
+def links_digest(links):
+    """链接列表的摘要，用于确认各分片基于同一份 a.txt"""
+    return hashlib.sha256('\n'.join(links).encode('utf-8')).hexdigest()
+
+
+def shard_manifest_path(index, count, root=SHARD_DIR):
+    return os.path.join(root, f"{shard_label(index, count)}.json")
+
+
+def write_shard_manifest(path, index, count, digest, pages, snapshots):
+    """写出分片清单
+
+    pages: {页面路径: {'url': 链接, 'status': 'done' / 'failed' / 'pending', 'result' 或 'reason'}}
+    snapshots: 本分片抓取的快照条目 {链接: SnapshotStore 的 manifest 条目}
+    """
+    manifest = {
+        'shard': index,
+        'count': count,
+        'links_sha256': digest,
+        'pages': pages,
+        'snapshots': snapshots,
+    }
+    write_json_atomic(path, manifest)
+
+
+def load_shard_manifests(root=SHARD_DIR):
+    """读取目录下的全部分片清单，返回 [(文件路径, 清单)]，按分片序号排序
+
+    清单无法读取、不是完整的 JSON 或缺少必需字段时抛出 ValueError。
+    """
+    manifests = []
+    for path in sorted(glob.glob(os.path.join(root, 'shard-*-of-*.json'))):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"无法读取分片清单: {path}（{e}）")
+        if not (isinstance(manifest, dict) and isinstance(manifest.get('shard'), int)
+                and isinstance(manifest.get('count'), int) and isinstance(manifest.get('pages'), dict)):
+            raise ValueError(f"分片清单格式不正确: {path}")
+        manifests.append((path, manifest))
+    manifests.sort(key=lambda item: item[1].get('shard', 0))
+    return manifests
+
+
+def check_shard_manifests(manifests):
+    """检查分片清单是否完整一致，返回问题列表（为空表示可以合并）"""
+    if not manifests:
+        return ["没有找到分片清单"]
+    problems = []
+    counts = {manifest.get('count') for _, manifest in manifests}
+    if len(counts) > 1:
+        return [f"分片清单来自不同的分片数: {sorted(counts, key=str)}"]
+    count = counts.pop()
+    present = [manifest.get('shard') for _, manifest in manifests]
+    missing = [index for index in range(1, count + 1) if index not in present]
+    if missing:
+        problems.append(f"缺少分片: {', '.join(f'{index}/{count}' for index in missing)}")
+    if len({manifest.get('links_sha256') for _, manifest in manifests}) > 1:
+        problems.append("各分片使用的链接列表不一致，请用同一份 a.txt 重新运行")
+    owners = {}
+    for _, manifest in manifests:
+        for path in manifest.get('pages', {}):
+            if path in owners:
+                problems.append(f"页面同时出现在分片 {owners[path]} 和 {manifest['shard']} 中: {path}")
+            owners[path] = manifest.get('shard')
+    return problems
+
+
+def merge_shard_manifests(manifests):
+    """合并全部分片的页面结果和快照条目，返回 (pages, snapshots)"""
+    pages = {}
+    snapshots = {}
+    for _, manifest in manifests:
+        pages.update(manifest.get('pages', {}))
+        snapshots.update(manifest.get('snapshots', {}))
+    return pages, snapshots
@@ -0,0 +1,143 @@
+"""原始 HTML 快照存储
+
+每次抓取到的响应体按 SHA-256 内容寻址压缩保存在 snapshots/objects 下，
+manifest.json 记录 URL 到哈希的映射，供 --offline 模式离线重新解析和渲染。
+安装了 zstandard 时使用 zstd 压缩，否则使用 gzip。
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from storage import REPO_ROOT, write_json_atomic
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+SNAPSHOT_DIR = os.path.join(REPO_ROOT, 'snapshots')
+MANIFEST_FILENAME = 'manifest.json'
+
+CODEC_GZIP = 'gz'
+CODEC_ZSTD = 'zst'
+
+
+def default_codec():
+    return CODEC_ZSTD if zstandard is not None else CODEC_GZIP
+
+
+def _compress(content: bytes, codec: str) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=19).compress(content)
+    # mtime=0 保证相同内容压缩结果一致，避免无意义的 git 变更
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def _decompress(blob: bytes, codec: str) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("快照使用 zstd 压缩，请先安装 zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return gzip.decompress(blob)
+
+
+class SnapshotStore:
+    """内容寻址的快照存储（线程安全）"""
+
+    def __init__(self, root: str = SNAPSHOT_DIR, codec: str = None):
+        self.root = root
+        self.codec = codec or default_codec()
+        self.objects_dir = os.path.join(root, 'objects')
+        self.manifest_path = os.path.join(root, MANIFEST_FILENAME)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return manifest if isinstance(manifest, dict) else {}
+
+    def object_path(self, sha256: str, codec: str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], f"{sha256}.html.{codec}")
+
+    def has(self, url: str) -> bool:
+        entry = self.manifest.get(url)
+        return bool(entry) and os.path.exists(self.object_path(entry['sha256'], entry['codec']))
+
+    def put(self, url: str, content: bytes, encoding: str) -> str:
+        """保存一个响应体，返回其 SHA-256"""
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self.object_path(sha256, self.codec)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(_compress(content, self.codec))
+            os.replace(tmp_path, path)
+        entry = {'sha256': sha256, 'codec': self.codec, 'encoding': encoding}
+        with self._lock:
+            if self.manifest.get(url) != entry:
+                self.manifest[url] = entry
+                self._dirty = True
+        return sha256
+
+    def update_entries(self, entries: dict) -> int:
+        """合并其他进程（如分片运行）写出的 manifest 条目，返回有变化的条目数"""
+        changed = 0
+        with self._lock:
+            for url, entry in entries.items():
+                if self.manifest.get(url) != entry:
+                    self.manifest[url] = entry
+                    changed += 1
+            if changed:
+                self._dirty = True
+        return changed
+
+    def get_bytes(self, url: str):
+        """返回 (响应体, 编码)，没有快照时返回 None"""
+        entry = self.manifest.get(url)
+        if not entry:
+            return None
+        path = self.object_path(entry['sha256'], entry['codec'])
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+        except OSError:
+            return None
+        return _decompress(blob, entry['codec']), entry.get('encoding')
+
+    def get_text(self, url: str):
+        """返回解码后的页面 HTML（与 requests 的 response.text 一致），没有快照时返回 None"""
+        stored = self.get_bytes(url)
+        if stored is None:
+            return None
+        content, encoding = stored
+        return content.decode(encoding or 'utf-8', errors='replace')
+
+    def save(self) -> None:
+        """写回 manifest（仅在有变化时）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            write_json_atomic(self.manifest_path, self.manifest, indent=2)
+            self._dirty = False
+
+    def prune(self) -> int:
+        """删除 manifest 中已不再引用的快照对象，返回删除的文件数"""
+        referenced = {self.object_path(entry['sha256'], entry['codec']) for entry in self.manifest.values()}
+        removed = 0
+        if not os.path.isdir(self.objects_dir):
+            return removed
+        for dirpath, _, filenames in os.walk(self.objects_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if path not in referenced:
+                    os.remove(path)
+                    removed += 1
+        return removed
@@ -0,0 +1,32 @@
+"""仓库内的数据目录和状态文件的原子写入
+
+各模块的状态文件（构建清单、索引、缓存、队列等）默认都放在 DATA_DIR 下，
+写入时先写临时文件再 os.replace，运行中途被终止也不会留下写了一半的文件。
+"""
+import json
+import os
+from contextlib import contextmanager
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(REPO_ROOT, 'data')
+
+
+@contextmanager
+def open_atomic(path):
+    """以文本方式打开 path 的临时文件，with 块正常结束后整体替换 path，出错时删除临时文件"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json_atomic(path, value, indent=1, sort_keys=True):
+    """把 value 以 JSON 写入 path（原子替换）"""
+    with open_atomic(path) as f:
+        json.dump(value, f, ensure_ascii=False, indent=indent, sort_keys=sort_keys)